@@ -0,0 +1,213 @@
+"""
+Load-test the prediction API: throughput, tail latency and CPU / memory per scenario.
+
+Request payloads are records sampled from test.csv; retrain requests get a SalePrice drawn
+from train.csv, as test.csv is unlabelled. Each scenario keeps --concurrency requests in
+flight for --duration seconds, through one or both transports:
+
+- asgi: the FastAPI app driven in this process through httpx's ASGI transport (no server or
+  network; CPU / RSS include the load generator)
+- uvicorn: a local uvicorn server in its own process, over HTTP (CPU / RSS are the server's)
+
+Scenarios: /predict in inference and retrain mode, and /predict/batch for each --batch-sizes.
+Retrain requests write to a temporary monitoring store and never launch a retraining job;
+logging is reduced to errors. Results are written as JSON with the commit and settings
+(--output); --baseline compares them with the results file of another commit.
+Linux only (/proc); requires a trained model.
+
+Usage: python benchmarks/bench_api.py --duration 10 --output api.json --baseline api_main.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+import httpx
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from src.utils.config import config
+
+def _isolate(data_dir: str):
+    """Keep the benchmark's monitoring records out of the real store and its retrains out of models/."""
+    config.data_dir = Path(data_dir)
+    config.retrain_min_new_samples = sys.maxsize
+
+def _quiet():
+    from src.utils.logger import logger
+    for log in logger._loggers.values():
+        log.setLevel(logging.ERROR)
+
+def _payloads(batch_sizes, pool_size: int) -> list:
+    """(scenario, path, request bodies, records per request), bodies encoded up front."""
+    test_df = pd.read_csv(config.raw_data_dir / config.test_file).drop(columns=['Id'])
+    prices = pd.read_csv(config.raw_data_dir / config.train_file)['SalePrice']
+    records = json.loads(test_df.sample(pool_size, replace=True, random_state=0).to_json(orient="records"))
+    labels = prices.sample(pool_size, replace=True, random_state=0).astype(float).tolist()
+    scenarios = [
+        ("inference", "/predict?mode=inference", [json.dumps({"features": r}).encode() for r in records], 1),
+        ("retrain", "/predict?mode=retrain",
+         [json.dumps({"features": r, "SalePrice": p}).encode() for r, p in zip(records, labels)], 1)
+    ]
+    for size in batch_sizes:
+        batch = test_df.sample(size, replace=True, random_state=size).to_json(orient="records")
+        scenarios.append((f"batch-{size}", "/predict/batch", [f'{{"records": {batch}}}'.encode()], size))
+    return scenarios
+
+def _usage(pid: int) -> dict:
+    """CPU seconds, current and peak RSS (MB) of a process."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    usage = {"cpu": (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                usage[line[:5]] = int(line.split()[1]) / 1024
+    return usage
+
+async def _scenario(client: httpx.AsyncClient, pid: int, transport: str, scenario, args) -> dict:
+    name, path, bodies, n_records = scenario
+    headers = {"content-type": "application/json"}
+    for body in itertools.islice(itertools.cycle(bodies), args.warmup):
+        (await client.post(path, content=body, headers=headers)).raise_for_status()
+
+    latencies, errors = [], 0
+    counter = itertools.count()
+    deadline = time.perf_counter() + args.duration
+
+    async def user():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            body = bodies[next(counter) % len(bodies)]
+            start = time.perf_counter()
+            response = await client.post(path, content=body, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code != 200
+
+    before = _usage(pid)
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - start
+    after = _usage(pid)
+
+    ms = np.array(latencies) * 1000
+    return {"transport": transport, "scenario": name, "records_per_request": n_records,
+            "requests": len(ms), "errors": errors, "seconds": wall,
+            "rps": len(ms) / wall, "records_per_s": len(ms) * n_records / wall,
+            "p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)), "max_ms": float(ms.max()),
+            "cpu_percent": 100 * (after["cpu"] - before["cpu"]) / wall,
+            "rss_mb": after["VmRSS"], "peak_rss_mb": after["VmHWM"]}
+
+async def _run_asgi(scenarios, args) -> list:
+    from src.app.main import app
+    _quiet()
+    # The ASGI transport does not send lifespan events: run the startup handlers (model load, workers) here
+    await app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                     timeout=args.timeout) as client:
+            return [await _scenario(client, os.getpid(), "asgi", s, args) for s in scenarios]
+    finally:
+        await app.router.shutdown()
+
+def _serve(port: int, data_dir: str):
+    import uvicorn
+    _isolate(data_dir)
+    from src.app.main import app
+    _quiet()
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+async def _run_uvicorn(scenarios, args, data_dir: str) -> list:
+    server = get_context("spawn").Process(target=_serve, args=(args.port, data_dir))
+    server.start()
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=args.timeout,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            deadline = time.perf_counter() + args.timeout
+            while True:
+                try:
+                    if (await client.get("/health")).json()["model_loaded"]:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.perf_counter() > deadline or not server.is_alive():
+                    raise RuntimeError(f"uvicorn did not serve a model within {args.timeout}s")
+                await asyncio.sleep(0.2)
+            return [await _scenario(client, server.pid, "uvicorn", s, args) for s in scenarios]
+    finally:
+        server.terminate()
+        server.join()
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def _compare(results: list, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["transport"], r["scenario"]): r for r in baseline["results"]}
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')}): ratios current / baseline")
+    print(f"{'transport':>9} | {'scenario':>11} | {'rps':>6} | {'p50':>6} | {'p99':>6} | {'cpu':>6} | {'rss':>6}")
+    for result in results:
+        old = previous.get((result["transport"], result["scenario"]))
+        if old is None:
+            continue
+        ratios = [result[k] / old[k] if old[k] else float("nan")
+                  for k in ("rps", "p50_ms", "p99_ms", "cpu_percent", "rss_mb")]
+        print(f"{result['transport']:>9} | {result['scenario']:>11} | " + " | ".join(f"{r:6.2f}" for r in ratios))
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the prediction API")
+    parser.add_argument("--transport", choices=["asgi", "uvicorn", "both"], default="both")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    parser.add_argument("--warmup", type=int, default=20, help="Requests sent before each measurement")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10_000])
+    parser.add_argument("--pool-size", type=int, default=500, help="Distinct records for single predictions")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per request and for server startup")
+    parser.add_argument("--output", default="bench_api_results.json", help="Machine-readable results")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    scenarios = _payloads(args.batch_sizes, args.pool_size)
+    results = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        if args.transport in ("uvicorn", "both"):
+            results += asyncio.run(_run_uvicorn(scenarios, args, data_dir))
+        if args.transport in ("asgi", "both"):
+            _isolate(data_dir)
+            results += asyncio.run(_run_asgi(scenarios, args))
+
+    print(f"{'transport':>9} | {'scenario':>11} | {'requests':>8} | {'rps':>8} | {'records/s':>9} | "
+          f"{'p50':>8} | {'p95':>8} | {'p99':>8} | {'cpu':>5} | {'rss':>7} | errors")
+    for r in results:
+        print(f"{r['transport']:>9} | {r['scenario']:>11} | {r['requests']:>8} | {r['rps']:8.1f} | "
+              f"{r['records_per_s']:9.0f} | {r['p50_ms']:6.1f}ms | {r['p95_ms']:6.1f}ms | {r['p99_ms']:6.1f}ms | "
+              f"{r['cpu_percent']:4.0f}% | {r['rss_mb']:5.0f}MB | {r['errors']}")
+
+    with open(args.output, "w") as f:
+        json.dump({"commit": _commit(), "created": time.time(), "python": platform.python_version(),
+                   "cpus": os.cpu_count(), "settings": vars(args), "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        _compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Time the multi-feature drift engine on a large window.
+
+Usage: python benchmarks/bench_drift_engine.py --rows 100000
+Requires a trained model (models/reference_profile.npz).
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.config import config
+from monitoring.monitor import get_drift_engine
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized drift engine")
+    parser.add_argument("--rows", type=int, default=100_000, help="Window size (rows resampled from train.csv)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = get_drift_engine()
+    if engine is None:
+        print("No reference profile found. Train the model first.")
+        sys.exit(1)
+
+    train_df = pd.read_csv(config.raw_data_dir / config.train_file)
+    window = train_df.sample(args.rows, replace=True, random_state=0).reset_index(drop=True)
+    print(f"Features: {len(engine.numeric_features)} numeric, {len(engine.categorical_features)} categorical; rows: {args.rows}")
+
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        codes = engine.encode(window)
+        encoded = time.perf_counter()
+        report = engine.evaluate(*engine.count(*codes))
+        done = time.perf_counter()
+        print(f"encode {encoded - start:.3f}s | count + tests {done - encoded:.3f}s | "
+              f"total {done - start:.3f}s | drifted: {len(report.drifted_features)}")
+
+if __name__ == "__main__":
+    main()
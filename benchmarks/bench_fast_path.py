@@ -0,0 +1,55 @@
+"""
+Compare single-record preprocessing + prediction: sklearn ColumnTransformer vs the compiled fast path.
+
+Usage: python benchmarks/bench_fast_path.py --rows 1000
+Requires a trained model (models/).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.config import config
+from src.data.preprocessing import compile_preprocessor, verify_compiled
+from src.models.registry import artifact_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled single-record preprocessor")
+    parser.add_argument("--rows", type=int, default=1000, help="Records (from train.csv) encoded one at a time")
+    args = parser.parse_args()
+
+    model = joblib.load(artifact_path(config.model_name))
+    preprocessor = joblib.load(artifact_path(config.preprocessor_file))
+    compiled = compile_preprocessor(preprocessor)
+
+    train_df = pd.read_csv(config.raw_data_dir / config.train_file).drop(columns=['Id', 'SalePrice'])
+    print(f"Max abs difference vs sklearn on {len(train_df)} rows: {verify_compiled(compiled, preprocessor, train_df):.3g}")
+
+    # Records as the API receives them (JSON-decoded dicts)
+    records = json.loads(train_df.head(args.rows).to_json(orient="records"))
+
+    def run(encode):
+        timings = []
+        predictions = []
+        for record in records:
+            start = time.perf_counter()
+            predictions.append(float(model.predict(encode(record))[0]))
+            timings.append(time.perf_counter() - start)
+        return np.array(timings) * 1e6, np.array(predictions)
+
+    sklearn_us, sklearn_pred = run(lambda record: preprocessor.transform(pd.DataFrame([record])))
+    compiled_us, compiled_pred = run(compiled.transform_record)
+    for name, timings in (("sklearn", sklearn_us), ("compiled", compiled_us)):
+        print(f"{name:>8}: p50 {np.percentile(timings, 50):8.1f}us | p99 {np.percentile(timings, 99):8.1f}us")
+    print(f"Speedup (p50): {np.percentile(sklearn_us, 50) / np.percentile(compiled_us, 50):.1f}x | "
+          f"max prediction difference: {np.abs(sklearn_pred - compiled_pred).max():.3g}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Measure how long importing the API takes and which heavy modules it loads.
+
+Each run is a fresh interpreter with `-X importtime`; the cumulative time of the target
+module is reported (median over runs), along with which heavy libraries ended up loaded.
+
+Usage: python benchmarks/bench_import_time.py --runs 5 [--module src.app.main]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("mlflow", "matplotlib", "seaborn", "scipy.stats", "xgboost", "sklearn", "pandas", "numpy",
+                 "run_pipeline", "src.models.train_model")
+
+def import_time(module: str) -> float:
+    """Cumulative import time of `module` in seconds, from a fresh interpreter."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1e6
+    raise RuntimeError(f"No import time reported for {module}")
+
+def loaded_modules(module: str) -> dict:
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules)); " \
+           "print(len(sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    lines = result.stdout.strip().splitlines()
+    loaded = set(lines[-2].split(",")) if lines[-2] else set()
+    return {"loaded": {m: m in loaded for m in HEAVY_MODULES}, "n_modules": int(lines[-1])}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API import time")
+    parser.add_argument("--module", default="src.app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings = [import_time(args.module) for _ in range(args.runs)]
+    modules = loaded_modules(args.module)
+    print(f"import {args.module}: median {statistics.median(timings):.3f}s "
+          f"(min {min(timings):.3f}s, max {max(timings):.3f}s, {args.runs} runs), "
+          f"{modules['n_modules']} modules in sys.modules")
+    for name, loaded in modules["loaded"].items():
+        print(f"  {name:<24} {'loaded' if loaded else '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compare an incremental (warm-start) retrain with a full retrain after the target drifted.
+
+train.csv is split into "history" (what the deployed model was trained on) and "new"
+labelled records whose SalePrice is shifted by --price-shift, as if they came from the
+monitoring store. The base model is trained on the history; then a full retrain
+(refit preprocessor + model on history + new records) and an incremental retrain
+(frozen preprocessor, continue_boosting on the new records only) are timed and scored on a
+holdout of the new records and on the history's validation split. --history-multiplier
+repeats the history to show how full retrains grow with accumulated data while the
+incremental one does not.
+
+Usage: python benchmarks/bench_incremental.py --price-shift 0.2 --history-multiplier 10
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.config import config
+from src.data.preprocessing import preprocess_data
+from src.models.train_model import continue_boosting
+
+def _fit_full(df: pd.DataFrame):
+    """What train() does: fit the preprocessor and a model from scratch, early stopping on a split."""
+    X, y, preprocessor = preprocess_data(df, is_train=True)
+    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=config.test_size,
+                                                      random_state=config.random_state)
+    model = xgb.XGBRegressor(**config.xgboost_params)
+    model.fit(X_train, y_train, eval_set=[(X_val, y_val)], early_stopping_rounds=10, verbose=False)
+    return model, preprocessor
+
+def _rmse(model, preprocessor, df: pd.DataFrame) -> float:
+    return mean_squared_error(df['SalePrice'], model.predict(preprocessor.transform(df.drop(columns=['SalePrice']))),
+                              squared=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental vs full retraining")
+    parser.add_argument("--price-shift", type=float, default=0.2, help="Relative SalePrice shift of the new records")
+    parser.add_argument("--new-fraction", type=float, default=0.3, help="Share of train.csv used as new records")
+    parser.add_argument("--history-multiplier", type=int, default=1, help="Repeat the history this many times")
+    args = parser.parse_args()
+
+    df = pd.read_csv(config.raw_data_dir / config.train_file).drop(columns=['Id'])
+    history, new = train_test_split(df, test_size=args.new_fraction, random_state=0)
+    new = new.assign(SalePrice=new['SalePrice'] * (1 + args.price_shift))
+    new_train, new_holdout = train_test_split(new, test_size=config.test_size, random_state=0)
+    history = pd.concat([history] * args.history_multiplier, ignore_index=True)
+    _, history_val = train_test_split(history, test_size=config.test_size, random_state=config.random_state)
+    print(f"history {len(history)} rows, new records {len(new_train)} (+{len(new_holdout)} holdout), "
+          f"price shift {args.price_shift:+.0%}")
+
+    base_model, base_preprocessor = _fit_full(history)
+
+    start = time.perf_counter()
+    full_model, full_preprocessor = _fit_full(pd.concat([history, new_train], ignore_index=True))
+    full_time = time.perf_counter() - start
+
+    # Same steps as train_incremental(): transform with the frozen preprocessor, split, continue boosting
+    start = time.perf_counter()
+    X = base_preprocessor.transform(new_train.drop(columns=['SalePrice']))
+    X_train, X_val, y_train, y_val = train_test_split(X, new_train['SalePrice'].to_numpy(),
+                                                      test_size=config.test_size, random_state=config.random_state)
+    incremental_model = continue_boosting(base_model, X_train, y_train, X_val, y_val)
+    incremental_time = time.perf_counter() - start
+
+    print(f"{'model':>12} | {'retrain':>8} | {'trees':>5} | {'rmse new holdout':>16} | {'rmse history val':>16}")
+    for name, model, preprocessor, seconds in (("base", base_model, base_preprocessor, None),
+                                               ("full", full_model, full_preprocessor, full_time),
+                                               ("incremental", incremental_model, base_preprocessor, incremental_time)):
+        retrain = "-" if seconds is None else f"{seconds:.2f}s"
+        print(f"{name:>12} | {retrain:>8} | {model.best_iteration + 1:>5} | "
+              f"{_rmse(model, preprocessor, new_holdout):16.1f} | {_rmse(model, preprocessor, history_val):16.1f}")
+    print(f"incremental retrain is {full_time / incremental_time:.1f}x faster than a full retrain")
+
+if __name__ == "__main__":
+    main()
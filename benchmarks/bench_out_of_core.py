@@ -0,0 +1,103 @@
+"""
+Compare peak memory and wall time of in-memory and out-of-core training.
+
+A temporary monitoring store is filled with --rows labelled records resampled from
+train.csv (numeric features jittered). Each mode then trains on train.csv + the store in
+a fresh process, so its peak RSS is measured on its own:
+
+- in-memory: everything read into one DataFrame, transformed to one matrix, XGBRegressor.fit
+- quantile: train_out_of_core()'s chunked DataIter feeding QuantileDMatrix (the default)
+- external: the same DataIter feeding external-memory DMatrices paged to disk (--external)
+
+Usage: python benchmarks/bench_out_of_core.py --rows 100000 300000 --chunk-rows 50000
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.config import config
+
+def _fill_store(data_dir: str, n_rows: int):
+    from monitoring.store import MonitoringStore
+    from src.data.preprocessing import preprocess_data
+    train_df = pd.read_csv(config.raw_data_dir / config.train_file).drop(columns=['Id'])
+    _, _, preprocessor = preprocess_data(train_df)
+    numeric, categorical = list(preprocessor.transformers_[0][2]), list(preprocessor.transformers_[1][2])
+    store = MonitoringStore.open(os.path.join(data_dir, config.monitoring_store_dir), numeric + ['SalePrice'],
+                                 categorical, segment_max_rows=100_000)
+    rng = np.random.default_rng(0)
+    for start in range(0, n_rows, 50_000):
+        chunk = train_df.sample(min(50_000, n_rows - start), replace=True, random_state=start)
+        chunk[numeric] = chunk[numeric] * rng.normal(1.0, 0.05, (len(chunk), len(numeric)))
+        store.append_frame(chunk)
+
+def _run(mode: str, data_dir: str, chunk_rows: int, queue):
+    from pathlib import Path
+    import xgboost as xgb
+    from sklearn.metrics import mean_squared_error
+    from src.data.preprocessing import preprocess_data
+    from src.models import train_model
+    config.data_dir = Path(data_dir)
+    start = time.perf_counter()
+    train_df = pd.read_csv(config.raw_data_dir / config.train_file)
+    _, _, preprocessor = preprocess_data(train_df)
+    del train_df
+    store = train_model._training_store(preprocessor)
+    chunks = lambda: train_model._training_chunks(preprocessor, chunk_rows, store)
+
+    if mode == "in-memory":
+        # What train() would do with the monitoring records folded into its DataFrame
+        df = pd.concat(list(chunks()), ignore_index=True)
+        mask = np.concatenate([train_model._holdout_mask(i, len(c)) for i, c in enumerate(chunks())])
+        X = train_model._transform_chunk(preprocessor, df)
+        y = df['SalePrice'].to_numpy()
+        model = xgb.XGBRegressor(**config.xgboost_params, tree_method="hist")
+        model.fit(X[~mask], y[~mask], eval_set=[(X[mask], y[mask])], early_stopping_rounds=10, verbose=False)
+        rmse = mean_squared_error(y[mask], model.predict(X[mask]), squared=False)
+        rows = len(df)
+    else:
+        with tempfile.TemporaryDirectory(dir=data_dir) as page_dir:
+            dtrain, dval = train_model._training_matrices(chunks, preprocessor,
+                                                          page_dir if mode == "external" else None)
+            booster = xgb.train(train_model._booster_params(config.xgboost_params), dtrain,
+                                num_boost_round=config.xgboost_params["n_estimators"],
+                                evals=[(dval, "validation_0")], early_stopping_rounds=10, verbose_eval=False)
+            rmse = float(booster.attributes()["best_score"])
+            rows = dtrain.num_row() + dval.num_row()
+    queue.put({"mode": mode, "rows": rows, "seconds": time.perf_counter() - start, "rmse": rmse,
+               "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024})
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark in-memory vs out-of-core training")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 200_000],
+                        help="Labelled monitoring records to train on (one run per value)")
+    parser.add_argument("--chunk-rows", type=int, default=config.out_of_core_chunk_rows)
+    parser.add_argument("--external", action="store_true", help="Also run the (slow) external-memory mode")
+    args = parser.parse_args()
+    modes = ("in-memory", "quantile", "external") if args.external else ("in-memory", "quantile")
+
+    context = get_context("spawn")
+    print(f"{'records':>9} | {'mode':>11} | {'rows':>9} | {'wall':>7} | {'peak RSS':>9} | {'val rmse':>9}")
+    for n_rows in args.rows:
+        with tempfile.TemporaryDirectory() as data_dir:
+            _fill_store(data_dir, n_rows)
+            for mode in modes:
+                queue = context.Queue()
+                process = context.Process(target=_run, args=(mode, data_dir, args.chunk_rows, queue))
+                process.start()
+                result = queue.get()
+                process.join()
+                print(f"{n_rows:>9} | {mode:>11} | {result['rows']:>9} | {result['seconds']:6.1f}s | "
+                      f"{result['peak_rss_mb']:7.0f}MB | {result['rmse']:9.1f}")
+
+if __name__ == "__main__":
+    main()
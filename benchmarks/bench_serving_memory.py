@@ -0,0 +1,96 @@
+"""
+Compare `uvicorn --workers N` (every worker loads the artifacts) with `serve.py` (load once, fork).
+
+For each mode: cold start (launch until every worker answers) and per-worker RSS / PSS / USS
+from /proc/<pid>/smaps_rollup. PSS splits shared pages between the processes sharing them,
+so the sum of PSS is the real memory footprint. Linux only; requires a trained model.
+
+Usage: python benchmarks/bench_serving_memory.py --workers 4
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _memory(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "uss": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+def _worker_pid(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            info = json.load(response)
+            return info["pid"] if info.get("loaded") else None
+    except Exception:
+        return None
+
+def run(mode: str, workers: int, port: int, timeout: float) -> dict:
+    if mode == "uvicorn":
+        cmd = [sys.executable, "-m", "uvicorn", "src.app.main:app", "--port", str(port), "--workers", str(workers)]
+    else:
+        cmd = [sys.executable, "serve.py", "--port", str(port), "--workers", str(workers)]
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}/model"
+    pids, first_ready = set(), None
+    try:
+        # Concurrent probes so every worker gets to answer at least once
+        with ThreadPoolExecutor(16) as pool:
+            while len(pids) < workers and time.perf_counter() - start < timeout:
+                found = {pid for pid in pool.map(_worker_pid, [url] * 16) if pid is not None}
+                if found and first_ready is None:
+                    first_ready = time.perf_counter() - start
+                pids |= found
+                time.sleep(0.05)
+        all_ready = time.perf_counter() - start
+        if len(pids) < workers:
+            raise RuntimeError(f"{mode}: only {len(pids)}/{workers} workers answered within {timeout}s")
+        time.sleep(2)
+        per_worker = [_memory(pid) for pid in sorted(pids)]
+        parent = _memory(process.pid)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    total_pss = parent["pss"] + sum(m["pss"] for m in per_worker)
+    return {
+        "mode": mode,
+        "first_ready_s": first_ready,
+        "all_ready_s": all_ready,
+        "worker_rss_mb": sum(m["rss"] for m in per_worker) / workers,
+        "worker_pss_mb": sum(m["pss"] for m in per_worker) / workers,
+        "worker_uss_mb": sum(m["uss"] for m in per_worker) / workers,
+        "total_pss_mb": total_pss
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-worker memory and cold start of the serving modes")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=180.0)
+    args = parser.parse_args()
+
+    for mode in ("uvicorn", "preload"):
+        r = run(mode, args.workers, args.port, args.timeout)
+        print(f"{r['mode']:>8}: first worker ready {r['first_ready_s']:5.1f}s | all ready {r['all_ready_s']:5.1f}s | "
+              f"per worker RSS {r['worker_rss_mb']:6.1f} MB, PSS {r['worker_pss_mb']:6.1f} MB, "
+              f"USS {r['worker_uss_mb']:6.1f} MB | total PSS {r['total_pss_mb']:7.1f} MB")
+
+if __name__ == "__main__":
+    main()
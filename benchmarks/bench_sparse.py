@@ -0,0 +1,65 @@
+"""
+Compare the dense and sparse (CSR) preprocessing modes end to end.
+
+Trains one model per mode on the same split, then reports matrix memory, training time,
+validation metrics, prediction differences and batch scoring time on a large resampled file.
+
+Usage: python benchmarks/bench_sparse.py --score-rows 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import xgboost as xgb
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.config import config
+from src.data.preprocessing import preprocess_data
+
+def _nbytes(X) -> int:
+    if sp.issparse(X):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dense vs sparse preprocessing")
+    parser.add_argument("--score-rows", type=int, default=200_000, help="Rows resampled from train.csv for batch scoring")
+    args = parser.parse_args()
+
+    train_df = pd.read_csv(config.raw_data_dir / config.train_file)
+    score_df = train_df.drop(columns=['Id', 'SalePrice']).sample(args.score_rows, replace=True, random_state=0)
+
+    results = {}
+    for mode, sparse in (("dense", False), ("sparse", True)):
+        X, y, preprocessor = preprocess_data(train_df, is_train=True, sparse=sparse)
+        X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=config.test_size,
+                                                          random_state=config.random_state)
+        model = xgb.XGBRegressor(**config.xgboost_params)
+        start = time.perf_counter()
+        model.fit(X_train, y_train, eval_set=[(X_val, y_val)], early_stopping_rounds=10, verbose=False)
+        train_time = time.perf_counter() - start
+        val_pred = model.predict(X_val)
+
+        start = time.perf_counter()
+        X_score = preprocessor.transform(score_df)
+        transformed = time.perf_counter()
+        score_pred = model.predict(X_score)
+        scored = time.perf_counter()
+
+        results[mode] = val_pred, score_pred
+        print(f"{mode:>6}: train matrix {_nbytes(X) / 1e6:7.2f} MB | scoring matrix {_nbytes(X_score) / 1e6:8.1f} MB | "
+              f"fit {train_time:5.2f}s | transform {transformed - start:5.2f}s | predict {scored - transformed:5.2f}s | "
+              f"rmse {mean_squared_error(y_val, val_pred, squared=False):9.1f} | r2 {r2_score(y_val, val_pred):.5f}")
+
+    print(f"Max prediction difference: validation {np.abs(results['dense'][0] - results['sparse'][0]).max():.4g}, "
+          f"scoring {np.abs(results['dense'][1] - results['sparse'][1]).max():.4g}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import math
+import time
+from collections import deque
+
+from src.utils.logger import logger
+
+log = logger.get_logger("monitoring.detectors")
+
+class PageHinkley:
+    """
+    Two-sided Page-Hinkley test for a shift in the mean.
+
+    Tracks the cumulative deviation of each value from the stream's own running mean
+    (minus a tolerance `delta`) and alarms when it moves more than `threshold` away
+    from its extreme, i.e. it detects changes within the stream rather than against
+    a reference. O(1) time and memory per update.
+    """
+
+    def __init__(self, delta: float = 0.1, threshold: float = 50.0, min_samples: int = 30):
+        self.delta = delta
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.mean = 0.0
+        self.sum_up = self.min_up = 0.0
+        self.sum_down = self.max_down = 0.0
+
+    def update(self, value: float) -> bool:
+        self.n += 1
+        self.mean += (value - self.mean) / self.n
+        self.sum_up += value - self.mean - self.delta
+        self.min_up = min(self.min_up, self.sum_up)
+        self.sum_down += value - self.mean + self.delta
+        self.max_down = max(self.max_down, self.sum_down)
+        if self.n < self.min_samples:
+            return False
+        if self.sum_up - self.min_up > self.threshold or self.max_down - self.sum_down > self.threshold:
+            self.reset()
+            return True
+        return False
+
+    def state(self) -> dict:
+        return {"n": self.n, "mean": self.mean,
+                "statistic": max(self.sum_up - self.min_up, self.max_down - self.sum_down)}
+
+class CUSUM:
+    """
+    Two-sided tabular CUSUM on standardized values.
+
+    Accumulates deviations from the reference mean (0 after standardization) beyond
+    the allowance `k`, in standard deviations, in each direction and alarms when
+    either sum exceeds `h`. O(1) time and memory per update.
+    """
+
+    def __init__(self, k: float = 0.5, h: float = 8.0):
+        self.k = k
+        self.h = h
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.upper = 0.0
+        self.lower = 0.0
+
+    def update(self, value: float) -> bool:
+        self.n += 1
+        self.upper = max(0.0, self.upper + value - self.k)
+        self.lower = max(0.0, self.lower - value - self.k)
+        if self.upper > self.h or self.lower > self.h:
+            self.reset()
+            return True
+        return False
+
+    def state(self) -> dict:
+        return {"n": self.n, "upper": self.upper, "lower": self.lower}
+
+class ADWIN:
+    """
+    ADaptive WINdowing (Bifet & Gavalda, 2007).
+
+    Keeps a variable-length window as an exponential histogram of buckets (at most
+    `max_buckets` per power-of-two size), so memory is O(log W). Every `clock` updates
+    it looks for a split where the two sub-windows have significantly different means
+    (confidence `delta`) and drops the older part when it finds one. Amortized cost per
+    update is constant for a fixed clock.
+    """
+
+    def __init__(self, delta: float = 0.002, max_buckets: int = 5, clock: int = 32, min_window: int = 10):
+        self.delta = delta
+        self.max_buckets = max_buckets
+        self.clock = clock
+        self.min_window = min_window
+        self.reset()
+
+    def reset(self):
+        # Buckets ordered oldest -> newest as [size, total, variance]
+        self.buckets = []
+        self.width = 0
+        self.total = 0.0
+        self.variance = 0.0
+        self._ticks = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.width if self.width else 0.0
+
+    def update(self, value: float) -> bool:
+        # Incremental variance of the whole window
+        if self.width:
+            self.variance += self.width * (value - self.mean) ** 2 / (self.width + 1)
+        self.width += 1
+        self.total += value
+        self.buckets.append([1, value, 0.0])
+        self._compress()
+
+        self._ticks += 1
+        if self._ticks % self.clock != 0 or self.width < 2 * self.min_window:
+            return False
+        return self._detect()
+
+    def _compress(self):
+        # Merge the two oldest buckets of any size that has more than max_buckets entries
+        i = len(self.buckets) - 1
+        while i > 0:
+            size = self.buckets[i][0]
+            j = i
+            while j >= 0 and self.buckets[j][0] == size:
+                j -= 1
+            if i - j > self.max_buckets:
+                older, newer = self.buckets[j + 1], self.buckets[j + 2]
+                n1, n2 = older[0], newer[0]
+                mean_gap = older[1] / n1 - newer[1] / n2
+                merged = [n1 + n2, older[1] + newer[1], older[2] + newer[2] + n1 * n2 / (n1 + n2) * mean_gap ** 2]
+                self.buckets[j + 1:j + 3] = [merged]
+                i = j + 1
+            else:
+                i = j
+
+    def _detect(self) -> bool:
+        changed = False
+        while True:
+            n0, total0 = 0, 0.0
+            cut = False
+            variance = self.variance / self.width
+            delta_prime = self.delta / math.log(self.width)
+            for size, bucket_total, _ in self.buckets[:-1]:
+                n0 += size
+                total0 += bucket_total
+                n1 = self.width - n0
+                if n0 < self.min_window or n1 < self.min_window:
+                    continue
+                m = 1.0 / (1.0 / n0 + 1.0 / n1)
+                log_term = math.log(2.0 / delta_prime)
+                epsilon = math.sqrt(2.0 / m * variance * log_term) + 2.0 / (3.0 * m) * log_term
+                if abs(total0 / n0 - (self.total - total0) / n1) > epsilon:
+                    cut = True
+                    break
+            if not cut:
+                return changed
+            self._drop_oldest()
+            changed = True
+
+    def _drop_oldest(self):
+        size, bucket_total, bucket_variance = self.buckets.pop(0)
+        bucket_mean = bucket_total / size
+        self.width -= size
+        self.total -= bucket_total
+        if self.width:
+            self.variance -= bucket_variance + size * self.width / (size + self.width) * (bucket_mean - self.mean) ** 2
+            self.variance = max(self.variance, 0.0)
+        else:
+            self.variance = 0.0
+
+    def state(self) -> dict:
+        return {"width": self.width, "mean": self.mean, "buckets": len(self.buckets)}
+
+DETECTORS = {
+    "adwin": ADWIN,
+    "page_hinkley": PageHinkley,
+    "cusum": CUSUM
+}
+
+def make_detector(name: str, **params):
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown detector '{name}', expected one of {sorted(DETECTORS)}")
+    return DETECTORS[name](**params)
+
+class SequentialMonitor:
+    """
+    Online change detection on selected streams of the monitoring records.
+
+    `streams` maps a stream name to a detector name (see DETECTORS) or to
+    (detector name, params). A stream is either a record field (the target or a
+    feature) or "residual" (target minus prediction). Values are standardized with
+    the given reference (mean, std) when available, otherwise with estimates from
+    the first `warmup` values, so detector thresholds are in standard deviations.
+    """
+
+    def __init__(self, streams: dict, references: dict = None, warmup: int = 50, history_size: int = 1000):
+        self.detectors = {}
+        for stream, spec in streams.items():
+            name, params = (spec, {}) if isinstance(spec, str) else spec
+            self.detectors[stream] = (name, make_detector(name, **params))
+        self.references = dict(references or {})
+        self.warmup = warmup
+        self._warmup_values = {stream: [] for stream in self.detectors if stream not in self.references}
+        self.alarms = deque(maxlen=history_size)
+
+    def _value(self, stream: str, record: dict, prediction):
+        if stream == "residual":
+            if prediction is None or record.get("SalePrice") is None:
+                return None
+            return float(record["SalePrice"]) - float(prediction)
+        try:
+            value = float(record.get(stream))
+        except (TypeError, ValueError):
+            return None
+        return None if math.isnan(value) else value
+
+    def _standardize(self, stream: str, value: float):
+        if stream not in self.references:
+            values = self._warmup_values[stream]
+            values.append(value)
+            if len(values) < self.warmup:
+                return None
+            mean = sum(values) / len(values)
+            std = math.sqrt(sum((v - mean) ** 2 for v in values) / max(len(values) - 1, 1))
+            self.references[stream] = (mean, std)
+            del self._warmup_values[stream]
+        mean, std = self.references[stream]
+        return (value - mean) / std if std > 0 else value - mean
+
+    def update(self, record: dict, prediction: float = None) -> list:
+        """Feed one record to every detector; returns the names of streams that raised an alarm."""
+        alarmed = []
+        for stream, (name, detector) in self.detectors.items():
+            value = self._value(stream, record, prediction)
+            if value is None:
+                continue
+            z = self._standardize(stream, value)
+            if z is None:
+                continue
+            if detector.update(z):
+                alarmed.append(stream)
+                self.alarms.append({"time": time.time(), "stream": stream, "detector": name})
+                log.warning(f"Sequential change detected on '{stream}' by {name}")
+        return alarmed
+
+    def state(self) -> dict:
+        return {
+            "streams": {stream: {"detector": name, **detector.state()}
+                        for stream, (name, detector) in self.detectors.items()},
+            "alarms": list(self.alarms)
+        }
@@ -0,0 +1,231 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from src.data.reference_profile import MISSING_CATEGORY, ReferenceProfile, bin_values
+from src.utils.config import config
+
+CORRECTIONS = ("fdr_bh", "bonferroni", "none")
+
+_PSI_EPSILON = 1e-4
+
+def adjust_p_values(p_values: np.ndarray, method: str = "fdr_bh") -> np.ndarray:
+    """Multiple-testing correction: Benjamini-Hochberg FDR, Bonferroni or none."""
+    p_values = np.asarray(p_values, dtype=np.float64)
+    n = len(p_values)
+    if n == 0 or method == "none":
+        return p_values
+    if method == "bonferroni":
+        return np.minimum(p_values * n, 1.0)
+    if method == "fdr_bh":
+        order = np.argsort(p_values)
+        ranked = p_values[order] * n / np.arange(1, n + 1)
+        # Enforce monotonicity from the largest p-value down
+        ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+        adjusted = np.empty(n)
+        adjusted[order] = np.minimum(ranked, 1.0)
+        return adjusted
+    raise ValueError(f"Unknown correction '{method}', expected one of {CORRECTIONS}")
+
+def _psi(reference: np.ndarray, current: np.ndarray) -> np.ndarray:
+    """Population stability index per row of two (features x buckets) count matrices."""
+    ref = reference / np.maximum(reference.sum(axis=1, keepdims=True), 1)
+    cur = current / np.maximum(current.sum(axis=1, keepdims=True), 1)
+    ref = np.clip(ref, _PSI_EPSILON, None)
+    cur = np.clip(cur, _PSI_EPSILON, None)
+    return ((cur - ref) * np.log(cur / ref)).sum(axis=1)
+
+class DriftReport:
+    """Per-feature drift statistics plus the overall decision."""
+
+    def __init__(self, features: pd.DataFrame, alpha: float, correction: str):
+        self.features = features
+        self.alpha = alpha
+        self.correction = correction
+
+    @property
+    def drifted_features(self) -> List[str]:
+        return self.features.loc[self.features["drifted"], "feature"].tolist()
+
+    @property
+    def drift_detected(self) -> bool:
+        return bool(self.features["drifted"].any())
+
+    def to_dict(self) -> dict:
+        return {
+            "drift_detected": self.drift_detected,
+            "n_features": len(self.features),
+            "n_drifted": len(self.drifted_features),
+            "alpha": self.alpha,
+            "correction": self.correction,
+            "features": self.features.sort_values("p_adjusted").replace({np.nan: None}).to_dict(orient="records")
+        }
+
+class DriftEngine:
+    """
+    Vectorized drift tests for every profiled feature.
+
+    Rows are first encoded into bucket codes: numeric values into the reference
+    quantile bins (plus a trailing 'missing' bucket), categoricals into reference
+    level indices (plus a trailing 'unseen' bucket). All bucket counts are then
+    produced by a single bincount, and the tests run on (features x buckets) matrices:
+    binned KS and Wasserstein-1 for numerics, two-sample chi-square for categoricals,
+    and PSI for both. P-values are corrected for multiple testing across features.
+    """
+
+    def __init__(self, profile: ReferenceProfile, numeric_features=None, categorical_features=None):
+        self.profile = profile
+        self.numeric_features = list(numeric_features) if numeric_features is not None else \
+            [c for c in profile.numeric_columns if c != 'SalePrice']
+        self.categorical_features = list(categorical_features) if categorical_features is not None else \
+            list(profile.categorical_columns)
+
+        # Numeric: (k, B + 1) edges and (k, B) reference counts; every column shares B
+        self.edges = np.vstack([profile.edges(c) for c in self.numeric_features]) if self.numeric_features \
+            else np.zeros((0, 2))
+        self.n_bins = self.edges.shape[1] - 1
+        self.numeric_reference = np.vstack([profile.counts(c) for c in self.numeric_features]) \
+            if self.numeric_features else np.zeros((0, self.n_bins))
+        self.centers = (self.edges[:, :-1] + self.edges[:, 1:]) / 2
+        self.reference_std = np.array([profile.sorted_values(c).std() for c in self.numeric_features])
+
+        # Categorical: levels padded to the widest column, last slot collects unseen levels
+        self.levels = [profile.levels(c) for c in self.categorical_features]
+        self.level_index = [{str(level): i for i, level in enumerate(levels)} for levels in self.levels]
+        self.n_slots = max((len(levels) for levels in self.levels), default=0) + 1
+        self.categorical_reference = np.zeros((len(self.categorical_features), self.n_slots), dtype=np.int64)
+        for row, column in enumerate(self.categorical_features):
+            counts = profile.level_counts(column)
+            self.categorical_reference[row, :len(counts)] = counts
+
+    @property
+    def features(self) -> List[str]:
+        return self.numeric_features + self.categorical_features
+
+    def encode(self, df: pd.DataFrame):
+        """Encode a frame into (n, k_num) numeric and (n, k_cat) categorical bucket codes."""
+        n = len(df)
+        # Column-major so each feature's codes are written contiguously
+        numeric_codes = np.empty((n, len(self.numeric_features)), dtype=np.int32, order="F")
+        for j, column in enumerate(self.numeric_features):
+            values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64) if column in df \
+                else np.full(n, np.nan)
+            codes = bin_values(self.edges[j], values)
+            codes[np.isnan(values)] = self.n_bins
+            numeric_codes[:, j] = codes
+
+        unseen = self.n_slots - 1
+        categorical_codes = np.empty((n, len(self.categorical_features)), dtype=np.int32, order="F")
+        for j, column in enumerate(self.categorical_features):
+            missing_code = self.level_index[j].get(MISSING_CATEGORY, unseen)
+            if column not in df:
+                categorical_codes[:, j] = missing_code
+                continue
+            # Hash the column once, then map the (few) distinct values to reference levels;
+            # the trailing lookup entry catches factorize's -1 for missing values
+            codes, uniques = pd.factorize(df[column])
+            lookup = np.array([self.level_index[j].get(str(u), unseen) for u in uniques] + [missing_code],
+                              dtype=np.int32)
+            categorical_codes[:, j] = lookup[codes]
+        return numeric_codes, categorical_codes
+
+    def encode_record(self, record: dict):
+        """Pure-python encoding of a single record, for streaming updates."""
+        numeric_codes = np.empty(len(self.numeric_features), dtype=np.int32)
+        for j, column in enumerate(self.numeric_features):
+            try:
+                value = float(record.get(column))
+            except (TypeError, ValueError):
+                value = np.nan
+            numeric_codes[j] = self.n_bins if np.isnan(value) else bin_values(self.edges[j], value)
+
+        unseen = self.n_slots - 1
+        categorical_codes = np.empty(len(self.categorical_features), dtype=np.int32)
+        for j, column in enumerate(self.categorical_features):
+            value = record.get(column)
+            if value is None or (isinstance(value, float) and np.isnan(value)):
+                value = MISSING_CATEGORY
+            categorical_codes[j] = self.level_index[j].get(str(value), unseen)
+        return numeric_codes, categorical_codes
+
+    def count(self, numeric_codes: np.ndarray, categorical_codes: np.ndarray):
+        """Bucket counts for all features at once: one offset bincount per feature family."""
+        numeric_counts = self._bincount(numeric_codes, self.n_bins + 1)
+        categorical_counts = self._bincount(categorical_codes, self.n_slots)
+        return numeric_counts, categorical_counts
+
+    @staticmethod
+    def _bincount(codes: np.ndarray, width: int) -> np.ndarray:
+        k = codes.shape[1] if codes.ndim == 2 else len(codes)
+        offsets = np.arange(k, dtype=np.int64) * width
+        flat = (np.atleast_2d(codes) + offsets).ravel()
+        return np.bincount(flat, minlength=k * width).reshape(k, width)
+
+    def empty_counts(self):
+        return (np.zeros((len(self.numeric_features), self.n_bins + 1), dtype=np.int64),
+                np.zeros((len(self.categorical_features), self.n_slots), dtype=np.int64))
+
+    def evaluate(self, numeric_counts: np.ndarray, categorical_counts: np.ndarray,
+                 alpha: float = None, correction: str = None) -> DriftReport:
+        """Run all tests on bucket counts (as produced by `count`)."""
+        from scipy import stats
+
+        alpha = config.drift_threshold if alpha is None else alpha
+        correction = correction or config.drift_correction
+
+        # Numeric: drop the trailing 'missing' bucket
+        current = numeric_counts[:, :self.n_bins].astype(np.float64)
+        reference = self.numeric_reference.astype(np.float64)
+        n_cur = current.sum(axis=1)
+        n_ref = reference.sum(axis=1)
+        cdf_cur = np.cumsum(current, axis=1) / np.maximum(n_cur, 1)[:, None]
+        cdf_ref = np.cumsum(reference, axis=1) / np.maximum(n_ref, 1)[:, None]
+        cdf_gap = np.abs(cdf_ref - cdf_cur)
+        ks = cdf_gap.max(axis=1) if self.n_bins else np.zeros(len(current))
+        effective_n = n_ref * n_cur / np.maximum(n_ref + n_cur, 1)
+        ks_p = np.where(n_cur > 0, stats.kstwobign.sf(ks * np.sqrt(effective_n)), 1.0)
+        wasserstein = (cdf_gap[:, :-1] * np.diff(self.centers, axis=1)).sum(axis=1)
+        numeric_psi = _psi(reference, current)
+
+        # Categorical: two-sample chi-square on the (reference, current) contingency table.
+        # Levels expected fewer than 5 times in the current sample (and unseen levels) are pooled
+        # into one bucket, otherwise a single rare level dominates the statistic on small windows.
+        ref_cat = self.categorical_reference.astype(np.float64)
+        cur_cat = categorical_counts.astype(np.float64)
+        n_cat = cur_cat.sum(axis=1)
+        ref_share = ref_cat / np.maximum(ref_cat.sum(axis=1, keepdims=True), 1)
+        rare = ref_share * n_cat[:, None] < 5
+        ref_cat = np.hstack([np.where(rare, 0.0, ref_cat), (ref_cat * rare).sum(axis=1, keepdims=True)])
+        cur_cat = np.hstack([np.where(rare, 0.0, cur_cat), (cur_cat * rare).sum(axis=1, keepdims=True)])
+        totals = ref_cat + cur_cat
+        grand = totals.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            expected_ref = totals * ref_cat.sum(axis=1, keepdims=True) / grand
+            expected_cur = totals * cur_cat.sum(axis=1, keepdims=True) / grand
+            chi2 = np.where(totals > 0, (ref_cat - expected_ref) ** 2 / expected_ref
+                            + (cur_cat - expected_cur) ** 2 / expected_cur, 0.0).sum(axis=1)
+        dof = np.maximum((totals > 0).sum(axis=1) - 1, 1)
+        chi2_p = np.where(n_cat > 0, stats.chi2.sf(chi2, dof), 1.0)
+        categorical_psi = _psi(self.categorical_reference.astype(np.float64), categorical_counts.astype(np.float64))
+
+        p_values = np.concatenate([ks_p, chi2_p])
+        p_adjusted = adjust_p_values(p_values, correction)
+        report = pd.DataFrame({
+            "feature": self.features,
+            "kind": ["numeric"] * len(self.numeric_features) + ["categorical"] * len(self.categorical_features),
+            "test": ["ks"] * len(self.numeric_features) + ["chi2"] * len(self.categorical_features),
+            "statistic": np.concatenate([ks, chi2]),
+            "p_value": p_values,
+            "p_adjusted": p_adjusted,
+            "psi": np.concatenate([numeric_psi, categorical_psi]),
+            "wasserstein": np.concatenate([wasserstein, np.full(len(self.categorical_features), np.nan)]),
+            "wasserstein_std": np.concatenate([wasserstein / np.where(self.reference_std > 0, self.reference_std, 1.0),
+                                               np.full(len(self.categorical_features), np.nan)]),
+            "n": np.concatenate([n_cur, n_cat]).astype(np.int64),
+            "drifted": p_adjusted < alpha
+        })
+        return DriftReport(report, alpha, correction)
+
+    def evaluate_frame(self, df: pd.DataFrame, alpha: float = None, correction: str = None) -> DriftReport:
+        return self.evaluate(*self.count(*self.encode(df)), alpha=alpha, correction=correction)
@@ -0,0 +1,205 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+from src.data.reference_profile import ReferenceProfile, bin_values
+from src.utils.logger import logger
+
+log = logger.get_logger("monitoring.drift_state")
+
+# Layout of the per-feature running statistics vector
+_N, _MISSING, _MEAN, _M2, _MIN, _MAX = range(6)
+
+def ks_from_counts(reference_counts: np.ndarray, current_counts: np.ndarray):
+    """Two-sample KS statistic and asymptotic p-value computed on shared histogram bins."""
+    from scipy import stats
+
+    n_ref = reference_counts.sum()
+    n_cur = current_counts.sum()
+    if n_ref == 0 or n_cur == 0:
+        return 0.0, 1.0
+    ref_cdf = np.cumsum(reference_counts) / n_ref
+    cur_cdf = np.cumsum(current_counts) / n_cur
+    statistic = float(np.max(np.abs(ref_cdf - cur_cdf)))
+    effective_n = n_ref * n_cur / (n_ref + n_cur)
+    p_value = float(stats.kstwobign.sf(statistic * np.sqrt(effective_n)))
+    return statistic, p_value
+
+class DriftState:
+    """
+    Streaming drift statistics for monitored features.
+
+    For every feature it keeps histogram counts over fixed bins derived from the
+    reference distribution, running count / missing count / mean / variance (Welford)
+    and min / max. Drift decisions and quantile estimates are computed from this state,
+    so the monitoring history never has to be re-read. The state can be checkpointed
+    to an .npz file and restored after a restart.
+
+    With a DriftEngine attached, bucket counts for every profiled input feature are
+    accumulated as well, so the multi-feature report can be produced from the state.
+    """
+
+    def __init__(self, edges: Dict[str, np.ndarray], reference_counts: Dict[str, np.ndarray], engine=None):
+        self.edges = {name: np.asarray(e, dtype=np.float64) for name, e in edges.items()}
+        self.reference_counts = {name: np.asarray(c, dtype=np.int64) for name, c in reference_counts.items()}
+        self.counts = {name: np.zeros(len(e) - 1, dtype=np.int64) for name, e in self.edges.items()}
+        self.stats = {name: np.array([0, 0, 0.0, 0.0, np.inf, -np.inf]) for name in self.edges}
+        self.n_records = 0
+
+        self.engine = engine
+        self.feature_counts = engine.empty_counts() if engine is not None else None
+
+    @classmethod
+    def from_reference(cls, reference: Dict[str, np.ndarray], n_bins: int = 64) -> "DriftState":
+        """Build bins from reference quantiles so every bucket holds roughly the same reference mass."""
+        edges, reference_counts = {}, {}
+        for name, values in reference.items():
+            values = np.asarray(values, dtype=np.float64)
+            values = values[~np.isnan(values)]
+            feature_edges = np.quantile(values, np.linspace(0.0, 1.0, n_bins + 1))
+            edges[name] = feature_edges
+            reference_counts[name] = np.bincount(bin_values(feature_edges, values), minlength=n_bins)
+        return cls(edges, reference_counts)
+
+    @classmethod
+    def from_profile(cls, profile: ReferenceProfile, features, engine=None) -> "DriftState":
+        """Reuse the bins and reference histograms precomputed at training time."""
+        return cls(
+            {name: profile.edges(name) for name in features},
+            {name: profile.counts(name) for name in features},
+            engine=engine
+        )
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the reference the bins were built from, so stale checkpoints can be detected."""
+        digest = hashlib.sha1()
+        for name in sorted(self.edges):
+            digest.update(name.encode())
+            digest.update(self.edges[name].tobytes())
+            digest.update(self.reference_counts[name].tobytes())
+        if self.engine is not None:
+            digest.update(",".join(self.engine.features).encode())
+            digest.update(self.engine.edges.tobytes())
+            digest.update(self.engine.categorical_reference.tobytes())
+        return digest.hexdigest()
+
+    def update(self, record: dict):
+        """Fold one record into the running statistics (O(features))."""
+        self._update_tracked(record)
+        if self.engine is not None:
+            numeric_codes, categorical_codes = self.engine.encode_record(record)
+            numeric_counts, categorical_counts = self.feature_counts
+            numeric_counts[np.arange(len(numeric_codes)), numeric_codes] += 1
+            categorical_counts[np.arange(len(categorical_codes)), categorical_codes] += 1
+
+    def update_frame(self, df):
+        """Fold a batch of records in; per-feature bucket counts are computed in one vectorized pass."""
+        for record in df.to_dict(orient="records"):
+            self._update_tracked(record)
+        if self.engine is not None:
+            numeric_counts, categorical_counts = self.engine.count(*self.engine.encode(df))
+            self.feature_counts[0][:] += numeric_counts
+            self.feature_counts[1][:] += categorical_counts
+
+    def _update_tracked(self, record: dict):
+        self.n_records += 1
+        for name, feature_edges in self.edges.items():
+            stats = self.stats[name]
+            try:
+                value = float(record.get(name))
+            except (TypeError, ValueError):
+                value = np.nan
+            if np.isnan(value):
+                stats[_MISSING] += 1
+                continue
+
+            self.counts[name][bin_values(feature_edges, value)] += 1
+            stats[_N] += 1
+            delta = value - stats[_MEAN]
+            stats[_MEAN] += delta / stats[_N]
+            stats[_M2] += delta * (value - stats[_MEAN])
+            stats[_MIN] = min(stats[_MIN], value)
+            stats[_MAX] = max(stats[_MAX], value)
+
+    def summary(self, name: str) -> dict:
+        stats = self.stats[name]
+        n = int(stats[_N])
+        return {
+            "count": n,
+            "missing": int(stats[_MISSING]),
+            "mean": float(stats[_MEAN]) if n else None,
+            "std": float(np.sqrt(stats[_M2] / (n - 1))) if n > 1 else None,
+            "min": float(stats[_MIN]) if n else None,
+            "max": float(stats[_MAX]) if n else None,
+            "median": self.quantile(name, 0.5)
+        }
+
+    def quantile(self, name: str, q: float):
+        """Approximate quantile by linear interpolation inside the histogram bins."""
+        counts = self.counts[name]
+        total = counts.sum()
+        if total == 0:
+            return None
+        stats = self.stats[name]
+        # Clamp the open-ended outer buckets to the observed range
+        edges = self.edges[name].copy()
+        edges[0] = min(edges[0], stats[_MIN])
+        edges[-1] = max(edges[-1], stats[_MAX])
+        cumulative = np.concatenate(([0], np.cumsum(counts))) / total
+        return float(np.interp(q, cumulative, edges))
+
+    def detect_drift(self, name: str, threshold: float = 0.05):
+        """KS test of the accumulated stream against the reference, on the shared bins."""
+        statistic, p_value = ks_from_counts(self.reference_counts[name], self.counts[name])
+        return p_value < threshold, p_value
+
+    def feature_report(self, alpha: float = None, correction: str = None):
+        """Multi-feature drift report over everything accumulated so far (requires an engine)."""
+        if self.engine is None:
+            return None
+        return self.engine.evaluate(*self.feature_counts, alpha=alpha, correction=correction)
+
+    def save(self, path: Path):
+        """Checkpoint atomically (write to a temp file, then rename over the old checkpoint)."""
+        arrays = {"n_records": np.array(self.n_records), "features": np.array(sorted(self.edges))}
+        for name in self.edges:
+            arrays[f"edges__{name}"] = self.edges[name]
+            arrays[f"reference__{name}"] = self.reference_counts[name]
+            arrays[f"counts__{name}"] = self.counts[name]
+            arrays[f"stats__{name}"] = self.stats[name]
+        if self.feature_counts is not None:
+            arrays["feature_numeric_counts"], arrays["feature_categorical_counts"] = self.feature_counts
+
+        path = Path(path)
+        tmp_path = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        log.info(f"Drift state checkpointed to {path} ({self.n_records} records)")
+
+    @classmethod
+    def load(cls, path: Path, engine=None) -> "DriftState":
+        with np.load(path, allow_pickle=False) as data:
+            names = [str(name) for name in data["features"]]
+            state = cls(
+                {name: data[f"edges__{name}"] for name in names},
+                {name: data[f"reference__{name}"] for name in names},
+                engine=engine
+            )
+            for name in names:
+                state.counts[name] = data[f"counts__{name}"].astype(np.int64)
+                state.stats[name] = data[f"stats__{name}"].astype(np.float64)
+            state.n_records = int(data["n_records"])
+
+            if engine is not None:
+                if "feature_numeric_counts" not in data.files:
+                    raise ValueError("checkpoint has no per-feature counts")
+                feature_counts = (data["feature_numeric_counts"].astype(np.int64),
+                                  data["feature_categorical_counts"].astype(np.int64))
+                if [c.shape for c in feature_counts] != [c.shape for c in state.feature_counts]:
+                    raise ValueError("checkpoint per-feature counts do not match the current profile")
+                state.feature_counts = feature_counts
+        return state
@@ -1,39 +1,66 @@
 import numpy as np
 import pandas as pd
-from scipy import stats
 import sys
 import os
 import argparse
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Training (and with it mlflow / matplotlib) and scipy.stats are imported on first use,
+# so the API process that imports this module only loads what inference needs
 try:
-    from run_pipeline import main as train_pipeline
     from src.utils.logger import logger
     from src.utils.config import config
+    from src.data.reference_profile import ReferenceProfile
+    from src.models.registry import artifact_path
+    from monitoring.drift_state import DriftState
+    from monitoring.drift_engine import DriftEngine
+    from monitoring.windows import WindowedDriftDetector
+    from monitoring.detectors import SequentialMonitor
+    from monitoring.scheduler import RetrainScheduler
+    from monitoring.store import MonitoringStore
+    from src.utils.metrics import registry
 except ImportError as e:
-    print(f"Error: Could not import run_pipeline. Make sure you are in the project root or monitoring directory.\nDetail: {e}")
+    print(f"Error: Could not import project modules. Make sure you are in the project root or monitoring directory.\nDetail: {e}")
     sys.exit(1)
 
 log = logger.get_logger("monitoring")
 
-def generate_data(n_samples=1000, drift=False):
+monitoring_records = registry.counter("monitoring_records_total", "Labelled records appended to the monitoring store")
+drift_checks = registry.counter("monitoring_drift_checks_total",
+                                "Drift decisions on labelled records, by decision strategy and result",
+                                ["decision", "result"])
+retrain_requests = registry.counter("monitoring_retrain_requests_total",
+                                    "Retraining requests after detected drift, by scheduler outcome", ["outcome"])
+check_seconds = registry.histogram("monitoring_check_duration_seconds",
+                                   "Time to store one labelled record and run the drift checks")
+
+def generate_data(n_samples=1000, drift=False, reference=None, seed=None):
     """
     Generate dummy feature data.
+
+    With a reference the batch is resampled from it, so it only differs from the
+    reference when drift is simulated.
     """
-    if drift:
-        # Simulate drift: Mean shift from 0 to 2, Std dev change from 1 to 1.5
-        data = np.random.normal(loc=2.0, scale=1.5, size=n_samples)
-    else:
+    rng = np.random.default_rng(seed)
+    if reference is None:
         # Reference distribution: Standard Normal
-        data = np.random.normal(loc=0.0, scale=1.0, size=n_samples)
-    
+        reference = rng.normal(loc=0.0, scale=1.0, size=max(n_samples, 1000))
+    reference = np.asarray(reference, dtype=float)
+    data = rng.choice(reference, size=n_samples, replace=True)
+
+    if drift:
+        # Simulate drift: Mean shift of 2 std devs, spread scaled by 1.5
+        mean, std = reference.mean(), reference.std()
+        data = mean + (data - mean) * 1.5 + 2.0 * std
+
     return data
 
 def detect_drift(reference_data, current_data, threshold=0.05):
     """
     Perform Kolmogorov-Smirnov test to detect data drift.
     """
+    from scipy import stats
     statistic, p_value = stats.ks_2samp(reference_data, current_data)
     
     log.info(f"drift check: p-value={p_value:.5f}, threshold={threshold}")
@@ -42,59 +69,321 @@ def detect_drift(reference_data, current_data, threshold=0.05):
         return True, p_value
     return False, p_value
 
+_reference_profile = None
+_reference_profile_key = None
+
+def load_reference_profile():
+    """
+    Return the reference profile saved at training time, loading it at most once per model.
+
+    The profile belongs to the current model version, and the cache is keyed on its path
+    and modification time, so promoting a new model invalidates it automatically.
+    """
+    global _reference_profile, _reference_profile_key
+    profile_path = artifact_path(config.reference_profile_file)
+    try:
+        stat = profile_path.stat()
+    except FileNotFoundError:
+        return None
+
+    key = (str(profile_path), stat.st_mtime_ns, stat.st_size)
+    if _reference_profile is None or key != _reference_profile_key:
+        log.info(f"Loading reference profile from {profile_path}")
+        _reference_profile = ReferenceProfile.load(profile_path)
+        _reference_profile_key = key
+    return _reference_profile
+
+def invalidate_reference_cache():
+    """Drop the cached reference profile (e.g. right after a new model is promoted)."""
+    global _reference_profile, _reference_profile_key
+    _reference_profile = None
+    _reference_profile_key = None
+
 def load_reference_data():
     """Load reference data (training data) for drift detection."""
-    # In a real scenario, this should load the actual training data used for the model
-    # For now, we simulate it or load a sample if available
-    train_path = config.data_dir / config.train_file
+    profile = load_reference_profile()
+    if profile is not None:
+        return profile.sorted_values('SalePrice')
+
+    # No profile yet (model trained before profiles existed): fall back to the raw training data
+    train_path = config.raw_data_dir / config.train_file
     if train_path.exists():
          df = pd.read_csv(train_path)
          # Assuming 'SalePrice' is the target, we might monitor features or the target itself.
          # For simplicity, let's return SalePrice as the reference
          return df['SalePrice'].values
-    return generate_data(n_samples=1000, drift=False)
+    return generate_data(n_samples=1000, drift=False, seed=0)
+
+_drift_engine = None
+_drift_state = None
+_drift_state_profile = None
+_records_since_checkpoint = 0
+_last_feature_report = None
+_window_detector = None
+_sequential_monitor = None
+_sequential_profile = None
+_retrain_scheduler = None
+_monitoring_store = None
+
+def get_drift_engine():
+    """Multi-feature drift engine for the current reference profile (None without a profile)."""
+    global _drift_engine
+    profile = load_reference_profile()
+    if profile is None:
+        return None
+    if _drift_engine is None or _drift_engine.profile is not profile:
+        _drift_engine = DriftEngine(profile)
+    return _drift_engine
+
+def detect_feature_drift(current_df, alpha=None, correction=None):
+    """
+    Test every input feature of `current_df` against the reference profile.
+
+    Returns a DriftReport with KS / Wasserstein (numeric) or chi-square (categorical),
+    PSI and multiple-testing-corrected p-values per feature.
+    """
+    engine = get_drift_engine()
+    if engine is None:
+        raise RuntimeError("No reference profile found. Train the model first.")
+    return engine.evaluate_frame(current_df, alpha=alpha, correction=correction)
+
+def get_last_feature_report():
+    """Most recent per-feature drift report computed by check_and_retrain, if any."""
+    return _last_feature_report
+
+def get_window_detector():
+    """
+    Windowed drift detector (target and all inputs) over the most recent records.
+
+    Rebuilt, with an empty window, when a new reference profile is promoted.
+    """
+    global _window_detector
+    profile = load_reference_profile()
+    if profile is None:
+        return None
+    if _window_detector is None or _window_detector.engine.profile is not profile:
+        engine = DriftEngine(profile, numeric_features=profile.numeric_columns)
+        _window_detector = WindowedDriftDetector(
+            engine,
+            mode=config.drift_window_mode,
+            size=config.drift_window_size,
+            stride=config.drift_window_stride,
+            capacity=config.drift_window_capacity,
+            history_size=config.drift_window_history
+        )
+    return _window_detector
+
+def get_sequential_monitor():
+    """
+    Online change detectors (ADWIN / Page-Hinkley / CUSUM) on the streams in config.sequential_detectors.
 
-def check_and_retrain(new_data_point):
+    Target and feature streams are standardized with the reference profile's mean and std;
+    residuals (and everything when there is no profile) with a warm-up estimate.
+    """
+    global _sequential_monitor, _sequential_profile
+    profile = load_reference_profile()
+    if _sequential_monitor is None or profile is not _sequential_profile:
+        references = {}
+        if profile is not None:
+            for stream in config.sequential_detectors:
+                if stream in profile.numeric_columns:
+                    values = profile.sorted_values(stream).astype(np.float64)
+                    references[stream] = (float(values.mean()), float(values.std()))
+        _sequential_monitor = SequentialMonitor(
+            config.sequential_detectors,
+            references=references,
+            warmup=config.sequential_warmup
+        )
+        _sequential_profile = profile
+    return _sequential_monitor
+
+def get_retrain_scheduler():
+    """Process-wide retraining scheduler; drift checks request retrains through it."""
+    global _retrain_scheduler
+    if _retrain_scheduler is None:
+        _retrain_scheduler = RetrainScheduler()
+    return _retrain_scheduler
+
+def tick_windows(now=None):
+    """Close the time window that expired by `now` even if no record arrived since (see MonitoringWorker)."""
+    detector = _window_detector
+    if detector is not None:
+        detector.tick(now)
+
+def get_window_history():
+    """One summary per evaluated drift window, oldest first."""
+    detector = _window_detector
+    return list(detector.history) if detector is not None else []
+
+def _monitoring_schema():
+    """Input columns of the trained preprocessor (numeric, categorical), with the target added to the numerics."""
+    import joblib
+    preprocessor_path = artifact_path(config.preprocessor_file)
+    if not preprocessor_path.exists():
+        raise RuntimeError("No preprocessor found. Train the model first.")
+    columns = {name: list(cols) for name, _, cols in joblib.load(preprocessor_path).transformers_
+               if name != "remainder"}
+    return columns["num"] + ['SalePrice'], columns["cat"]
+
+def _migrate_csv(store, csv_path):
+    """Append the legacy monitoring CSV to the store (in chunks) and rename it so it is imported once."""
+    log.info(f"Migrating {csv_path} into the monitoring store...")
+    dtype = {column: object for column in store.categorical_columns}
+    n_rows = 0
+    for chunk in pd.read_csv(csv_path, chunksize=50_000, dtype=dtype, on_bad_lines="warn"):
+        store.append_frame(chunk)
+        n_rows += len(chunk)
+    os.replace(csv_path, csv_path.with_name(csv_path.name + ".migrated"))
+    log.info(f"Migrated {n_rows} monitoring record(s)")
+
+def get_monitoring_store():
+    """Append-only monitoring log with the trained preprocessor's schema (created on first use)."""
+    global _monitoring_store
+    if _monitoring_store is None:
+        numeric_columns, categorical_columns = _monitoring_schema()
+        store = MonitoringStore.open(config.data_dir / config.monitoring_store_dir, numeric_columns,
+                                     categorical_columns)
+        legacy_path = config.data_dir / config.monitoring_data
+        if legacy_path.exists():
+            _migrate_csv(store, legacy_path)
+        _monitoring_store = store
+    return _monitoring_store
+
+def get_drift_state():
+    """
+    Return the streaming drift state, restoring it from the last checkpoint if possible.
+
+    Only records appended to the monitoring store after the checkpoint are re-read;
+    a full scan happens only when there is no usable checkpoint.
+    """
+    global _drift_state, _drift_state_profile
+    profile = load_reference_profile()
+    if _drift_state is not None and profile is _drift_state_profile:
+        return _drift_state
+
+    state_path = config.data_dir / config.drift_state_file
+    if profile is not None:
+        fresh = DriftState.from_profile(profile, ['SalePrice'], engine=get_drift_engine())
+    else:
+        fresh = DriftState.from_reference({'SalePrice': load_reference_data()}, n_bins=config.drift_n_bins)
+
+    state = fresh
+    if state_path.exists():
+        try:
+            checkpoint = DriftState.load(state_path, engine=fresh.engine)
+            if checkpoint.fingerprint == fresh.fingerprint:
+                state = checkpoint
+            else:
+                log.info("Drift state checkpoint was built for a different reference, rebuilding.")
+        except Exception as e:
+            log.warning(f"Could not load drift state checkpoint ({e}), rebuilding.")
+
+    # Catch up on records written after the checkpoint (all of them for a fresh state)
+    store = get_monitoring_store()
+    if len(store) > state.n_records:
+        tail = store.read(start=state.n_records)
+        log.info(f"Replaying {len(tail)} monitoring record(s) into drift state")
+        state.update_frame(tail)
+
+    _drift_state = state
+    _drift_state_profile = profile
+    return _drift_state
+
+def checkpoint_drift_state():
+    """Persist the drift state so a restart does not need a full rescan."""
+    global _records_since_checkpoint
+    if _drift_state is None:
+        return
+    try:
+        # Persist buffered records first, so the checkpoint never counts records the store lost
+        if _monitoring_store is not None:
+            _monitoring_store.flush()
+        _drift_state.save(config.data_dir / config.drift_state_file)
+        _records_since_checkpoint = 0
+    except Exception as e:
+        log.error(f"Error checkpointing drift state: {e}")
+
+def check_and_retrain(new_data_point, prediction=None):
     """
     Save new data point, check for drift, and trigger retraining if needed.
+
+    `prediction` is the model output served for this record; it feeds the residual stream
+    of the sequential detectors.
     """
-    monitoring_path = config.data_dir / config.monitoring_data
+    with check_seconds.time():
+        _check_and_retrain(new_data_point, prediction)
+
+def _check_and_retrain(new_data_point, prediction):
+    global _records_since_checkpoint, _last_feature_report
+    # Make sure the state has caught up with the store before this record is appended
+    state = get_drift_state()
     
-    # Create DataFrame from the new data point
-    new_df = pd.DataFrame([new_data_point])
+    # Buffered append with a fixed schema; written out in segments
+    store = get_monitoring_store()
+    store.append(new_data_point, prediction)
+    monitoring_records.inc()
     
-    # Save to CSV (append mode)
-    header = not monitoring_path.exists()
-    new_df.to_csv(monitoring_path, mode='a', header=header, index=False)
+    log.info(f"New data point saved to monitoring store ({len(store)} records)")
     
-    log.info(f"New data point saved to {monitoring_path}")
+    # Update running statistics instead of re-reading the whole monitoring file
+    state.update(new_data_point)
+    _records_since_checkpoint += 1
+    if _records_since_checkpoint >= config.drift_checkpoint_every:
+        checkpoint_drift_state()
     
-    # Load gathered monitoring data
-    monitoring_df = pd.read_csv(monitoring_path)
+    window = get_window_detector()
+    window_report = window.update(new_data_point) if window is not None else None
+    # O(1) per record; alarms are only acted upon with drift_decision == "sequential"
+    alarms = get_sequential_monitor().update(new_data_point, prediction)
     
     # Perform check only if we have enough data (e.g., > 10 samples) to catch drift
     # In production, this might be a larger batch size
-    if len(monitoring_df) < 10:
-        log.info(f"Not enough data to check for drift yet ({len(monitoring_df)} samples).")
+    if state.n_records < config.drift_min_samples:
+        log.info(f"Not enough data to check for drift yet ({state.n_records} samples).")
+        drift_checks.labels(decision=config.drift_decision, result="insufficient_data").inc()
         return
-        
-    current_data = monitoring_df['SalePrice'].values
-    reference_data = load_reference_data()
     
     # Check for Drift
-    is_drifted, p_val = detect_drift(reference_data, current_data)
+    if config.drift_decision == "sequential":
+        is_drifted = bool(alarms)
+        evidence = f"change detected on {', '.join(alarms)}" if alarms else "no change detected"
+    elif config.drift_decision == "window":
+        # Decide on the most recent window only, so old data cannot mask new drift
+        if window_report is None:
+            drift_checks.labels(decision=config.drift_decision, result="window_pending").inc()
+            return
+        target = window_report.features.set_index('feature').loc['SalePrice']
+        is_drifted, p_val = bool(target['drifted']), float(target['p_adjusted'])
+        evidence = f"p-value: {p_val:.5f}"
+    else:
+        is_drifted, p_val = state.detect_drift('SalePrice', threshold=config.drift_threshold)
+        log.info(f"drift check: p-value={p_val:.5f}, threshold={config.drift_threshold}")
+        evidence = f"p-value: {p_val:.5f}"
+    
+    # Per-feature drift over all model inputs, evaluated from the accumulated bucket counts
+    report = state.feature_report()
+    if report is not None:
+        _last_feature_report = report
+        if report.drift_detected:
+            log.warning(f"Feature drift in {len(report.drifted_features)}/{len(report.features)} features: "
+                        f"{', '.join(report.drifted_features[:10])}")
+            if config.drift_features_trigger_retrain:
+                is_drifted = True
     
+    drift_checks.labels(decision=config.drift_decision, result="drift" if is_drifted else "no_drift").inc()
     if is_drifted:
-        log.warning(f"DATA DRIFT DETECTED! (p-value: {p_val:.5f}). Triggering retraining...")
-        # Trigger Retraining
-        train_pipeline()
+        log.warning(f"DATA DRIFT DETECTED! ({evidence}). Requesting retraining...")
+        # The scheduler coalesces repeated triggers and runs the job in a separate process
+        outcome = get_retrain_scheduler().request(reason=evidence, n_samples=state.n_records)
+        retrain_requests.labels(outcome=outcome).inc()
+        log.info(f"Retraining request: {outcome}")
         
         # Optional: Clear monitoring data or archive it after retraining
         # os.remove(monitoring_path) 
     else:
-        log.info(f"No drift detected (p-value: {p_val:.5f}). System is healthy.")
+        log.info(f"No drift detected ({evidence}). System is healthy.")
 
-def monitor_system(simulate_drift=False):
+def monitor_system(simulate_drift=False, seed=None):
     log.info("Starting system monitoring...")
     
     # Load Reference Data 
@@ -103,7 +392,7 @@ def monitor_system(simulate_drift=False):
     
     # Collect New Data (Simulated incoming stream)
     log.info(f"Collecting new data (simulate_drift={simulate_drift})...")
-    new_data = generate_data(n_samples=500, drift=simulate_drift)
+    new_data = generate_data(n_samples=500, drift=simulate_drift, reference=reference_data, seed=seed)
     
     # Check for Drift
     is_drifted, p_val = detect_drift(reference_data, new_data)
@@ -111,6 +400,7 @@ def monitor_system(simulate_drift=False):
     if is_drifted:
         log.warning(f"DATA DRIFT DETECTED! (p-value: {p_val:.5f}). Triggering retraining...")
         # Trigger Retraining
+        from run_pipeline import main as train_pipeline
         train_pipeline()
     else:
         log.info("No drift detected. System is healthy.")
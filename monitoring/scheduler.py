@@ -0,0 +1,240 @@
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.utils.config import config
+from src.utils.locks import file_lock
+from src.utils.logger import logger
+from src.utils.metrics import registry
+
+log = logger.get_logger("monitoring.scheduler")
+
+retrain_jobs = registry.counter("monitoring_retrain_jobs_total", "Finished retraining jobs, by status", ["status"])
+
+def _run_training_job():
+    # Imported in the child so the API process never loads the training stack for it
+    from run_pipeline import main as train_pipeline
+    train_pipeline()
+
+# Exit code of a job that found another process's retrain holding the lock (EX_TEMPFAIL)
+_EXIT_LOCKED = 75
+
+def _run_locked(target: Callable[[], None], lock_path: Path):
+    # The job process holds the lock itself, so it stays held if the API process dies first
+    with file_lock(lock_path, blocking=False) as acquired:
+        if not acquired:
+            sys.exit(_EXIT_LOCKED)
+        target()
+
+class RetrainScheduler:
+    """
+    Decide when drift actually leads to a retrain, and run it out of process.
+
+    - single-flight: at most one job is scheduled or running; triggers arriving
+      meanwhile are coalesced into it
+    - debounce: a job starts `debounce` seconds after the first trigger, so a burst
+      of drifted records yields one job
+    - cooldown: no new job within `cooldown` seconds of the previous one finishing
+    - min new samples: at least `min_new_samples` monitoring records since the
+      previous job started
+    Jobs run `target` in a separate (spawned) process so training does not compete
+    with request handling for the API's interpreter. `on_complete(job)` is called
+    from the watcher thread when a job ends.
+
+    Single-flight also holds across processes: a job holds `lock_path` while it runs,
+    and a job finding it held by another process's retrain is skipped. The sample count
+    and finish time of the last job are kept in `state_path`, so the cooldown and
+    sample checks survive a restart.
+    """
+
+    def __init__(self, target: Callable[[], None] = _run_training_job, cooldown: float = None,
+                 min_new_samples: int = None, debounce: float = None, history_size: int = 100,
+                 on_complete: Optional[Callable[[dict], None]] = None, lock_path: Path = None,
+                 state_path: Path = None):
+        self.target = target
+        self.lock_path = Path(lock_path or config.models_dir / config.retrain_lock_file)
+        self.state_path = Path(state_path or config.data_dir / config.retrain_state_file)
+        self.cooldown = config.retrain_cooldown_seconds if cooldown is None else cooldown
+        self.min_new_samples = config.retrain_min_new_samples if min_new_samples is None else min_new_samples
+        self.debounce = config.retrain_debounce_seconds if debounce is None else debounce
+        self.on_complete = on_complete
+        self.history = deque(maxlen=history_size)
+
+        self._lock = threading.Lock()
+        self._context = multiprocessing.get_context("spawn")
+        self._job = None
+        self._timer = None
+        self._process = None
+        self._last_finished = None
+        self._samples_at_last_job = 0
+        self._next_id = 1
+        self._counts = {"triggers": 0, "coalesced": 0, "skipped_cooldown": 0, "skipped_min_samples": 0,
+                        "started": 0, "succeeded": 0, "failed": 0, "cancelled": 0, "locked": 0}
+        self._load_state()
+
+    def _load_state(self):
+        if not self.state_path.exists():
+            return
+        try:
+            state = json.loads(self.state_path.read_text())
+            self._samples_at_last_job = int(state.get("samples_at_last_job", 0))
+            self._last_finished = state.get("last_finished")
+        except Exception as e:
+            log.warning(f"Ignoring unreadable retrain scheduler state {self.state_path}: {e}")
+
+    def _save_state_locked(self):
+        state = {"samples_at_last_job": self._samples_at_last_job, "last_finished": self._last_finished}
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_path.with_name(f".{self.state_path.name}.{uuid.uuid4().hex[:8]}")
+            tmp_path.write_text(json.dumps(state))
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            log.error(f"Could not save retrain scheduler state: {e}")
+
+    def request(self, reason: str = "drift", n_samples: int = None, force: bool = False) -> str:
+        """
+        Ask for a retrain. `n_samples` is the total number of monitoring records seen so far.
+        Returns what happened: "scheduled", "coalesced", "cooldown" or "insufficient_samples".
+        `force` skips the cooldown and sample checks, but never starts a second concurrent job.
+        """
+        with self._lock:
+            self._counts["triggers"] += 1
+            if self._job is not None:
+                self._counts["coalesced"] += 1
+                self._job["triggers"] += 1
+                return "coalesced"
+
+            if not force:
+                if self._last_finished is not None and time.time() - self._last_finished < self.cooldown:
+                    self._counts["skipped_cooldown"] += 1
+                    return "cooldown"
+                if n_samples is not None and n_samples - self._samples_at_last_job < self.min_new_samples:
+                    self._counts["skipped_min_samples"] += 1
+                    return "insufficient_samples"
+
+            self._job = {
+                "id": self._next_id,
+                "reason": reason,
+                "status": "scheduled",
+                "triggers": 1,
+                "requested_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "exitcode": None
+            }
+            self._next_id += 1
+            if n_samples is not None:
+                self._samples_at_last_job = n_samples
+                self._save_state_locked()
+            self._timer = threading.Timer(self.debounce, self._launch)
+            self._timer.daemon = True
+            self._timer.start()
+            log.info(f"Retraining job {self._job['id']} scheduled ({reason}), starting in {self.debounce}s")
+            return "scheduled"
+
+    def _launch(self):
+        with self._lock:
+            job = self._job
+            if job is None or job["status"] != "scheduled":
+                return
+            with file_lock(self.lock_path, blocking=False) as free:
+                if not free:
+                    log.info(f"Retraining job {job['id']} skipped: another process is retraining")
+                    self._finish_locked(job, exitcode=None, status="locked")
+                    return
+            try:
+                process = self._context.Process(target=_run_locked, args=(self.target, self.lock_path),
+                                                name=f"retrain-{job['id']}")
+                process.start()
+            except Exception as e:
+                log.error(f"Could not start retraining job {job['id']}: {e}")
+                self._finish_locked(job, exitcode=None, status="failed")
+                return
+            self._process = process
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            job["pid"] = process.pid
+            self._counts["started"] += 1
+            log.info(f"Retraining job {job['id']} started (pid={process.pid}, "
+                     f"{job['triggers']} trigger(s) coalesced)")
+        threading.Thread(target=self._watch, args=(job, process), name="retrain-watcher", daemon=True).start()
+
+    def _watch(self, job: dict, process):
+        process.join()
+        status = {0: "succeeded", _EXIT_LOCKED: "locked"}.get(process.exitcode, "failed")
+        with self._lock:
+            self._finish_locked(job, process.exitcode, status)
+        if status == "succeeded":
+            log.info(f"Retraining job {job['id']} finished in {job['finished_at'] - job['started_at']:.1f}s")
+        elif status == "locked":
+            log.info(f"Retraining job {job['id']} skipped: another process is retraining")
+        else:
+            log.error(f"Retraining job {job['id']} failed (exit code {process.exitcode})")
+        if self.on_complete is not None:
+            try:
+                self.on_complete(dict(job))
+            except Exception as e:
+                log.error(f"Retraining completion callback failed: {e}")
+
+    def _finish_locked(self, job: dict, exitcode, status: str):
+        job["status"] = status
+        job["exitcode"] = exitcode
+        job["finished_at"] = time.time()
+        self._counts[status] += 1
+        retrain_jobs.labels(status=status).inc()
+        self.history.append(dict(job))
+        self._job = None
+        self._process = None
+        if status != "locked":
+            self._last_finished = job["finished_at"]
+            self._save_state_locked()
+
+    @property
+    def busy(self) -> bool:
+        return self._job is not None
+
+    def status(self) -> dict:
+        with self._lock:
+            current = dict(self._job) if self._job is not None else None
+            last = dict(self.history[-1]) if self.history else None
+            cooldown_left = 0.0
+            if self._last_finished is not None:
+                cooldown_left = max(0.0, self.cooldown - (time.time() - self._last_finished))
+            return {
+                "state": current["status"] if current else "idle",
+                "current_job": current,
+                "last_job": last,
+                "cooldown_remaining": cooldown_left,
+                "cooldown_seconds": self.cooldown,
+                "min_new_samples": self.min_new_samples,
+                "debounce_seconds": self.debounce,
+                **self._counts
+            }
+
+    def stop(self, timeout: float = None):
+        """Cancel a job that has not started yet and give a running one `timeout` seconds to finish."""
+        timeout = config.retrain_shutdown_timeout if timeout is None else timeout
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            job, process = self._job, self._process
+            if job is not None and job["status"] == "scheduled":
+                log.info(f"Cancelling scheduled retraining job {job['id']}")
+                self._finish_locked(job, exitcode=None, status="cancelled")
+                return
+        if process is None:
+            return
+        log.info(f"Waiting up to {timeout}s for retraining job {job['id']} to finish...")
+        process.join(timeout)
+        if process.is_alive():
+            log.warning(f"Retraining job {job['id']} still running at shutdown, terminating it")
+            process.terminate()
+            process.join()
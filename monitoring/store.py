@@ -0,0 +1,325 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.config import config
+from src.utils.locks import file_lock
+from src.utils.logger import logger
+
+log = logger.get_logger("monitoring.store")
+
+_MISSING_CODE = -1
+
+def _atomic_write_json(path: Path, payload):
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+class MonitoringStore:
+    """
+    Append-only, columnar store for monitoring records.
+
+    The schema is fixed when the store is created: numeric columns (float64, NaN when
+    missing or unparsable) and categorical columns (dictionary-encoded int32 codes, -1
+    when missing). Fields outside the schema are ignored, so records with differing keys
+    cannot corrupt the log.
+
+    Records are buffered in memory and flushed as one segment directory of .npy files
+    (numeric and categorical matrices in column-major order, plus timestamps and
+    predictions). A segment becomes visible only once the manifest listing it has been
+    atomically replaced. When too many small segments accumulate they are compacted into
+    one; segments that reached `segment_max_rows` are left alone.
+    Readers memory-map the segments and copy out only the columns they ask for.
+
+    Several processes may append to one store: flushes, compactions and reads hold an
+    flock on the store directory and re-read the manifest and category levels under it,
+    and segment names carry a random suffix. Categorical values are buffered as strings
+    and only encoded when flushed, against the levels currently on disk.
+    """
+
+    def __init__(self, root: Path, numeric_columns: List[str], categorical_columns: List[str],
+                 flush_rows: int = None, flush_seconds: float = None, compact_segments: int = None,
+                 segment_max_rows: int = None):
+        self.root = Path(root)
+        self.numeric_columns = list(numeric_columns)
+        self.categorical_columns = list(categorical_columns)
+        self.flush_rows = flush_rows or config.monitoring_flush_rows
+        self.flush_seconds = config.monitoring_flush_seconds if flush_seconds is None else flush_seconds
+        self.compact_segments = compact_segments or config.monitoring_compact_segments
+        self.segment_max_rows = segment_max_rows or config.monitoring_segment_max_rows
+
+        self._numeric_index = {c: j for j, c in enumerate(self.numeric_columns)}
+        self._categorical_index = {c: j for j, c in enumerate(self.categorical_columns)}
+        self._lock = threading.RLock()
+        self._buffer = []
+        self._buffer_started = None
+        self._segments = []
+        self._n_flushed = 0
+        self._categories = [[] for _ in self.categorical_columns]
+        self._category_codes = [{} for _ in self.categorical_columns]
+        self._categories_dirty = False
+
+    @property
+    def schema(self) -> dict:
+        return {"numeric": self.numeric_columns, "categorical": self.categorical_columns}
+
+    @classmethod
+    def open(cls, root: Path, numeric_columns: List[str], categorical_columns: List[str], **kwargs):
+        """Open the store at `root`, creating it; an existing store with another schema is archived."""
+        store = cls(root, numeric_columns, categorical_columns, **kwargs)
+        schema_path = store.root / "schema.json"
+        store.root.mkdir(parents=True, exist_ok=True)
+        with file_lock(store.root):
+            if schema_path.exists():
+                with open(schema_path) as f:
+                    existing = json.load(f)
+                if existing != store.schema:
+                    archive = store.root.with_name(f"{store.root.name}.{time.strftime('%Y%m%d-%H%M%S')}")
+                    log.warning(f"Monitoring store schema changed, archiving the old store to {archive}")
+                    os.replace(store.root, archive)
+                else:
+                    store._load()
+                    return store
+            (store.root / "segments").mkdir(parents=True, exist_ok=True)
+            _atomic_write_json(schema_path, store.schema)
+            store._write_manifest()
+        return store
+
+    @classmethod
+    def open_existing(cls, root: Path, **kwargs):
+        """Open a store for reading with the schema it was created with; None when there is no store at `root`."""
+        schema_path = Path(root) / "schema.json"
+        if not schema_path.exists():
+            return None
+        with open(schema_path) as f:
+            schema = json.load(f)
+        store = cls(root, schema["numeric"], schema["categorical"], **kwargs)
+        store._load()
+        return store
+
+    def _load(self):
+        self._refresh()
+        log.info(f"Opened monitoring store {self.root} ({self._n_flushed} records, {len(self._segments)} segments)")
+
+    def _refresh(self):
+        """Re-read the manifest, then the category levels (other processes may have flushed meanwhile)."""
+        with open(self.root / "manifest.json") as f:
+            manifest = json.load(f)
+        self._segments = [(segment["name"], segment["rows"]) for segment in manifest["segments"]]
+        self._n_flushed = sum(rows for _, rows in self._segments)
+        # Read after the manifest: levels are written before the segments using them are listed
+        categories_path = self.root / "categories.json"
+        if categories_path.exists():
+            with open(categories_path) as f:
+                stored = json.load(f)
+            for j, column in enumerate(self.categorical_columns):
+                self._categories[j] = list(stored.get(column, []))
+                self._category_codes[j] = {level: code for code, level in enumerate(self._categories[j])}
+
+    def _write_manifest(self):
+        _atomic_write_json(self.root / "manifest.json",
+                           {"segments": [{"name": name, "rows": rows} for name, rows in self._segments]})
+
+    def __len__(self) -> int:
+        return self._n_flushed + len(self._buffer)
+
+    # Writing
+
+    def _encode(self, record: dict, prediction) -> tuple:
+        numeric = np.full(len(self.numeric_columns), np.nan)
+        levels = [None] * len(self.categorical_columns)
+        for column, value in record.items():
+            j = self._numeric_index.get(column)
+            if j is not None:
+                try:
+                    numeric[j] = float(value)
+                except (TypeError, ValueError):
+                    pass
+                continue
+            j = self._categorical_index.get(column)
+            if j is None or value is None or (isinstance(value, float) and value != value):
+                continue
+            levels[j] = str(value)
+        prediction = np.nan if prediction is None else float(prediction)
+        return numeric, levels, time.time(), prediction
+
+    def _codes(self, levels: list) -> np.ndarray:
+        codes = np.full(len(self.categorical_columns), _MISSING_CODE, dtype=np.int32)
+        for j, level in enumerate(levels):
+            if level is None:
+                continue
+            code = self._category_codes[j].get(level)
+            if code is None:
+                code = len(self._categories[j])
+                self._categories[j].append(level)
+                self._category_codes[j][level] = code
+                self._categories_dirty = True
+            codes[j] = code
+        return codes
+
+    def append(self, record: dict, prediction: float = None):
+        """Buffer one record; the buffer is flushed to a new segment when it is full or old enough."""
+        with self._lock:
+            self._buffer.append(self._encode(record, prediction))
+            if self._buffer_started is None:
+                self._buffer_started = time.monotonic()
+            if len(self._buffer) >= self.flush_rows or time.monotonic() - self._buffer_started >= self.flush_seconds:
+                self.flush()
+
+    def append_frame(self, df: pd.DataFrame, predictions=None):
+        """Buffer many records at once (e.g. when migrating an existing CSV)."""
+        predictions = [None] * len(df) if predictions is None else predictions
+        with self._lock:
+            for record, prediction in zip(df.to_dict(orient="records"), predictions):
+                self._buffer.append(self._encode(record, prediction))
+            self.flush()
+
+    def flush(self):
+        """Write buffered records as a new segment and publish it in the manifest."""
+        with self._lock:
+            if not self._buffer:
+                return
+            with file_lock(self.root):
+                self._refresh()
+                self._flush_locked()
+
+    def _flush_locked(self):
+        """Flush with the store lock held and the manifest just re-read."""
+        if not self._buffer:
+            return
+        numeric, levels, timestamps, predictions = zip(*self._buffer)
+        codes = [self._codes(row) for row in levels]
+        name = self._segment_name(self._n_flushed, self._n_flushed + len(self._buffer))
+        self._write_segment(name, np.asfortranarray(np.vstack(numeric)), np.asfortranarray(np.vstack(codes)),
+                            np.array(timestamps), np.array(predictions))
+        if self._categories_dirty:
+            # Written before the manifest, so every visible code has its level on disk
+            _atomic_write_json(self.root / "categories.json",
+                               dict(zip(self.categorical_columns, self._categories)))
+            self._categories_dirty = False
+        self._segments.append((name, len(self._buffer)))
+        self._n_flushed += len(self._buffer)
+        self._write_manifest()
+        self._buffer = []
+        self._buffer_started = None
+        if len(self._segments) - self._small_tail() >= self.compact_segments:
+            self._compact_locked()
+
+    @staticmethod
+    def _segment_name(start: int, stop: int) -> str:
+        # Unique even when two processes flush or compact the same record range
+        return f"{start:012d}-{stop:012d}-{uuid.uuid4().hex[:8]}"
+
+    def _write_segment(self, name: str, numeric, codes, timestamps, predictions):
+        tmp_dir = self.root / "segments" / f".{name}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        np.save(tmp_dir / "numeric.npy", numeric)
+        np.save(tmp_dir / "categorical.npy", codes)
+        np.save(tmp_dir / "timestamp.npy", timestamps)
+        np.save(tmp_dir / "prediction.npy", predictions)
+        final_dir = self.root / "segments" / name
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(tmp_dir, final_dir)
+
+    def _small_tail(self) -> int:
+        """Index of the first segment of the trailing run of segments below segment_max_rows."""
+        i = len(self._segments)
+        while i > 0 and self._segments[i - 1][1] < self.segment_max_rows:
+            i -= 1
+        return i
+
+    def compact(self):
+        """Merge the trailing small segments into one, so reads open a few large files instead of many small ones."""
+        with self._lock, file_lock(self.root):
+            self._refresh()
+            self._compact_locked()
+
+    def _compact_locked(self):
+        first = self._small_tail()
+        small = self._segments[first:]
+        if len(small) < 2:
+            return
+        arrays = [self._segment_arrays(name) for name, _ in small]
+        rows = sum(n for _, n in small)
+        start = sum(n for _, n in self._segments[:first])
+        merged_name = self._segment_name(start, self._n_flushed)
+        self._write_segment(merged_name, *(
+            np.asfortranarray(np.concatenate([a[key] for a in arrays]))
+            for key in ("numeric", "categorical", "timestamp", "prediction")
+        ))
+        self._segments = self._segments[:first] + [(merged_name, rows)]
+        self._write_manifest()
+        for name, _ in small:
+            shutil.rmtree(self.root / "segments" / name, ignore_errors=True)
+        log.info(f"Compacted {len(small)} monitoring segments ({rows} records)")
+
+    # Reading
+
+    def _segment_arrays(self, name: str, keys=("numeric", "categorical", "timestamp", "prediction")) -> Dict[str, np.ndarray]:
+        directory = self.root / "segments" / name
+        return {key: np.load(directory / f"{key}.npy", mmap_mode="r") for key in keys}
+
+    def categories(self, column: str) -> List[str]:
+        return list(self._categories[self._categorical_index[column]])
+
+    def select(self, columns: Optional[List[str]] = None, start: int = 0, stop: int = None) -> Dict[str, np.ndarray]:
+        """
+        Raw column arrays for records [start, stop): float64 for numeric columns, int32 codes
+        (see `categories`) for categorical ones, plus "timestamp" and "prediction" on request.
+        Only the requested columns are read from the memory-mapped segments.
+        """
+        # Under the store lock, so no other process compacts away the segments being read
+        with self._lock, file_lock(self.root):
+            self._refresh()
+            self._flush_locked()
+            stop = self._n_flushed if stop is None else min(stop, self._n_flushed)
+            columns = self.numeric_columns + self.categorical_columns if columns is None else list(columns)
+            unknown = [c for c in columns if c not in self._numeric_index and c not in self._categorical_index
+                       and c not in ("timestamp", "prediction")]
+            if unknown:
+                raise KeyError(f"Columns {unknown} are not in the monitoring store schema")
+            # Only map the files holding requested columns
+            keys = {"numeric" if c in self._numeric_index else "categorical" if c in self._categorical_index else c
+                    for c in columns}
+            parts = {column: [] for column in columns}
+            offset = 0
+            for name, rows in self._segments:
+                if offset >= stop:
+                    break
+                if offset + rows <= start:
+                    offset += rows
+                    continue
+                arrays = self._segment_arrays(name, keys)
+                lo, hi = max(start - offset, 0), min(stop - offset, rows)
+                for column in columns:
+                    if column in self._numeric_index:
+                        parts[column].append(np.array(arrays["numeric"][lo:hi, self._numeric_index[column]]))
+                    elif column in self._categorical_index:
+                        parts[column].append(np.array(arrays["categorical"][lo:hi, self._categorical_index[column]]))
+                    else:
+                        parts[column].append(np.array(arrays[column][lo:hi]))
+                offset += rows
+            return {column: np.concatenate(chunks) if chunks else np.empty(0) for column, chunks in parts.items()}
+
+    def read(self, columns: Optional[List[str]] = None, start: int = 0, stop: int = None) -> pd.DataFrame:
+        """Records [start, stop) as a DataFrame; categorical codes are decoded back to strings (NaN when missing)."""
+        selected = self.select(columns, start, stop)
+        frame = {}
+        for column, values in selected.items():
+            if column in self._categorical_index:
+                levels = np.array(self._categories[self._categorical_index[column]] + [np.nan], dtype=object)
+                # Code -1 indexes the trailing NaN
+                frame[column] = levels[values.astype(np.int64)] if len(values) else np.empty(0, dtype=object)
+            else:
+                frame[column] = values
+        return pd.DataFrame(frame)
@@ -0,0 +1,147 @@
+import time
+from collections import deque
+
+import numpy as np
+
+from src.utils.logger import logger
+
+log = logger.get_logger("monitoring.windows")
+
+WINDOW_MODES = ("count", "time")
+
+class RingBuffer:
+    """
+    Fixed-capacity, numpy-backed buffer of encoded records.
+
+    Each slot holds the numeric and categorical bucket codes of one record plus its
+    timestamp. Once full, new records overwrite the oldest ones, so memory stays
+    constant however long the stream runs.
+    """
+
+    def __init__(self, capacity: int, n_numeric: int, n_categorical: int):
+        self.capacity = int(capacity)
+        self.numeric = np.zeros((self.capacity, n_numeric), dtype=np.int16)
+        self.categorical = np.zeros((self.capacity, n_categorical), dtype=np.int16)
+        self.timestamps = np.full(self.capacity, -np.inf)
+        self.size = 0
+        self._next = 0
+
+    def append(self, numeric_codes, categorical_codes, timestamp: float):
+        self.numeric[self._next] = numeric_codes
+        self.categorical[self._next] = categorical_codes
+        self.timestamps[self._next] = timestamp
+        self._next = (self._next + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def select(self, since: float = None, until: float = None):
+        """Codes of the buffered records (optionally only those in [`since`, `until`)), in no particular order."""
+        if since is None and until is None:
+            return self.numeric[:self.size], self.categorical[:self.size]
+        timestamps = self.timestamps[:self.size]
+        mask = np.ones(self.size, dtype=bool)
+        if since is not None:
+            mask &= timestamps >= since
+        if until is not None:
+            mask &= timestamps < until
+        return self.numeric[:self.size][mask], self.categorical[:self.size][mask]
+
+class WindowedDriftDetector:
+    """
+    Drift detection over a bounded window of recent records instead of the whole history.
+
+    mode="count": the window is the last `size` records, evaluated every `stride` records.
+    mode="time": the window is the last `size` seconds, evaluated every `stride` seconds;
+    at most `capacity` records are kept, the oldest being overwritten first. A due window
+    is closed by the next record or by `tick` (called periodically by the monitoring worker),
+    whichever comes first.
+    With stride == size windows do not overlap (tumbling); with stride < size they slide.
+    One summary per evaluated window is kept in `history` (bounded).
+    """
+
+    def __init__(self, engine, mode: str = "count", size: float = 500, stride: float = 100,
+                 capacity: int = 10_000, history_size: int = 1000, alpha: float = None, correction: str = None):
+        if mode not in WINDOW_MODES:
+            raise ValueError(f"Unknown window mode '{mode}', expected one of {WINDOW_MODES}")
+        if stride <= 0 or size <= 0:
+            raise ValueError("Window size and stride must be positive")
+
+        self.engine = engine
+        self.mode = mode
+        self.size = size
+        self.stride = stride
+        self.alpha = alpha
+        self.correction = correction
+        buffer_capacity = int(size) if mode == "count" else int(capacity)
+        self.buffer = RingBuffer(buffer_capacity, len(engine.numeric_features), len(engine.categorical_features))
+        self.history = deque(maxlen=history_size)
+
+        self._seen = 0
+        self._next_due = None
+        self._last_report = None
+
+    @property
+    def tumbling(self) -> bool:
+        return self.stride == self.size
+
+    @property
+    def last_report(self):
+        return self._last_report
+
+    def update(self, record: dict, timestamp: float = None):
+        """Add one record; returns the DriftReport if this record closed a window, else None."""
+        timestamp = time.time() if timestamp is None else timestamp
+        numeric_codes, categorical_codes = self.engine.encode_record(record)
+
+        if self.mode == "time":
+            # A window that expired before this record is closed without it
+            report = self.tick(timestamp)
+            self.buffer.append(numeric_codes, categorical_codes, timestamp)
+            self._seen += 1
+            if self._next_due is None:
+                self._next_due = timestamp + self.size
+            return report
+
+        self.buffer.append(numeric_codes, categorical_codes, timestamp)
+        self._seen += 1
+        # First evaluation once the window is full, then every `stride` records
+        if self._seen >= self.size and (self._seen - self.size) % self.stride == 0:
+            return self.evaluate(timestamp)
+        return None
+
+    def tick(self, now: float = None):
+        """Close the time window that expired by `now`, if any; returns its DriftReport (None if it was empty)."""
+        if self.mode != "time" or self._next_due is None:
+            return None
+        now = time.time() if now is None else now
+        if now < self._next_due:
+            return None
+        window_end = self._next_due
+        # Skip over idle periods instead of emitting a burst of empty windows
+        while self._next_due <= now:
+            self._next_due += self.stride
+        return self.evaluate(window_end)
+
+    def evaluate(self, now: float = None):
+        """Run the drift engine on the current window and record the result in the history."""
+        now = time.time() if now is None else now
+        since, until = (now - self.size, now) if self.mode == "time" else (None, None)
+        numeric_codes, categorical_codes = self.buffer.select(since, until)
+        n = len(numeric_codes)
+        if n == 0:
+            return None
+
+        report = self.engine.evaluate(*self.engine.count(numeric_codes, categorical_codes),
+                                      alpha=self.alpha, correction=self.correction)
+        self._last_report = report
+        self.history.append({
+            "window_end": now,
+            "window_start": since if since is not None else float(self.buffer.timestamps[:self.buffer.size].min()),
+            "records_seen": self._seen,
+            "n": n,
+            "drift_detected": report.drift_detected,
+            "drifted_features": report.drifted_features,
+            "min_p_adjusted": float(report.features["p_adjusted"].min())
+        })
+        if report.drift_detected:
+            log.warning(f"Window drift ({self.mode}, n={n}): {', '.join(report.drifted_features[:10])}")
+        return report
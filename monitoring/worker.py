@@ -0,0 +1,163 @@
+import queue
+import threading
+import time
+from typing import Callable
+
+from src.utils.config import config
+from src.utils.logger import logger
+
+log = logger.get_logger("monitoring.worker")
+
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+# None, not a fresh object(): it has to keep its identity through a multiprocessing queue
+_STOP = None
+
+class MonitoringWorker:
+    """
+    Run monitoring (ingestion, drift checks, retraining) off the request path.
+
+    Records are pushed into a bounded in-process queue and consumed by a single
+    background thread that calls `handler(record, **kwargs)`. When the queue is full the
+    overflow policy decides what happens:
+      - "block": wait up to `submit_timeout` seconds for space (backpressure), then drop the new record
+      - "drop_newest": drop the new record immediately
+      - "drop_oldest": evict the oldest queued record to make room
+    On shutdown, records already queued are flushed through the handler before the thread exits.
+    `idle_handler`, if given, is called from the same thread whenever no record arrived for
+    `idle_interval` seconds, and once more at shutdown (e.g. to close expired time windows).
+
+    With a `record_queue` from multiprocessing, several processes can submit records while
+    only one of them consumes: the others call `start_forwarding` instead of `start` (see serve.py).
+    """
+
+    def __init__(self, handler: Callable[[dict], None], max_queue_size: int = None,
+                 overflow_policy: str = None, submit_timeout: float = None, record_queue=None,
+                 idle_handler: Callable[[], None] = None, idle_interval: float = None):
+        self.handler = handler
+        self.idle_handler = idle_handler
+        self.idle_interval = idle_interval or config.monitoring_idle_interval
+        self.max_queue_size = max_queue_size or config.monitoring_queue_size
+        self.overflow_policy = overflow_policy or config.monitoring_overflow_policy
+        self.submit_timeout = config.monitoring_submit_timeout if submit_timeout is None else submit_timeout
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{self.overflow_policy}', expected one of {OVERFLOW_POLICIES}")
+
+        self._queue = record_queue if record_queue is not None else queue.Queue(maxsize=self.max_queue_size)
+        self._thread = None
+        self._accepting = False
+        self._counts_lock = threading.Lock()
+        self._counts = {"submitted": 0, "processed": 0, "failed": 0, "dropped": 0}
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._accepting = True
+        self._thread = threading.Thread(target=self._run, name="monitoring-worker", daemon=True)
+        self._thread.start()
+        log.info(f"Monitoring worker started (queue_size={self.max_queue_size}, overflow_policy={self.overflow_policy})")
+
+    def start_forwarding(self):
+        """Accept records into the shared queue without consuming them; another process runs `start`."""
+        self._accepting = True
+        log.info("Monitoring records are forwarded to the monitoring process")
+
+    def stop(self, timeout: float = None):
+        """Stop accepting records, flush everything already queued and wait for the worker to exit."""
+        if self._thread is None:
+            if self._accepting and hasattr(self._queue, "join_thread"):
+                # Forwarding: wait until the queue's feeder thread has written out the last records
+                self._queue.close()
+                self._queue.join_thread()
+            self._accepting = False
+            return
+        timeout = config.monitoring_shutdown_timeout if timeout is None else timeout
+        self._accepting = False
+        pending = self._queue.qsize()
+        log.info(f"Stopping monitoring worker, flushing {pending} pending record(s)...")
+
+        deadline = time.monotonic() + timeout
+        # The sentinel queues behind pending records so they are processed first
+        try:
+            self._queue.put(_STOP, timeout=max(0.1, deadline - time.monotonic()))
+        except queue.Full:
+            log.error("Monitoring queue still full at shutdown deadline; pending records will be lost")
+            return
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        if self._thread.is_alive():
+            log.error(f"Monitoring worker did not finish within {timeout}s ({self._queue.qsize()} record(s) left)")
+        else:
+            log.info("Monitoring worker stopped")
+        self._thread = None
+
+    def submit(self, record: dict, **kwargs) -> bool:
+        """Enqueue a record without running monitoring inline. Returns False if it was dropped."""
+        if not self._accepting:
+            self._count("dropped")
+            return False
+        self._count("submitted")
+        item = (record, kwargs)
+
+        try:
+            if self.overflow_policy == "block":
+                self._queue.put(item, timeout=self.submit_timeout)
+            else:
+                self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+
+        if self.overflow_policy == "drop_oldest":
+            try:
+                self._queue.get_nowait()
+                self._count("dropped")
+                self._queue.put_nowait(item)
+                return True
+            except (queue.Empty, queue.Full):
+                pass
+
+        self._count("dropped")
+        log.warning(f"Monitoring queue full ({self.max_queue_size}), record dropped")
+        return False
+
+    def stats(self) -> dict:
+        with self._counts_lock:
+            counts = dict(self._counts)
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "forwarding": self._thread is None and self._accepting,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_size": self.max_queue_size,
+            "overflow_policy": self.overflow_policy,
+            **counts
+        }
+
+    def _count(self, key: str, n: int = 1):
+        with self._counts_lock:
+            self._counts[key] += n
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_interval if self.idle_handler else None)
+            except queue.Empty:
+                self._idle()
+                continue
+            if item is _STOP:
+                self._idle()
+                break
+            record, kwargs = item
+            try:
+                self.handler(record, **kwargs)
+                self._count("processed")
+            except Exception as e:
+                self._count("failed")
+                log.error(f"Monitoring failed: {e}")
+
+    def _idle(self):
+        if self.idle_handler is None:
+            return
+        try:
+            self.idle_handler()
+        except Exception as e:
+            log.error(f"Monitoring idle handler failed: {e}")
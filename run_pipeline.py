@@ -1,6 +1,6 @@
 import sys
 import os
-from src.models.train_model import train
+from src.models.train_model import run_training
 from src.utils.logger import logger
 
 # Add project root to path
@@ -13,7 +13,18 @@ def main():
         log.info("Starting House Price Prediction Pipeline...")
         log.info("This will preprocess data, train the model, and log to MLflow.")
         
-        train()
+        run_logger = run_training()
+        
+        if run_logger is None:
+            log.info("Pipeline finished without training a new model.")
+            return
+        
+        # With async logging the model is already being served; report once MLflow has everything
+        summary = run_logger.wait()
+        if summary["failed"]:
+            log.warning(f"MLflow logging incomplete, failed steps: {summary['failed']}")
+        else:
+            log.info(f"MLflow logging complete ({len(summary['completed'])} steps, {summary['seconds']}s)")
         
         log.info("Pipeline finished successfully!")
         
@@ -22,4 +33,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
\ No newline at end of file
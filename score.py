@@ -0,0 +1,31 @@
+import argparse
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.models.scoring import score_file
+from src.utils.config import config
+from src.utils.logger import logger
+
+log = logger.get_logger("scoring")
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of houses with the current model")
+    parser.add_argument("input", help="Input file (.csv or .parquet), same columns as data/raw/test.csv")
+    parser.add_argument("output", help="Output file (.csv or .parquet) with the Id and predicted SalePrice")
+    parser.add_argument("--chunk-size", type=int, default=config.scoring_chunk_size, help="Rows per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="Processes to split the file across")
+    parser.add_argument("--id-column", default="Id", help="Input column copied to the output, if present")
+    args = parser.parse_args()
+
+    try:
+        score_file(args.input, args.output, chunk_size=args.chunk_size, workers=args.workers,
+                   id_column=args.id_column)
+    except Exception as e:
+        log.error(f"Scoring failed: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
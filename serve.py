@@ -0,0 +1,155 @@
+import argparse
+import gc
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.config import config
+from src.utils.logger import logger
+
+log = logger.get_logger("serve")
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def _run_worker(sock: socket.socket):
+    import uvicorn
+    from src.app.main import app, model_store
+
+    # Monitored records are forwarded to the monitoring process (see _run_monitor)
+    config.monitoring_forward_only = True
+    # Restore default signal handling; uvicorn installs its own for graceful shutdown
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # Warm-up runs here, not in the parent: XGBoost's OpenMP pool must not be started before fork
+    model_store.warmup_runs = config.model_warmup_runs
+    model_store.warm_up()
+    server = uvicorn.Server(uvicorn.Config(app, log_level="info"))
+    server.run(sockets=[sock])
+
+def _run_monitor():
+    from src.app import main as api
+
+    parent = os.getppid()
+    stop = threading.Event()
+    # The parent stops this process with SIGUSR1 once the workers have exited, so their last
+    # records are still processed; a SIGTERM or Ctrl-C sent to the whole process group is ignored
+    signal.signal(signal.SIGUSR1, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    api.start_monitoring_worker()
+    while not stop.wait(1.0):
+        if os.getppid() != parent:
+            log.warning("Serving process is gone, stopping monitoring")
+            break
+    api.stop_monitoring_worker()
+
+def _spawn(target, *args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            target(*args)
+        except BaseException as e:
+            log.error(f"Worker {os.getpid()} crashed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+def main():
+    """
+    Serve the API from several worker processes that share one copy of the model.
+
+    The parent loads the model, preprocessor and compiled fast path once, freezes the
+    garbage collector so those objects are never touched again (keeping their pages
+    shared copy-on-write), then forks the workers, which all accept on one listening
+    socket. Workers that die are replaced. A model published later is loaded by each
+    worker's watcher independently, so only the preloaded version is shared.
+
+    Monitoring runs in one extra forked process: workers put monitored records on a
+    shared queue, and only that process keeps the drift state, writes the monitoring
+    store and schedules retrains.
+    """
+    parser = argparse.ArgumentParser(description="Preload the model once and fork API workers")
+    parser.add_argument("--host", default=config.api_host)
+    parser.add_argument("--port", type=int, default=config.api_port)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    from src.app import main as api
+    from src.app.main import model_store
+    from monitoring.worker import MonitoringWorker
+
+    # Load without warm-up predictions (see _run_worker)
+    model_store.warmup_runs = 0
+    model_store.reload()
+    sock = _bind(args.host, args.port)
+    # Inherited by every forked process: the workers submit to it, the monitoring process consumes
+    records = multiprocessing.get_context("fork").Queue(config.monitoring_queue_size)
+    api.monitoring_worker = MonitoringWorker(api.check_and_retrain, record_queue=records, idle_handler=api.tick_windows)
+
+    # Move everything allocated so far out of the collector's reach: a collection in a
+    # worker would otherwise write to every object's header and un-share its page
+    gc.collect()
+    gc.freeze()
+
+    monitor = _spawn(_run_monitor)
+    workers = {_spawn(_run_worker, sock) for _ in range(args.workers)}
+    log.info(f"Serving on {args.host}:{args.port} with {args.workers} preloaded worker(s): {sorted(workers)}, "
+             f"monitoring in {monitor}")
+
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    monitor_stopping = False
+    while workers or monitor:
+        if stopping and not workers and monitor and not monitor_stopping:
+            os.kill(monitor, signal.SIGUSR1)
+            monitor_stopping = True
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid == monitor:
+            monitor = None
+            if not stopping:
+                log.warning(f"Monitoring process {pid} exited ({status}), starting a replacement")
+                time.sleep(1)
+                monitor = _spawn(_run_monitor)
+            continue
+        workers.discard(pid)
+        if not stopping:
+            log.warning(f"Worker {pid} exited ({status}), starting a replacement")
+            time.sleep(1)
+            workers.add(_spawn(_run_worker, sock))
+    sock.close()
+    log.info("All workers stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logger import logger
+
+log = logger.get_logger("batching")
+
+_STOP = object()
+
+class BatcherStopped(RuntimeError):
+    """Raised by submit() when the batcher is not running, so callers can score the row themselves."""
+
+class MicroBatcher:
+    """
+    Collect concurrent single-row prediction requests and run them as one matrix.
+
+    Requests are queued by the (threadpool) request handlers; a single worker thread
+    drains up to `max_batch_size` rows or waits at most `max_wait_ms` after the first
+    row arrived, calls `predict_fn` once on the stacked DataFrame and fans the results
+    back out through per-request futures. When traffic is light (the previous batch
+    held a single row) the worker does not wait, so idle latency is unchanged.
+
+    With `snapshot_fn`, it is called once per batch and its result is passed to
+    `predict_fn(frame, snapshot)`; `predict_with_snapshot` returns it with the prediction,
+    so callers know which model actually scored their row.
+    """
+
+    def __init__(self, predict_fn: Callable[..., np.ndarray], max_batch_size: int = 64, max_wait_ms: float = 5.0,
+                 snapshot_fn: Optional[Callable[[], Any]] = None):
+        self.predict_fn = predict_fn
+        self.snapshot_fn = snapshot_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+
+        self._queue = queue.Queue()
+        self._thread = None
+        # Guards accepting + enqueueing, so nothing is queued behind the stop sentinel
+        self._submit_lock = threading.Lock()
+        self._accepting = False
+        self._stats_lock = threading.Lock()
+        self._last_batch_size = 1
+        self._batches = 0
+        self._rows = 0
+        self._max_batch_seen = 0
+        self._batch_size_histogram = {}
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+        self._accepting = True
+        log.info(f"Micro-batcher started (max_batch_size={self.max_batch_size}, max_wait_ms={self.max_wait * 1000:.1f})")
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread is None:
+            return
+        with self._submit_lock:
+            self._accepting = False
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+        log.info("Micro-batcher stopped")
+
+    def submit(self, features: dict) -> Future:
+        future = Future()
+        with self._submit_lock:
+            if not self._accepting:
+                raise BatcherStopped("Micro-batcher is not running")
+            self._queue.put((features, future))
+        return future
+
+    def predict(self, features: dict, timeout: float = None) -> float:
+        """
+        Blocking helper for sync handlers: enqueue one row and wait up to `timeout` seconds
+        for its prediction (concurrent.futures.TimeoutError after that).
+        """
+        return self.submit(features).result(timeout)
+
+    def predict_with_snapshot(self, features: dict, timeout: float = None) -> Tuple[float, Any]:
+        """Like `predict`, but also returns the `snapshot_fn` result the row was scored with."""
+        future = self.submit(features)
+        prediction = future.result(timeout)
+        return prediction, future.snapshot
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "rows": self._rows,
+                "avg_batch_size": self._rows / self._batches if self._batches else 0.0,
+                "max_batch_size_seen": self._max_batch_seen,
+                "last_batch_size": self._last_batch_size,
+                "batch_size_histogram": {f"<={bucket}": count for bucket, count in sorted(self._batch_size_histogram.items())},
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000
+            }
+
+    def _collect(self, first):
+        batch = [first]
+        # Adaptive wait: only hold the batch open if the last one actually coalesced requests
+        wait = self.max_wait if self._last_batch_size > 1 or not self._queue.empty() else 0.0
+        deadline = time.monotonic() + wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = self._collect(first)
+            self._process(batch)
+            self._record(len(batch))
+
+        # Drain whatever is still queued so no caller waits forever
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                self._process([item])
+
+    def _process(self, batch):
+        futures = [future for _, future in batch]
+        snapshot = self.snapshot_fn() if self.snapshot_fn is not None else None
+        for future in futures:
+            # Set before the result, so it is visible as soon as result() returns
+            future.snapshot = snapshot
+        try:
+            frame = pd.DataFrame.from_records([features for features, _ in batch])
+            predictions = self._predict(frame, snapshot)
+            for future, value in zip(futures, predictions):
+                future.set_result(float(value))
+        except Exception as e:
+            if len(batch) == 1:
+                futures[0].set_exception(e)
+                return
+            # Isolate the failing request(s) instead of failing the whole batch
+            log.warning(f"Micro-batch of {len(batch)} failed ({e}), retrying rows individually")
+            for features, future in batch:
+                try:
+                    value = self._predict(pd.DataFrame([features]), snapshot)[0]
+                    future.set_result(float(value))
+                except Exception as row_e:
+                    future.set_exception(row_e)
+
+    def _predict(self, frame: pd.DataFrame, snapshot):
+        if self.snapshot_fn is None:
+            return self.predict_fn(frame)
+        return self.predict_fn(frame, snapshot)
+
+    def _record(self, size: int):
+        bucket = 1
+        while bucket < size:
+            bucket *= 2
+        with self._stats_lock:
+            self._last_batch_size = size
+            self._batches += 1
+            self._rows += size
+            self._max_batch_seen = max(self._max_batch_seen, size)
+            self._batch_size_histogram[bucket] = self._batch_size_histogram.get(bucket, 0) + 1
@@ -0,0 +1,104 @@
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+
+from src.utils.config import config
+
+# Approximate per-entry bookkeeping (OrderedDict slot and link node, entry tuple)
+_ENTRY_OVERHEAD = 160
+
+def _canonical(value):
+    # 2 and 2.0 encode to the same features, so they share a key; bools and strings stay distinct
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    return str(value)
+
+def feature_key(features: dict) -> bytes:
+    """Stable 128-bit hash of a feature dict, independent of key order and int/float spelling."""
+    canonical = json.dumps({str(k): _canonical(v) for k, v in features.items()},
+                           sort_keys=True, separators=(",", ":"))
+    return blake2b(canonical.encode(), digest_size=16).digest()
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of predictions with a TTL and a memory cap.
+
+    Entries are tagged with the model version they were computed with; the first lookup
+    with a different version drops the whole cache, so a model swap never serves stale
+    predictions. Least recently used entries are evicted when either `max_entries` or
+    `max_bytes` (estimated) is exceeded; expired entries are dropped when looked up.
+    """
+
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None, max_bytes: int = None):
+        self.max_entries = config.prediction_cache_max_entries if max_entries is None else max_entries
+        self.ttl_seconds = config.prediction_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.max_bytes = config.prediction_cache_max_bytes if max_bytes is None else max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._bytes = 0
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self._counts["invalidations"] += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, key: bytes, version):
+        """Cached prediction for `key` under model `version`, or None."""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counts["misses"] += 1
+                return None
+            value, expires_at, size = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._bytes -= size
+                self._counts["expirations"] += 1
+                self._counts["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counts["hits"] += 1
+            return value
+
+    def put(self, key: bytes, version, value):
+        with self._lock:
+            self._check_version(version)
+            size = sys.getsizeof(key) + sys.getsizeof(value) + _ENTRY_OVERHEAD
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counts["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["misses"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": self._counts["hits"] / lookups if lookups else 0.0,
+                **self._counts
+            }
@@ -1,28 +1,80 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
+from fastapi.routing import APIRoute
 from pydantic import BaseModel
 import pandas as pd
-import joblib
+import numpy as np
 from src.utils.config import config
 from src.utils.logger import logger
 import os
 import sys
-from typing import Optional
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
 from fastapi import Query
 
 # Add project root to path to allow importing monitoring
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from monitoring.monitor import check_and_retrain
+from monitoring.monitor import (
+    check_and_retrain, checkpoint_drift_state, get_last_feature_report, get_retrain_scheduler,
+    get_sequential_monitor, get_window_history, tick_windows
+)
+from monitoring.worker import MonitoringWorker
+from src.app.batching import BatcherStopped, MicroBatcher
+from src.app.cache import PredictionCache, feature_key
+from src.app.model_store import ModelSnapshot, ModelStore
+from src.utils.metrics import CONTENT_TYPE, registry
 
 # Initialize Logger
 log = logger.get_logger("api")
 
 app = FastAPI(title="House Price Prediction API", version="1.0.0")
 
-# Global variables for model and preprocessor
-model = None
-preprocessor = None
+request_seconds = registry.histogram("api_request_duration_seconds",
+                                     "Request handling time (parsing, validation, endpoint, serialization)",
+                                     ["endpoint"])
+stage_seconds = registry.histogram("api_stage_duration_seconds", "Time spent in each stage of a prediction request",
+                                   ["endpoint", "stage"])
+prediction_errors = registry.counter("api_prediction_errors_total", "Records whose prediction failed", ["endpoint"])
+# Children resolved once, so the request path does no label lookups
+_predict_stages = {stage: stage_seconds.labels(endpoint="/predict", stage=stage)
+                   for stage in ("validation", "cache", "batcher", "dataframe", "transform", "predict", "monitoring")}
+_batch_stages = {stage: stage_seconds.labels(endpoint="/predict/batch", stage=stage)
+                 for stage in ("validation", "dataframe", "coerce", "transform", "predict")}
+_request_start = ContextVar("request_start", default=None)
+
+class TimedRoute(APIRoute):
+    """Times each request and records when it started, so endpoints can time their validation stage."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        request_timer = request_seconds.labels(endpoint=self.path)
+
+        async def timed_handler(request):
+            start = time.perf_counter()
+            token = _request_start.set(start)
+            try:
+                return await handler(request)
+            finally:
+                request_timer.observe(time.perf_counter() - start)
+                _request_start.reset(token)
+
+        return timed_handler
+
+app.router.route_class = TimedRoute
+
+def _observe_validation(stages: dict):
+    # Body parsing and pydantic validation: from the start of the request until the endpoint runs
+    start = _request_start.get()
+    if start is not None:
+        stages["validation"].observe(time.perf_counter() - start)
+
+# The served model/preprocessor pair lives in the store and is swapped atomically on reload
+model_store = ModelStore()
+batcher = None
+prediction_cache = PredictionCache() if config.prediction_cache_enabled else None
+monitoring_worker = MonitoringWorker(check_and_retrain, idle_handler=tick_windows)
 
 class HouseFeatures(BaseModel):
     features: dict
@@ -121,34 +173,73 @@ class HouseFeatures(BaseModel):
     # Optional field for retraining mode
     SalePrice: Optional[float] = None
 
+class BatchHouseFeatures(BaseModel):
+    """Either a list of feature records or a columnar payload (column -> values)."""
+    records: Optional[List[dict]] = None
+    columns: Optional[Dict[str, list]] = None
+
+def _on_retrain_complete(job: dict):
+    if job["status"] == "succeeded":
+        model_store.reload_async()
+
 @app.on_event("startup")
 def load_artifacts():
-    global model, preprocessor
-    try:
-        model_path = config.models_dir / config.model_name
-        preprocessor_path = config.models_dir / "preprocessor.joblib"
-        
-        if not model_path.exists() or not preprocessor_path.exists():
-            log.warning("Model or preprocessor not found. Please train the model first.")
-            return
-
-        log.info(f"Loading model from {model_path}")
-        model = joblib.load(model_path)
-        
-        log.info(f"Loading preprocessor from {preprocessor_path}")
-        preprocessor = joblib.load(preprocessor_path)
-        
+    if model_store.reload()["reloaded"]:
         log.info("Artifacts loaded successfully.")
-    except Exception as e:
-        log.error(f"Error loading artifacts: {str(e)}")
-        raise
+    # Pick up versions published by retraining (or any other trainer) without a restart
+    model_store.start_watcher()
+    get_retrain_scheduler().on_complete = _on_retrain_complete
+
+@app.on_event("shutdown")
+def stop_model_watcher():
+    model_store.stop_watcher()
+
+@app.on_event("startup")
+def start_batcher():
+    global batcher
+    if config.micro_batching_enabled:
+        batcher = MicroBatcher(
+            _predict_frame,
+            max_batch_size=config.micro_batch_max_size,
+            max_wait_ms=config.micro_batch_max_wait_ms,
+            # One snapshot per batch: the results are cached under the version that produced them
+            snapshot_fn=model_store.current
+        )
+        batcher.start()
+
+@app.on_event("startup")
+def start_monitoring_worker():
+    if config.monitoring_forward_only:
+        monitoring_worker.start_forwarding()
+    else:
+        monitoring_worker.start()
+
+@app.on_event("shutdown")
+def stop_monitoring_worker():
+    monitoring_worker.stop()
+    if config.monitoring_forward_only:
+        return
+    checkpoint_drift_state()
+    # After the flush, so retrains requested by the last records are cancelled too
+    get_retrain_scheduler().stop()
+
+@app.on_event("shutdown")
+def stop_batcher():
+    global batcher
+    if batcher is not None:
+        batcher.stop()
+        batcher = None
 
 @app.post("/predict")
 def predict(data: HouseFeatures, mode: str = Query("inference", enum=["inference", "retrain"])):
-    if model is None or preprocessor is None:
+    stages = _predict_stages
+    _observe_validation(stages)
+    snapshot = model_store.current()
+    if snapshot is None:
         raise HTTPException(status_code=503, detail="Model not loaded. Train the model first.")
     
     # Handle Retrain Mode
+    monitoring_data = None
     if mode == "retrain":
         if data.SalePrice is None:
            raise HTTPException(status_code=400, detail="SalePrice is required for 'retrain' mode.")
@@ -157,29 +248,157 @@ def predict(data: HouseFeatures, mode: str = Query("inference", enum=["inference
         # We need to construct the full data point including the target
         monitoring_data = data.features.copy()
         monitoring_data['SalePrice'] = data.SalePrice
-        
-        # Fire and forget (or await) - for now synchronous
-        try:
-            check_and_retrain(monitoring_data)
-            log.info("Monitoring check completed.")
-        except Exception as mon_e:
-            log.error(f"Monitoring failed: {mon_e}")
-            # We don't fail the prediction if monitoring fails, just log it
 
+    prediction, error = None, None
+    # Entries are tagged with the served version, so a model swap invalidates the cache
+    cache_key, cached = None, None
+    if prediction_cache is not None:
+        with stages["cache"].time():
+            cache_key = feature_key(data.features)
+            cached = prediction_cache.get(cache_key, snapshot.source_key)
     try:
-        input_df = pd.DataFrame([data.features])
-        
-        processed_data = preprocessor.transform(input_df)
-        prediction = model.predict(processed_data)
-        
-        return {
-            "prediction": float(prediction[0]),
-            "currency": "USD" 
-        }
-
+        current_batcher = batcher
+        scored_by = snapshot
+        if cached is not None:
+            prediction = cached
+        elif current_batcher is not None:
+            try:
+                # Queueing plus the shared transform / predict of the micro-batch
+                with stages["batcher"].time():
+                    prediction, scored_by = current_batcher.predict_with_snapshot(
+                        data.features, timeout=current_batcher.max_wait + config.micro_batch_timeout_margin)
+            except BatcherStopped:
+                # Shut down while this request was in flight: score it directly
+                prediction = _predict_record(snapshot, data.features, stages)
+        else:
+            prediction = _predict_record(snapshot, data.features, stages)
+        if cache_key is not None and cached is None:
+            # The batch may have run on a model swapped in after this request started
+            prediction_cache.put(cache_key, scored_by.source_key, prediction)
     except Exception as e:
         log.error(f"Prediction error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+        prediction_errors.labels(endpoint="/predict").inc()
+        error = e
+
+    response = {
+        "prediction": prediction,
+        "currency": "USD" 
+    }
+    if monitoring_data is not None:
+        # Hand off to the background worker; drift checks and retraining never block the response.
+        # The labelled record is monitored even if the prediction failed.
+        with stages["monitoring"].time():
+            queued = monitoring_worker.submit(monitoring_data, prediction=prediction)
+        response["monitoring"] = "queued" if queued else "dropped"
+
+    if error is not None:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(error)}")
+    return response
+
+def _batch_frame(data: BatchHouseFeatures, preprocessor) -> pd.DataFrame:
+    """Build a single DataFrame for the whole batch, aligned to the preprocessor's input columns."""
+    if (data.records is None) == (data.columns is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of 'records' or 'columns'.")
+
+    if data.records is not None:
+        frame = pd.DataFrame.from_records(data.records)
+    else:
+        lengths = {len(values) for values in data.columns.values()}
+        if len(lengths) > 1:
+            raise HTTPException(status_code=400, detail="All columns must have the same number of values.")
+        frame = pd.DataFrame(data.columns)
+
+    if len(frame) > config.batch_max_records:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large ({len(frame)} records, max {config.batch_max_records})."
+        )
+
+    # Missing columns become NaN and are imputed like any other missing value
+    return frame.reindex(columns=preprocessor.feature_names_in_)
+
+def _validate_batch(frame: pd.DataFrame, preprocessor) -> Dict[int, str]:
+    """Coerce numeric columns in place and return {row position: error} for rows that cannot be used."""
+    errors = {}
+    numeric_features = preprocessor.transformers_[0][2]
+    dtypes = frame.dtypes
+    for column in numeric_features:
+        # JSON numbers (and all-missing columns) already arrive as numeric dtypes
+        if pd.api.types.is_numeric_dtype(dtypes[column]):
+            continue
+        raw = frame[column]
+        coerced = pd.to_numeric(raw, errors="coerce")
+        bad_rows = np.flatnonzero(coerced.isna().to_numpy() & raw.notna().to_numpy())
+        for row in bad_rows:
+            errors.setdefault(int(row), f"Non-numeric value {raw.iloc[row]!r} for column '{column}'")
+        frame[column] = coerced
+    return errors
+
+def _predict_record(snapshot: ModelSnapshot, features: dict, stages: dict) -> float:
+    if snapshot.compiled is not None:
+        # Plain dict -> feature vector, no DataFrame or ColumnTransformer overhead
+        with stages["transform"].time():
+            processed_data = snapshot.compiled.transform_record(features)
+        with stages["predict"].time():
+            return float(snapshot.model.predict(processed_data)[0])
+    with stages["dataframe"].time():
+        input_df = pd.DataFrame([features])
+    with stages["transform"].time():
+        processed_data = snapshot.preprocessor.transform(input_df)
+    with stages["predict"].time():
+        return float(snapshot.model.predict(processed_data)[0])
+
+def _predict_frame(frame: pd.DataFrame, snapshot: ModelSnapshot = None, stages: dict = None) -> np.ndarray:
+    snapshot = snapshot or model_store.current()
+    if stages is None:
+        processed_data = snapshot.preprocessor.transform(frame)
+        return snapshot.model.predict(processed_data)
+    with stages["transform"].time():
+        processed_data = snapshot.preprocessor.transform(frame)
+    with stages["predict"].time():
+        return snapshot.model.predict(processed_data)
+
+@app.post("/predict/batch")
+def predict_batch(data: BatchHouseFeatures):
+    stages = _batch_stages
+    _observe_validation(stages)
+    snapshot = model_store.current()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Model not loaded. Train the model first.")
+
+    with stages["dataframe"].time():
+        frame = _batch_frame(data, snapshot.preprocessor)
+    n_records = len(frame)
+    with stages["coerce"].time():
+        errors = _validate_batch(frame, snapshot.preprocessor)
+    predictions = [None] * n_records
+
+    valid_rows = [row for row in range(n_records) if row not in errors]
+    if valid_rows:
+        valid_frame = frame.iloc[valid_rows] if errors else frame
+        try:
+            # One transform and one predict call for the whole batch
+            for row, value in zip(valid_rows, _predict_frame(valid_frame, snapshot, stages)):
+                predictions[row] = float(value)
+        except Exception as e:
+            # Something in the batch broke the vectorized path; isolate the offending rows
+            log.warning(f"Batch prediction failed ({e}), falling back to per-row prediction")
+            for row in valid_rows:
+                try:
+                    predictions[row] = float(_predict_frame(frame.iloc[[row]], snapshot)[0])
+                except Exception as row_e:
+                    errors[row] = str(row_e)
+
+    if errors:
+        prediction_errors.labels(endpoint="/predict/batch").inc(len(errors))
+    log.info(f"Batch prediction: {n_records} records, {len(errors)} failed")
+    return {
+        "predictions": predictions,
+        "errors": [{"index": row, "detail": detail} for row, detail in sorted(errors.items())],
+        "n_records": n_records,
+        "n_failed": len(errors),
+        "currency": "USD"
+    }
 
 @app.get("/")
 def read_root():
@@ -187,4 +406,70 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "model_loaded": model is not None}
+    return {"status": "healthy", "model_loaded": model_store.current() is not None}
+
+@app.get("/model")
+def get_model_info():
+    return model_store.stats()
+
+@app.post("/model/reload")
+def reload_model(force: bool = False):
+    # Loads and warms up the new pair before swapping, so requests keep being served meanwhile
+    try:
+        return model_store.reload(force=force)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading artifacts: {str(e)}")
+
+@app.get("/monitoring/status")
+def get_monitoring_status():
+    return monitoring_worker.stats()
+
+@app.get("/monitoring/drift")
+def get_drift_report():
+    report = get_last_feature_report()
+    if report is None:
+        return {"available": False}
+    return {"available": True, **report.to_dict()}
+
+@app.get("/monitoring/windows")
+def get_drift_windows(limit: int = 100):
+    history = get_window_history()
+    return {"windows": history[-limit:], "total": len(history)}
+
+@app.get("/monitoring/detectors")
+def get_change_detectors():
+    return {"decision": config.drift_decision, **get_sequential_monitor().state()}
+
+@app.get("/retrain/status")
+def get_retrain_status():
+    return get_retrain_scheduler().status()
+
+@app.post("/retrain")
+def trigger_retrain():
+    # Manual trigger: bypasses cooldown and sample checks, but never runs two jobs at once
+    outcome = get_retrain_scheduler().request(reason="manual", force=True)
+    if outcome == "coalesced":
+        raise HTTPException(status_code=409, detail="A retraining job is already scheduled or running")
+    return {"outcome": outcome, **get_retrain_scheduler().status()}
+
+@app.get("/stats/cache")
+def cache_stats():
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats()}
+
+@app.get("/stats/batching")
+def batching_stats():
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    # This process's metrics, then the stage timings the last training run left behind
+    text = registry.render()
+    training_metrics = config.logs_dir / config.training_metrics_file
+    if training_metrics.exists():
+        text += training_metrics.read_text()
+    # As a header: media_type would get a second charset appended
+    return PlainTextResponse(text, headers={"Content-Type": CONTENT_TYPE})
@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+from typing import Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.data.preprocessing import compile_preprocessor, verify_compiled
+from src.models.registry import artifact_path, current_version
+from src.utils.config import config
+from src.utils.logger import logger
+
+log = logger.get_logger("api.model_store")
+
+class ModelSnapshot:
+    """
+    A model and the preprocessor it was trained with; never mutated after creation.
+
+    `compiled` is the preprocessor's fast single-record encoder, or None when it could
+    not be compiled (or verified), in which case callers use the sklearn path.
+    """
+
+    def __init__(self, model, preprocessor, version: Optional[str], source_key, compiled=None):
+        self.model = model
+        self.preprocessor = preprocessor
+        self.version = version
+        self.source_key = source_key
+        self.compiled = compiled
+        self.loaded_at = time.time()
+
+    def info(self) -> dict:
+        return {"version": self.version or "legacy", "loaded_at": self.loaded_at,
+                "fast_path": self.compiled is not None}
+
+def _source_key():
+    """Identifies what is on disk: the current version, or the legacy files' mtimes."""
+    version = current_version()
+    if version is not None:
+        return ("version", version)
+    try:
+        return ("legacy",) + tuple(artifact_path(name).stat().st_mtime_ns
+                                   for name in (config.model_name, config.preprocessor_file))
+    except FileNotFoundError:
+        return None
+
+def _warmup_frame(preprocessor) -> pd.DataFrame:
+    # One realistic row: the imputers' fill values (medians, 'missing') for every input column
+    row = {}
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == "remainder":
+            continue
+        imputer = getattr(transformer, "named_steps", {}).get("imputer")
+        values = imputer.statistics_ if imputer is not None else [np.nan] * len(columns)
+        row.update(zip(columns, values))
+    return pd.DataFrame([row], columns=preprocessor.feature_names_in_)
+
+class ModelStore:
+    """
+    Holds the model/preprocessor pair the API serves and hot-swaps it when a new version is published.
+
+    Requests take one snapshot with `current()` and use it to the end, so a swap never
+    mixes a new model with an old preprocessor and never interrupts in-flight requests.
+    New versions are loaded and warmed up off the request path, then swapped in under
+    a lock. A watcher thread polls the CURRENT pointer every `watch_interval` seconds.
+    """
+
+    def __init__(self, watch_interval: float = None, warmup_runs: int = None):
+        self.watch_interval = config.model_watch_interval if watch_interval is None else watch_interval
+        self.warmup_runs = config.model_warmup_runs if warmup_runs is None else warmup_runs
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._counts = {"reloads": 0, "failed_reloads": 0}
+
+    def current(self) -> Optional[ModelSnapshot]:
+        # A single attribute read: requests always see either the old or the new snapshot
+        return self._snapshot
+
+    def reload(self, force: bool = False) -> dict:
+        """Load the current version if it differs from the served one; returns what happened."""
+        with self._reload_lock:
+            key = _source_key()
+            if key is None:
+                log.warning("Model or preprocessor not found. Please train the model first.")
+                return {"reloaded": False, "reason": "no model found"}
+            served = self._snapshot
+            if not force and served is not None and served.source_key == key:
+                return {"reloaded": False, "reason": "already serving the current version", **served.info()}
+
+            version = key[1] if key[0] == "version" else None
+            try:
+                snapshot = self._load(version, key)
+            except Exception as e:
+                self._counts["failed_reloads"] += 1
+                log.error(f"Error loading artifacts: {str(e)}")
+                if served is None:
+                    raise
+                # Keep serving the previous pair
+                return {"reloaded": False, "reason": f"load failed: {e}", **served.info()}
+
+            with self._lock:
+                self._snapshot = snapshot
+                self._counts["reloads"] += 1
+            log.info(f"Now serving model version {snapshot.version or 'legacy'}")
+            return {"reloaded": True, **snapshot.info()}
+
+    def reload_async(self):
+        threading.Thread(target=self._safe_reload, name="model-reload", daemon=True).start()
+
+    def _safe_reload(self):
+        try:
+            self.reload()
+        except Exception as e:
+            log.error(f"Background model reload failed: {e}")
+
+    def _load(self, version: Optional[str], key) -> ModelSnapshot:
+        model_path = artifact_path(config.model_name, version)
+        preprocessor_path = artifact_path(config.preprocessor_file, version)
+        log.info(f"Loading model from {model_path}")
+        model = joblib.load(model_path)
+        log.info(f"Loading preprocessor from {preprocessor_path}")
+        preprocessor = joblib.load(preprocessor_path)
+
+        compiled = self._compile(preprocessor) if config.fast_path_enabled else None
+        snapshot = ModelSnapshot(model, preprocessor, version, key, compiled)
+        self._warm_up(snapshot)
+        return snapshot
+
+    def warm_up(self):
+        """Run the warm-up predictions on the served snapshot (e.g. in a worker forked after loading)."""
+        if self._snapshot is not None:
+            self._warm_up(self._snapshot)
+
+    def _warm_up(self, snapshot: ModelSnapshot):
+        # Pay the first-call costs (lazy initialisation, allocations) before taking traffic
+        frame = _warmup_frame(snapshot.preprocessor)
+        for _ in range(self.warmup_runs):
+            snapshot.model.predict(snapshot.preprocessor.transform(frame))
+            if snapshot.compiled is not None:
+                snapshot.model.predict(snapshot.compiled.transform_record(frame.iloc[0].to_dict()))
+
+    @staticmethod
+    def _compile(preprocessor):
+        try:
+            compiled = compile_preprocessor(preprocessor)
+            # Check against sklearn on a typical row and on a row with every value missing
+            frame = _warmup_frame(preprocessor)
+            verify_compiled(compiled, preprocessor, pd.concat([frame, frame.where(frame.isna())], ignore_index=True))
+            return compiled
+        except Exception as e:
+            log.warning(f"Fast-path preprocessor unavailable, using sklearn transform: {e}")
+            return None
+
+    def start_watcher(self):
+        if self.watch_interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval):
+            served = self._snapshot
+            key = _source_key()
+            if key is not None and (served is None or key != served.source_key):
+                self._safe_reload()
+
+    def stats(self) -> dict:
+        served = self._snapshot
+        return {
+            "pid": os.getpid(),
+            "loaded": served is not None,
+            **(served.info() if served is not None else {}),
+            "available_version": current_version() or "legacy",
+            "watching": self._watcher is not None and self._watcher.is_alive(),
+            **self._counts
+        }
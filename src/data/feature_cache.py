@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from hashlib import blake2b
+from pathlib import Path
+from typing import Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from src.utils.config import config
+from src.utils.logger import logger
+
+log = logger.get_logger(__name__)
+
+# Bump when the entry layout changes
+_FORMAT = 1
+
+def _cache_dir() -> Path:
+    return config.processed_data_dir / config.feature_cache_dir
+
+def training_data_key(sparse: bool = None) -> str:
+    """
+    Content hash of everything the cached training features are derived from: the raw
+    training file, the preprocessing and reference-profile code, and the settings and
+    library versions that change their output.
+    """
+    import sklearn
+    from src.data import preprocessing, reference_profile
+    sparse = config.sparse_preprocessing if sparse is None else sparse
+    digest = blake2b(digest_size=16)
+    for path in (config.raw_data_dir / config.train_file, Path(preprocessing.__file__),
+                 Path(reference_profile.__file__)):
+        digest.update(path.name.encode())
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    settings = {"format": _FORMAT, "sparse": bool(sparse), "sklearn": sklearn.__version__, "pandas": pd.__version__}
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()
+
+def cached_file(key: str, name: str) -> Path:
+    """Path of an extra artifact stored with a cache entry (it may not exist yet)."""
+    return _cache_dir() / key / name
+
+def load_features(key: str) -> Optional[tuple]:
+    """(X, y, preprocessor) for `key` with X / y memory-mapped, or None on a cache miss."""
+    entry = _cache_dir() / key
+    if not (entry / "meta.json").exists():
+        return None
+    try:
+        with open(entry / "meta.json") as f:
+            meta = json.load(f)
+        if meta["sparse"]:
+            X = sp.csr_matrix((np.load(entry / "X_data.npy", mmap_mode="r"),
+                               np.load(entry / "X_indices.npy", mmap_mode="r"),
+                               np.load(entry / "X_indptr.npy", mmap_mode="r")),
+                              shape=tuple(meta["shape"]), copy=False)
+        else:
+            X = np.load(entry / "X.npy", mmap_mode="r")
+        y = pd.Series(np.load(entry / "y.npy", mmap_mode="r"), name=meta["target"])
+        preprocessor = joblib.load(entry / "preprocessor.joblib")
+    except Exception as e:
+        log.warning(f"Ignoring unreadable feature cache entry {key}: {str(e)}")
+        return None
+    # Last use, for pruning
+    os.utime(entry)
+    return X, y, preprocessor
+
+def save_features(key: str, X, y, preprocessor):
+    """Store fitted features under `key`; the entry appears atomically, fully written."""
+    try:
+        root = _cache_dir()
+        tmp_dir = root / f".tmp-{uuid.uuid4().hex[:8]}"
+        tmp_dir.mkdir(parents=True)
+        if sp.issparse(X):
+            X = X.tocsr()
+            np.save(tmp_dir / "X_data.npy", X.data)
+            np.save(tmp_dir / "X_indices.npy", X.indices)
+            np.save(tmp_dir / "X_indptr.npy", X.indptr)
+        else:
+            np.save(tmp_dir / "X.npy", np.ascontiguousarray(X))
+        np.save(tmp_dir / "y.npy", np.asarray(y))
+        joblib.dump(preprocessor, tmp_dir / "preprocessor.joblib")
+        with open(tmp_dir / "meta.json", "w") as f:
+            json.dump({"shape": list(X.shape), "sparse": sp.issparse(X), "target": getattr(y, "name", None),
+                       "created": time.time()}, f)
+        try:
+            os.replace(tmp_dir, root / key)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        log.info(f"Stored training features in cache entry {key}")
+        prune_feature_cache()
+    except Exception as e:
+        log.error(f"Error storing features in the cache: {str(e)}")
+        raise
+
+def prune_feature_cache(keep: int = None):
+    """Delete all but the `keep` most recently used entries."""
+    keep = config.feature_cache_keep if keep is None else keep
+    root = _cache_dir()
+    if not root.exists():
+        return
+    entries = sorted((p for p in root.iterdir() if p.is_dir() and not p.name.startswith(".")),
+                     key=lambda p: p.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        shutil.rmtree(entry, ignore_errors=True)
+        log.info(f"Removed feature cache entry {entry.name}")
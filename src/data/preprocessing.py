@@ -1,6 +1,5 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.compose import ColumnTransformer
@@ -10,7 +9,14 @@ from src.utils.config import config
 
 log = logger.get_logger(__name__)
 
-def preprocess_data(df: pd.DataFrame, is_train: bool = True):
+def preprocess_data(df: pd.DataFrame, is_train: bool = True, sparse: bool = None):
+    """
+    Build (and for training data, fit) the preprocessing ColumnTransformer.
+
+    With `sparse` (default: config.sparse_preprocessing) the one-hot block and the whole
+    output are CSR matrices instead of dense arrays.
+    """
+    sparse = config.sparse_preprocessing if sparse is None else sparse
     try:
         log.info("Starting data preprocessing...")
         if 'Id' in df.columns:
@@ -27,14 +33,16 @@ def preprocess_data(df: pd.DataFrame, is_train: bool = True):
 
         categorical_transformer = Pipeline(steps=[
             ('imputer', SimpleImputer(strategy='constant', fill_value='missing')),
-            ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
+            ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=sparse))
         ])
 
         preprocessor = ColumnTransformer(
             transformers=[
                 ('num', numeric_transformer, numeric_features),
                 ('cat', categorical_transformer, categorical_features)
-            ])
+            ],
+            # Always stack into CSR in sparse mode, whatever the overall density
+            sparse_threshold=1.0 if sparse else 0.3)
 
         if is_train:
             X = df.drop('SalePrice', axis=1)
@@ -42,7 +50,8 @@ def preprocess_data(df: pd.DataFrame, is_train: bool = True):
             
             X_processed = preprocessor.fit_transform(X)
             
-            log.info(f"Data shape after preprocessing: {X_processed.shape}")
+            log.info(f"Data shape after preprocessing: {X_processed.shape}"
+                     + (f", {X_processed.nnz} stored values" if sparse else ""))
             return X_processed, y, preprocessor
         else:
             pass
@@ -51,15 +60,128 @@ def preprocess_data(df: pd.DataFrame, is_train: bool = True):
         log.error(f"Error in preprocessing: {str(e)}")
         raise
 
+class CompiledPreprocessor:
+    """
+    Flat lookup plan of a fitted preprocessor, for encoding single records without pandas.
+
+    Holds the median-impute values and scaler mean / scale arrays of the numeric columns,
+    and for the categorical columns their impute value and a category -> output column
+    index dict. `transform_record` fills a preallocated feature vector directly from a dict.
+
+    With `zeros_as_missing` (preprocessors with sparse output) zeros are emitted as NaN,
+    because XGBoost treats entries absent from a CSR matrix as missing, not as zero.
+    """
+
+    def __init__(self, numeric_columns, medians, means, scales, categorical_columns,
+                 categorical_fill, category_index, n_features: int, zeros_as_missing: bool = False):
+        self.numeric_columns = list(numeric_columns)
+        self.medians = np.asarray(medians, dtype=np.float64)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.scales = np.asarray(scales, dtype=np.float64)
+        self.categorical_columns = list(categorical_columns)
+        self.categorical_fill = list(categorical_fill)
+        self.category_index = category_index
+        self.n_features = n_features
+        self.zeros_as_missing = zeros_as_missing
+        self.input_columns = self.numeric_columns + self.categorical_columns
+
+    def transform_record(self, record: dict, out: np.ndarray = None) -> np.ndarray:
+        """Encode one record into a (1, n_features) float64 matrix, like preprocessor.transform."""
+        missing = [column for column in self.input_columns if column not in record]
+        if missing:
+            raise KeyError(f"{missing} not in index")
+        if out is None:
+            out = np.zeros((1, self.n_features))
+        else:
+            out.fill(0.0)
+
+        numeric = np.array([record[column] for column in self.numeric_columns], dtype=np.float64)
+        # None becomes NaN in the float conversion; both are imputed with the median
+        nan_mask = np.isnan(numeric)
+        numeric[nan_mask] = self.medians[nan_mask]
+        out[0, :len(numeric)] = (numeric - self.means) / self.scales
+
+        for j, column in enumerate(self.categorical_columns):
+            value = record[column]
+            # Like SimpleImputer on object columns, only NaN counts as missing (None is an unknown level)
+            if isinstance(value, float) and value != value:
+                value = self.categorical_fill[j]
+            # Unknown categories are left all-zero, as with handle_unknown='ignore'
+            position = self.category_index[j].get(value)
+            if position is not None:
+                out[0, position] = 1.0
+        if self.zeros_as_missing:
+            out[out == 0.0] = np.nan
+        return out
+
+def compile_preprocessor(preprocessor: ColumnTransformer) -> CompiledPreprocessor:
+    """Export the fitted ColumnTransformer built by preprocess_data into a CompiledPreprocessor."""
+    transformers = {name: (transformer, list(columns)) for name, transformer, columns in preprocessor.transformers_
+                    if name != "remainder"}
+    if set(transformers) != {"num", "cat"} or preprocessor.remainder != "drop":
+        raise ValueError("Only the num/cat ColumnTransformer built by preprocess_data can be compiled")
+
+    numeric, numeric_columns = transformers["num"]
+    categorical, categorical_columns = transformers["cat"]
+    imputer, scaler = numeric.named_steps["imputer"], numeric.named_steps["scaler"]
+    cat_imputer, onehot = categorical.named_steps["imputer"], categorical.named_steps["onehot"]
+    if onehot.drop_idx_ is not None or getattr(onehot, "infrequent_categories_", None) is not None:
+        raise ValueError("OneHotEncoder with drop or infrequent categories cannot be compiled")
+
+    n_features = len(numeric_columns)
+    means = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    scales = scaler.scale_ if scaler.with_std else np.ones(n_features)
+
+    # ColumnTransformer stacks the numeric block first, then one block per categorical column
+    category_index = []
+    offset = n_features
+    for categories in onehot.categories_:
+        category_index.append({category: offset + i for i, category in enumerate(categories)})
+        offset += len(categories)
+
+    return CompiledPreprocessor(
+        numeric_columns, imputer.statistics_, means, scales,
+        categorical_columns, cat_imputer.statistics_, category_index, offset,
+        zeros_as_missing=preprocessor.sparse_output_
+    )
+
+def verify_compiled(compiled: CompiledPreprocessor, preprocessor: ColumnTransformer, df: pd.DataFrame,
+                    atol: float = 1e-9) -> float:
+    """Encode every row of `df` both ways; returns the max abs difference, raising if it exceeds `atol`."""
+    expected = preprocessor.transform(df)
+    if preprocessor.sparse_output_:
+        # What XGBoost sees from a CSR row: stored values, everything else missing
+        expected = expected.toarray()
+        expected[expected == 0.0] = np.nan
+    records = df.to_dict(orient="records")
+    actual = np.vstack([compiled.transform_record(record) for record in records])
+    same_missing = np.array_equal(np.isnan(actual), np.isnan(expected)) if actual.shape == expected.shape else False
+    max_diff = float(np.nan_to_num(np.abs(actual - expected)).max()) if len(records) else 0.0
+    if not same_missing or max_diff > atol:
+        raise ValueError(f"Compiled preprocessor does not match sklearn output (max abs diff {max_diff})")
+    return max_diff
+
 def load_and_preprocess_data():
+    # Deferred: sklearn.model_selection pulls in scipy.stats, which serving never needs
+    from sklearn.model_selection import train_test_split
+    from src.data.feature_cache import training_data_key, load_features, save_features
     try:
         train_path = config.raw_data_dir / config.train_file
         test_path = config.raw_data_dir / config.test_file
         
-        log.info(f"Loading data from {train_path}")
-        train_df = pd.read_csv(train_path)
-        
-        X, y, preprocessor = preprocess_data(train_df, is_train=True)
+        # Unchanged data and preprocessing code: reuse the fitted preprocessor and features
+        key = training_data_key() if config.feature_cache_enabled else None
+        cached = load_features(key) if key else None
+        if cached is not None:
+            X, y, preprocessor = cached
+            log.info(f"Loaded preprocessed training data {X.shape} from feature cache entry {key}")
+        else:
+            log.info(f"Loading data from {train_path}")
+            train_df = pd.read_csv(train_path)
+            
+            X, y, preprocessor = preprocess_data(train_df, is_train=True)
+            if key:
+                save_features(key, X, y, preprocessor)
         
         X_train, X_val, y_train, y_val = train_test_split(
             X, y, test_size=config.test_size, random_state=config.random_state
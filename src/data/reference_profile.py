@@ -0,0 +1,96 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils.config import config
+from src.utils.logger import logger
+
+log = logger.get_logger(__name__)
+
+N_QUANTILES = 101
+MISSING_CATEGORY = "missing"
+
+def bin_values(edges: np.ndarray, values) -> np.ndarray:
+    """Map values to bucket indices 0..len(edges)-2; the first and last buckets are open-ended."""
+    return np.searchsorted(edges[1:-1], values, side="right")
+
+def build_reference_profile(df: pd.DataFrame, n_bins: int = None) -> dict:
+    """
+    Summarize the training data for drift detection.
+
+    Numeric columns (including the target) get sorted values, quantiles and a histogram
+    over quantile bins; categorical columns get their levels and frequencies. Missing
+    categorical values are counted as 'missing', like the preprocessing imputer does.
+    """
+    n_bins = n_bins or config.drift_n_bins
+    if 'Id' in df.columns:
+        df = df.drop('Id', axis=1)
+    numeric_features = df.select_dtypes(include=['int64', 'float64']).columns
+    categorical_features = df.select_dtypes(include=['object']).columns
+
+    profile = {
+        "numeric_columns": np.array(list(numeric_features)),
+        "categorical_columns": np.array(list(categorical_features)),
+        "n_rows": np.array(len(df))
+    }
+    for column in numeric_features:
+        values = df[column].to_numpy(dtype=np.float64)
+        values = np.sort(values[~np.isnan(values)])
+        edges = np.quantile(values, np.linspace(0.0, 1.0, n_bins + 1))
+        profile[f"sorted__{column}"] = values.astype(np.float32)
+        profile[f"quantiles__{column}"] = np.quantile(values, np.linspace(0.0, 1.0, N_QUANTILES))
+        profile[f"edges__{column}"] = edges
+        profile[f"counts__{column}"] = np.bincount(bin_values(edges, values), minlength=n_bins)
+        profile[f"missing__{column}"] = np.array(len(df) - len(values))
+    for column in categorical_features:
+        counts = df[column].fillna(MISSING_CATEGORY).astype(str).value_counts()
+        profile[f"levels__{column}"] = counts.index.to_numpy(dtype=str)
+        profile[f"level_counts__{column}"] = counts.to_numpy(dtype=np.int64)
+        profile[f"frequencies__{column}"] = (counts / counts.sum()).to_numpy(dtype=np.float64)
+    return profile
+
+def save_reference_profile(profile: dict, path: Path):
+    """Write the profile as a compressed .npz (no pickled objects), replacing any previous one atomically."""
+    path = Path(path)
+    tmp_path = path.with_name(path.stem + ".tmp.npz")
+    np.savez_compressed(tmp_path, **profile)
+    os.replace(tmp_path, path)
+    log.info(f"Reference profile saved to {path}")
+
+class ReferenceProfile:
+    """Read-only view over a saved reference profile."""
+
+    def __init__(self, arrays: dict):
+        self._arrays = arrays
+        self.numeric_columns = [str(c) for c in arrays["numeric_columns"]]
+        self.categorical_columns = [str(c) for c in arrays["categorical_columns"]]
+        self.n_rows = int(arrays["n_rows"])
+
+    @classmethod
+    def load(cls, path: Path) -> "ReferenceProfile":
+        # Load every array eagerly; the file is small and the profile is cached by the monitor
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def sorted_values(self, column: str) -> np.ndarray:
+        return self._arrays[f"sorted__{column}"]
+
+    def quantiles(self, column: str) -> np.ndarray:
+        return self._arrays[f"quantiles__{column}"]
+
+    def edges(self, column: str) -> np.ndarray:
+        return self._arrays[f"edges__{column}"]
+
+    def counts(self, column: str) -> np.ndarray:
+        return self._arrays[f"counts__{column}"]
+
+    def levels(self, column: str) -> np.ndarray:
+        return self._arrays[f"levels__{column}"]
+
+    def level_counts(self, column: str) -> np.ndarray:
+        return self._arrays[f"level_counts__{column}"]
+
+    def frequencies(self, column: str) -> np.ndarray:
+        return self._arrays[f"frequencies__{column}"]
@@ -0,0 +1,99 @@
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+from src.utils.config import config
+from src.utils.locks import file_lock
+from src.utils.logger import logger
+
+log = logger.get_logger(__name__)
+
+# Artifacts that make up one model version; they are only ever published together
+VERSION_ARTIFACTS = (config.model_name, config.preprocessor_file, config.reference_profile_file)
+
+def _current_pointer() -> Path:
+    return config.models_dir / config.model_current_file
+
+def current_version() -> Optional[str]:
+    """Name of the version the CURRENT pointer refers to, or None for a legacy (unversioned) models dir."""
+    try:
+        version = _current_pointer().read_text().strip()
+    except FileNotFoundError:
+        return None
+    return version if version and (config.model_versions_dir / version).is_dir() else None
+
+def artifact_path(name: str, version: str = None) -> Path:
+    """Path of an artifact of the given (default: current) version, falling back to the legacy flat layout."""
+    version = version or current_version()
+    if version is None:
+        return config.models_dir / name
+    return config.model_versions_dir / version / name
+
+def list_versions() -> List[str]:
+    if not config.model_versions_dir.exists():
+        return []
+    return sorted(p.name for p in config.model_versions_dir.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+def create_staging_dir() -> Path:
+    """Empty directory to write a new version's artifacts into before it is published."""
+    staging = config.model_versions_dir / f".staging-{uuid.uuid4().hex[:8]}"
+    staging.mkdir(parents=True)
+    return staging
+
+def _tmp_path(path: Path) -> Path:
+    # Unique per writer, so concurrent publishes never write into each other's temp file
+    return path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+
+def _atomic_write_text(path: Path, text: str):
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _atomic_copy(src: Path, dst: Path):
+    tmp_path = _tmp_path(dst)
+    shutil.copy2(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+def publish_version(staging_dir: Path) -> str:
+    """
+    Turn a fully written staging directory into a new version and make it current.
+
+    The directory is renamed into place and then the CURRENT pointer is replaced, both
+    atomically, so a reader following the pointer always sees a complete model /
+    preprocessor / profile set. The legacy flat files in models_dir are refreshed
+    afterwards for tools that still read them directly. Publishes from several
+    processes are serialized, so one never prunes a version another is still copying.
+    """
+    staging_dir = Path(staging_dir)
+    missing = [name for name in VERSION_ARTIFACTS if not (staging_dir / name).exists()]
+    if missing:
+        raise FileNotFoundError(f"Cannot publish {staging_dir}, missing artifacts: {missing}")
+
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    version_dir = config.model_versions_dir / version
+    with file_lock(config.model_versions_dir / ".publish.lock"):
+        os.replace(staging_dir, version_dir)
+        _atomic_write_text(_current_pointer(), version + "\n")
+        log.info(f"Model version {version} published and marked current")
+
+        for name in VERSION_ARTIFACTS:
+            _atomic_copy(version_dir / name, config.models_dir / name)
+
+        prune_versions()
+    return version
+
+def prune_versions(keep: int = None):
+    """Delete the oldest versions so at most `keep` remain, never the current one."""
+    keep = config.model_versions_keep if keep is None else keep
+    current = current_version()
+    versions = list_versions()
+    stale = [v for v in versions if v != current][:max(len(versions) - keep, 0)]
+    for version in stale:
+        shutil.rmtree(config.model_versions_dir / version, ignore_errors=True)
+        log.info(f"Removed old model version {version}")
@@ -0,0 +1,232 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.models.registry import artifact_path
+from src.utils.config import config
+from src.utils.logger import logger
+
+log = logger.get_logger(__name__)
+
+PREDICTION_COLUMN = "SalePrice"
+
+def _file_format(path: Path) -> str:
+    return "parquet" if Path(path).suffix.lower() in (".parquet", ".pq") else "csv"
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ImportError("Parquet input/output requires pyarrow (pip install pyarrow)")
+
+class _SegmentReader(io.RawIOBase):
+    """Read-only view of bytes [start, end) of a file, so pandas can parse one slice of a CSV."""
+
+    def __init__(self, f, start: int, end: int):
+        self._f = f
+        self._f.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self._remaining)
+        if n <= 0:
+            return 0
+        data = self._f.read(n)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+def _csv_segments(path: Path, n_segments: int):
+    """Split a CSV into byte ranges that start and end on line boundaries (no quoted newlines assumed)."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.readline()
+        data_start = f.tell()
+        boundaries = [data_start]
+        for k in range(1, n_segments):
+            f.seek(data_start + (size - data_start) * k // n_segments)
+            f.readline()
+            boundaries.append(min(f.tell(), size))
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+class _Scorer:
+    """Model and preprocessor loaded once per process, applied chunk by chunk."""
+
+    def __init__(self, model_path: Path, preprocessor_path: Path):
+        self.model = joblib.load(model_path)
+        self.preprocessor = joblib.load(preprocessor_path)
+        self.columns = list(self.preprocessor.feature_names_in_)
+        self.categorical_columns = list(self.preprocessor.transformers_[1][2])
+
+    def predict(self, chunk: pd.DataFrame, id_column: str) -> pd.DataFrame:
+        # Missing columns become NaN and are imputed, like the batch API
+        frame = chunk.reindex(columns=self.columns)
+        # Parquet nulls arrive as None in object columns; the imputer only recognises NaN
+        categorical = frame[self.categorical_columns]
+        frame[self.categorical_columns] = categorical.where(categorical.notna(), np.nan)
+        predictions = self.model.predict(self.preprocessor.transform(frame))
+        result = pd.DataFrame({PREDICTION_COLUMN: predictions.astype(np.float64)})
+        if id_column in chunk.columns:
+            result.insert(0, id_column, chunk[id_column].to_numpy())
+        return result
+
+    def read_csv(self, path: Path, chunk_size: int, segment=None):
+        # Categoricals are read as strings so an all-NaN chunk does not turn them into floats
+        dtype = {column: object for column in self.categorical_columns}
+        if segment is None:
+            yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtype)
+            return
+        with open(path, "rb") as f:
+            header = pd.read_csv(io.BytesIO(f.readline()), nrows=0).columns
+            reader = io.BufferedReader(_SegmentReader(f, *segment))
+            yield from pd.read_csv(reader, chunksize=chunk_size, dtype=dtype, header=None, names=header)
+
+    def read_parquet(self, path: Path, chunk_size: int, row_groups=None):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=chunk_size, row_groups=row_groups):
+            yield batch.to_pandas()
+
+class _Writer:
+    """Appends prediction chunks to a CSV or Parquet file."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.format = _file_format(self.path)
+        self._parquet = None
+        self._header = True
+
+    def write(self, result: pd.DataFrame):
+        if self.format == "csv":
+            result.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False)
+            self._header = False
+            return
+        pyarrow = _require_pyarrow()
+        table = pyarrow.Table.from_pandas(result, preserve_index=False)
+        if self._parquet is None:
+            self._parquet = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        self._parquet.write_table(table)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        elif self._header:
+            # Nothing was scored: still leave a valid (empty) output
+            self.write(pd.DataFrame(columns=[PREDICTION_COLUMN]))
+
+def _score_part(model_path, preprocessor_path, input_path, output_path, chunk_size, id_column, part=None) -> int:
+    """Score one input part (CSV byte range / Parquet row groups / whole file) into output_path."""
+    scorer = _Scorer(model_path, preprocessor_path)
+    if _file_format(input_path) == "parquet":
+        chunks = scorer.read_parquet(input_path, chunk_size, row_groups=part)
+    else:
+        chunks = scorer.read_csv(input_path, chunk_size, segment=part)
+
+    writer = _Writer(output_path)
+    n_rows = 0
+    try:
+        for chunk in chunks:
+            if chunk.empty:
+                # Header-only CSVs and empty row groups: the estimators reject 0-row inputs
+                continue
+            writer.write(scorer.predict(chunk, id_column))
+            n_rows += len(chunk)
+    finally:
+        writer.close()
+    return n_rows
+
+def _concatenate(parts, output_path: Path):
+    """Merge per-worker outputs in input order, one part at a time."""
+    if _file_format(output_path) == "csv":
+        with open(output_path, "wb") as out:
+            for i, part in enumerate(parts):
+                with open(part, "rb") as f:
+                    header = f.readline()
+                    if i == 0:
+                        out.write(header)
+                    shutil.copyfileobj(f, out)
+        return
+    _require_pyarrow()
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for part in parts:
+            parquet = pq.ParquetFile(part)
+            for i in range(parquet.num_row_groups):
+                table = parquet.read_row_group(i)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def score_file(input_path, output_path, chunk_size: int = None, workers: int = 1, id_column: str = "Id") -> int:
+    """
+    Score a CSV or Parquet file with the current model, streaming predictions to `output_path`.
+
+    The input is read `chunk_size` rows at a time (CSV chunks, Parquet record batches), so
+    memory stays bounded whatever the file size. With `workers` > 1 the file is split into
+    one part per worker (CSV byte ranges on line boundaries, Parquet row groups); each worker
+    loads the artifacts once, scores its part into a temporary file, and the parts are
+    concatenated in input order. Returns the number of rows scored.
+    """
+    input_path, output_path = Path(input_path), Path(output_path)
+    chunk_size = chunk_size or config.scoring_chunk_size
+    model_path = artifact_path(config.model_name)
+    preprocessor_path = artifact_path(config.preprocessor_file)
+    if not model_path.exists() or not preprocessor_path.exists():
+        raise FileNotFoundError("Model or preprocessor not found. Please train the model first.")
+
+    start = time.perf_counter()
+    try:
+        parts = None
+        if workers > 1:
+            if _file_format(input_path) == "parquet":
+                _require_pyarrow()
+                import pyarrow.parquet as pq
+                n_groups = pq.ParquetFile(input_path).num_row_groups
+                parts = [list(groups) for groups in np.array_split(np.arange(n_groups), max(min(workers, n_groups), 1))
+                         if len(groups)]
+            else:
+                parts = _csv_segments(input_path, workers)
+
+        if not parts:
+            # Single worker, or nothing to split (no row groups / header-only CSV): an empty output is
+            # written the same way as a sequential run's
+            n_rows = _score_part(model_path, preprocessor_path, input_path, output_path, chunk_size, id_column)
+        else:
+            with tempfile.TemporaryDirectory(dir=output_path.parent) as tmp_dir:
+                part_paths = [Path(tmp_dir) / f"part-{i:04d}{output_path.suffix}" for i in range(len(parts))]
+                # Spawned workers: no inherited threads or locks from the caller
+                with get_context("spawn").Pool(len(parts)) as pool:
+                    counts = pool.starmap(_score_part, [
+                        (model_path, preprocessor_path, input_path, part_path, chunk_size, id_column,
+                         [int(g) for g in part] if isinstance(part, list) else part)
+                        for part, part_path in zip(parts, part_paths)
+                    ])
+                _concatenate(part_paths, output_path)
+            n_rows = sum(counts)
+    except Exception as e:
+        log.error(f"Error scoring {input_path}: {str(e)}")
+        raise
+
+    elapsed = time.perf_counter() - start
+    log.info(f"Scored {n_rows} rows from {input_path} into {output_path} in {elapsed:.1f}s "
+             f"({n_rows / max(elapsed, 1e-9):.0f} rows/s, workers={max(workers, 1)})")
+    return n_rows
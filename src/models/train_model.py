@@ -1,67 +1,492 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
 import xgboost as xgb
 import joblib
+import numpy as np
+import pandas as pd
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from src.utils.config import config
 from src.utils.logger import logger
-from src.utils.mlflow_utils import mlflow_utils
+from src.utils.metrics import MetricsRegistry
+from src.utils.mlflow_utils import mlflow_utils, RunLogger
 from src.data.preprocessing import load_and_preprocess_data
+from src.data.feature_cache import cached_file, training_data_key
+from src.data.reference_profile import build_reference_profile, save_reference_profile
+from src.models.registry import artifact_path, create_staging_dir, current_version, publish_version
+from src.models.tuning import tune_hyperparameters
+from monitoring.store import MonitoringStore
 
 log = logger.get_logger(__name__)
 
-def train():
-    """Train the model and log to MLflow"""
+# Training runs in the pipeline process, not the API: its metrics are written to
+# config.training_metrics_file when a run finishes and served from there by /metrics
+training_metrics = MetricsRegistry()
+stage_seconds = training_metrics.gauge("training_stage_duration_seconds",
+                                       "Duration of each stage of the last training run", ["mode", "stage"])
+last_success = training_metrics.gauge("training_last_success_timestamp_seconds",
+                                      "Unix time the last successful training run finished", ["mode"])
+
+class _StageTimer:
+    """Times consecutive stages of a training run: lap(stage) closes the stage that just ran."""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.laps = {}
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.laps[stage] = now - self._last
+        stage_seconds.labels(mode=self.mode, stage=stage).set(self.laps[stage])
+        self._last = now
+
+    def finish(self):
+        stage_seconds.labels(mode=self.mode, stage="total").set(time.perf_counter() - self._start)
+        last_success.labels(mode=self.mode).set(time.time())
+        log.info("Training stages: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.laps.items()))
+        try:
+            config.logs_dir.mkdir(parents=True, exist_ok=True)
+            training_metrics.write_textfile(config.logs_dir / config.training_metrics_file)
+        except Exception as e:
+            log.warning(f"Could not write training metrics: {str(e)}")
+
+def _monitoring_store():
+    return MonitoringStore.open_existing(config.data_dir / config.monitoring_store_dir)
+
+def _save_training_state(path, mode: str, monitoring_records: int, **state):
+    """
+    Record how a version was trained. `monitoring_records` is how many monitoring records it
+    was trained on, i.e. where its successor's new data starts.
+    """
+    with open(path, "w") as f:
+        json.dump({"mode": mode, "monitoring_records": monitoring_records, **state}, f)
+
+def _load_training_state() -> dict:
+    path = artifact_path(config.training_state_file)
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def _evaluate(model, X_val, y_val):
+    predictions = model.predict(X_val)
+    metrics = {
+        "rmse": mean_squared_error(y_val, predictions, squared=False),
+        "mae": mean_absolute_error(y_val, predictions),
+        "r2": r2_score(y_val, predictions)
+    }
+    return predictions, metrics
+
+def _log_and_publish(staging_dir, model, params: dict, metrics: dict, X_val, y_val, predictions,
+                     async_logging: bool):
+    """Log a trained version to MLflow and publish it (first, with async logging). Returns (version, RunLogger)."""
+    # Save Model Locally
+    model_path = staging_dir / config.model_name
+    joblib.dump(model, model_path)
+    log.info(f"Model saved localy to {model_path}")
+
+    mlflow_utils.start_run()
+    run_logger = RunLogger(background=async_logging)
+    artifact_dir = staging_dir
+    version = None
+    if async_logging:
+        version = publish_version(staging_dir)
+        artifact_dir = config.model_versions_dir / version
+        log.info(f"Model version {version} published, MLflow logging continues in the background")
+
+    try:
+        log.info("Logging to MLflow...")
+        run_logger.submit("params", mlflow_utils.log_params, params)
+        run_logger.submit("metrics", mlflow_utils.log_metrics, metrics)
+        run_logger.submit("model", mlflow_utils.log_model, model, "model")
+
+        # Log the preprocessor as an artifact
+        import mlflow
+        run_logger.submit("preprocessor", mlflow.log_artifact, str(artifact_dir / config.preprocessor_file), "preprocessor")
+        run_logger.submit("reference_profile", mlflow.log_artifact,
+                          str(artifact_dir / config.reference_profile_file), "reference_profile")
+
+        # Plots are nice to have: a failure there does not fail the training run
+        if config.mlflow_log_plots:
+            run_logger.submit("plots", mlflow_utils.log_plots, model, X_val, y_val,
+                              predictions=predictions, required=False)
+
+        if not async_logging:
+            version = publish_version(staging_dir)
+    except Exception:
+        # A background logger ends the run itself once its queue is drained
+        if run_logger.background:
+            run_logger.close()
+        else:
+            mlflow_utils.end_run("FAILED")
+        raise
+    run_logger.close()
+    return version, run_logger
+
+def _write_reference_profile(profile_path):
+    # Reference distributions for drift detection, computed once per training data set
+    cached_profile = cached_file(training_data_key(), config.reference_profile_file) \
+        if config.feature_cache_enabled else None
+    if cached_profile is not None and cached_profile.exists():
+        shutil.copy2(cached_profile, profile_path)
+    else:
+        reference_df = pd.read_csv(config.raw_data_dir / config.train_file)
+        save_reference_profile(build_reference_profile(reference_df), profile_path)
+        if cached_profile is not None and cached_profile.parent.exists():
+            shutil.copy2(profile_path, cached_profile)
+
+def train(async_logging: bool = None) -> RunLogger:
+    """
+    Train the model and log to MLflow.
+
+    With async logging the model is published as soon as it is saved and the MLflow steps
+    (params, metrics, model, artifacts, plots) run on a background thread; otherwise they
+    run before publishing. Returns the RunLogger, whose wait() reports when logging is done.
+    """
+    async_logging = config.mlflow_async_logging if async_logging is None else async_logging
+    # All artifacts of this run are written to a staging directory and published together
+    # at the end, so the API never sees a half-written or mismatched model/preprocessor pair
+    staging_dir = create_staging_dir()
+    timer = _StageTimer("full")
     try:
         mlflow_utils.setup_mlflow()
         log.info("Loading and preprocessing data...")
         X_train, X_val, y_train, y_val, preprocessor = load_and_preprocess_data()
-        
-        preprocessor_path = config.models_dir / "preprocessor.joblib"
+        timer.lap("load_data")
+
+        preprocessor_path = staging_dir / config.preprocessor_file
         joblib.dump(preprocessor, preprocessor_path)
         log.info(f"Preprocessor saved to {preprocessor_path}")
-        
+
+        _write_reference_profile(staging_dir / config.reference_profile_file)
+        timer.lap("reference_profile")
+
         params = config.xgboost_params
+        tuning = {}
+        if config.tuning_enabled:
+            log.info("Searching hyperparameters...")
+            best = tune_hyperparameters(X_train, y_train)
+            params = best["params"]
+            tuning = {"tuning_strategy": config.tuning_strategy, "tuning_run_id": best["run_id"]}
+            timer.lap("tuning")
         model = xgb.XGBRegressor(**params)
-        
+
         log.info("Training model...")
-        model.fit(X_train, y_train, 
+        model.fit(X_train, y_train,
                  eval_set=[(X_val, y_val)],
                  early_stopping_rounds=10,
                  verbose=False)
-        
+        timer.lap("fit")
+
         log.info("Evaluating model...")
-        predictions = model.predict(X_val)
-        rmse = mean_squared_error(y_val, predictions, squared=False)
-        mae = mean_absolute_error(y_val, predictions)
-        r2 = r2_score(y_val, predictions)
-        
+        predictions, metrics = _evaluate(model, X_val, y_val)
+        # train.csv only: every monitoring record is still new to this model
+        _save_training_state(staging_dir / config.training_state_file, "full", monitoring_records=0)
+        timer.lap("evaluate")
+
+        version, run_logger = _log_and_publish(staging_dir, model, {**params, "mode": "full", **tuning}, metrics,
+                                               X_val, y_val, predictions, async_logging)
+        timer.lap("publish")
+        timer.finish()
+        log.info(f"Training pipeline completed successfully (model version {version}).")
+        return run_logger
+
+    except Exception as e:
+        log.error(f"Error in training pipeline: {str(e)}")
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+def continue_boosting(base_model, X_train, y_train, X_val, y_val, n_rounds: int = None):
+    """
+    Add up to `n_rounds` trees to a copy of `base_model`, fitted on new data, with early stopping on X_val.
+
+    The new trees are grown with the base model's own parameters (which may come from a
+    hyperparameter search), not the current config; only the number of rounds changes.
+    """
+    params = {**base_model.get_params(), "n_estimators": n_rounds or config.incremental_boost_rounds,
+              "early_stopping_rounds": 10}
+    booster = base_model.get_booster()
+    # Drop the trees an early-stopped base model grew past its best iteration
+    best_iteration = getattr(base_model, "best_iteration", None)
+    if best_iteration is not None:
+        booster = booster[:best_iteration + 1]
+    model = xgb.XGBRegressor(**params)
+    model.fit(X_train, y_train,
+              eval_set=[(X_val, y_val)],
+              verbose=False,
+              xgb_model=booster)
+    return model
+
+def _new_labelled_records(preprocessor, start: int):
+    """
+    (frame, end, reason): the labelled monitoring records in [start, end), or frame None and
+    the reason when they cannot be used with the frozen preprocessor (a different schema or
+    unseen categories).
+    """
+    store = _monitoring_store()
+    if store is None:
+        return pd.DataFrame(), 0, None
+    columns = {name: list(cols) for name, _, cols in preprocessor.transformers_ if name != "remainder"}
+    if store.schema != {"numeric": columns["num"] + ['SalePrice'], "categorical": columns["cat"]}:
+        return None, len(store), "monitoring store schema differs from the preprocessor"
+
+    end = len(store)
+    # Bounded, so records appended while this runs are left for the next run
+    frame = store.read(start=start, stop=end)
+    frame = frame[frame['SalePrice'].notna()]
+    encoder = preprocessor.named_transformers_["cat"].named_steps["onehot"]
+    unseen = [column for column, known in zip(columns["cat"], encoder.categories_)
+              if not set(frame[column].dropna()).issubset(known)]
+    if unseen:
+        return None, end, f"unseen categories in {unseen}"
+    return frame, end, None
+
+def train_incremental(async_logging: bool = None) -> Optional[RunLogger]:
+    """
+    Continue boosting the current model on the labelled monitoring records collected since it was trained.
+
+    The current preprocessor and reference profile are reused unchanged, so only the new
+    records are transformed and only `incremental_boost_rounds` trees are added. Falls back
+    to a full retrain when there is no current model or the records no longer fit the frozen
+    preprocessor; with fewer than `incremental_min_samples` new labelled records the current
+    model is kept and None is returned. Metrics are computed on a holdout of the new records,
+    next to the previous model's RMSE on the same holdout (base_rmse).
+    """
+    async_logging = config.mlflow_async_logging if async_logging is None else async_logging
+    # Deferred like in load_and_preprocess_data: pulls in scipy.stats
+    from sklearn.model_selection import train_test_split
+    base_version = current_version()
+    model_path = artifact_path(config.model_name)
+    preprocessor_path = artifact_path(config.preprocessor_file)
+    if not model_path.exists() or not preprocessor_path.exists():
+        log.info("No current model, running a full retrain")
+        return _train_full(async_logging)
+
+    preprocessor = joblib.load(preprocessor_path)
+    start = _load_training_state().get("monitoring_records", 0)
+    frame, end, reason = _new_labelled_records(preprocessor, start)
+    if frame is None:
+        log.info(f"Incremental retraining not possible ({reason}), running a full retrain")
+        return _train_full(async_logging)
+    if len(frame) < config.incremental_min_samples:
+        log.info(f"Only {len(frame)} new labelled records since version {base_version} "
+                 f"(need {config.incremental_min_samples}), keeping the current model")
+        return None
+
+    staging_dir = create_staging_dir()
+    timer = _StageTimer("incremental")
+    try:
+        mlflow_utils.setup_mlflow()
+        started = time.perf_counter()
+        base_model = joblib.load(model_path)
+        X = preprocessor.transform(frame.drop(columns=['SalePrice']))
+        y = frame['SalePrice'].to_numpy()
+        X_train, X_val, y_train, y_val = train_test_split(
+            X, y, test_size=config.test_size, random_state=config.random_state
+        )
+        timer.lap("load_data")
+
+        log.info(f"Continuing boosting from version {base_version} on {len(frame)} new records "
+                 f"(monitoring records {start}-{end})...")
+        model = continue_boosting(base_model, X_train, y_train, X_val, y_val)
+        timer.lap("fit")
+        predictions, metrics = _evaluate(model, X_val, y_val)
+        _, base_metrics = _evaluate(base_model, X_val, y_val)
+        timer.lap("evaluate")
+        metrics["base_rmse"] = base_metrics["rmse"]
+        metrics["train_seconds"] = time.perf_counter() - started
+        log.info(f"Incremental retrain took {metrics['train_seconds']:.2f}s: "
+                 f"rmse {metrics['rmse']:.1f} (previous model {metrics['base_rmse']:.1f})")
+
+        # The frozen preprocessor and its drift reference carry over to the new version
+        shutil.copy2(preprocessor_path, staging_dir / config.preprocessor_file)
+        shutil.copy2(artifact_path(config.reference_profile_file), staging_dir / config.reference_profile_file)
+        _save_training_state(staging_dir / config.training_state_file, "incremental", monitoring_records=end,
+                             base_version=base_version)
+
+        params = {**{k: v for k, v in model.get_params().items() if v is not None}, "mode": "incremental",
+                  "base_version": base_version, "new_samples": len(frame)}
+        version, run_logger = _log_and_publish(staging_dir, model, params, metrics, X_val, y_val, predictions,
+                                               async_logging)
+        timer.lap("publish")
+        timer.finish()
+        log.info(f"Incremental training completed successfully (model version {version}).")
+        return run_logger
+
+    except Exception as e:
+        log.error(f"Error in incremental training: {str(e)}")
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+class _ChunkIter(xgb.DataIter):
+    """
+    Feeds XGBoost one preprocessed chunk at a time, either the training rows or the holdout
+    rows of every chunk. The holdout is a fixed random fraction per chunk, so both iterators
+    (and repeated passes) agree on which rows are held out.
+    """
+
+    def __init__(self, make_chunks, preprocessor, holdout: bool, cache_prefix: str):
+        self._make_chunks = make_chunks
+        self._preprocessor = preprocessor
+        self._holdout = holdout
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        self._chunks = None
+
+    def next(self, input_data) -> int:
+        if self._chunks is None:
+            self._chunks = enumerate(self._make_chunks())
+        for i, chunk in self._chunks:
+            chunk = chunk[_holdout_mask(i, len(chunk)) == self._holdout]
+            if len(chunk):
+                input_data(data=_transform_chunk(self._preprocessor, chunk), label=chunk['SalePrice'].to_numpy())
+                return 1
+        return 0
+
+def _holdout_mask(chunk_index: int, n_rows: int) -> np.ndarray:
+    return np.random.default_rng(config.random_state + chunk_index).random(n_rows) < config.test_size
+
+def _transform_chunk(preprocessor, chunk: pd.DataFrame):
+    # Missing columns become NaN and are imputed, like the batch API
+    return preprocessor.transform(chunk.reindex(columns=preprocessor.feature_names_in_))
+
+def _training_store(preprocessor) -> Optional[MonitoringStore]:
+    """The monitoring store, if there is one whose schema matches the preprocessor."""
+    store = _monitoring_store()
+    if store is None:
+        return None
+    columns = {name: list(cols) for name, _, cols in preprocessor.transformers_ if name != "remainder"}
+    if store.schema != {"numeric": columns["num"] + ['SalePrice'], "categorical": columns["cat"]}:
+        log.warning("Monitoring store schema differs from the preprocessor, training on train.csv only")
+        return None
+    return store
+
+def _training_chunks(preprocessor, chunk_rows: int, store: Optional[MonitoringStore], stop: int = None):
+    """train.csv, then the labelled monitoring records before `stop`, `chunk_rows` rows at a time."""
+    categorical = list(preprocessor.transformers_[1][2])
+    # Categoricals are read as strings so an all-NaN chunk does not turn them into floats
+    yield from pd.read_csv(config.raw_data_dir / config.train_file, chunksize=chunk_rows,
+                           dtype={column: object for column in categorical})
+
+    if store is None:
+        return
+    stop = len(store) if stop is None else stop
+    for start in range(0, stop, chunk_rows):
+        chunk = store.read(start=start, stop=min(start + chunk_rows, stop))
+        yield chunk[chunk['SalePrice'].notna()]
+
+def _booster_params(params: dict) -> dict:
+    """XGBRegressor parameters as xgb.train() parameters (hist is required for external memory)."""
+    names = {"random_state": "seed", "n_jobs": "nthread"}
+    booster_params = {names.get(k, k): v for k, v in params.items() if k != "n_estimators"}
+    if booster_params.get("nthread") == -1:
+        booster_params.pop("nthread")
+    return {"objective": "reg:squarederror", "tree_method": "hist", **booster_params}
+
+def _training_matrices(make_chunks, preprocessor, page_dir: str = None):
+    """
+    Training and holdout DMatrices built chunk by chunk. By default they are QuantileDMatrix
+    objects: only the quantized (1-4 bytes per value) histogram index is kept, never a full
+    float matrix. With `page_dir`, external-memory DMatrices keep their pages on disk instead.
+    """
+    if page_dir is not None:
+        dtrain = xgb.DMatrix(_ChunkIter(make_chunks, preprocessor, False, os.path.join(page_dir, "train")))
+        dval = xgb.DMatrix(_ChunkIter(make_chunks, preprocessor, True, os.path.join(page_dir, "val")))
+        return dtrain, dval
+    dtrain = xgb.QuantileDMatrix(_ChunkIter(make_chunks, preprocessor, False, None))
+    # Holdout binned with the training cuts
+    dval = xgb.QuantileDMatrix(_ChunkIter(make_chunks, preprocessor, True, None), ref=dtrain)
+    return dtrain, dval
+
+def train_out_of_core(async_logging: bool = None) -> RunLogger:
+    """
+    Full retrain on train.csv plus all labelled monitoring records without loading them into memory.
+
+    The preprocessor is fitted on train.csv (reference data, same as train()); every data
+    source is then read in chunks of `out_of_core_chunk_rows`, transformed and handed to
+    XGBoost through a DataIter, so no DataFrame or float matrix of all records ever exists
+    (see _training_matrices for where the data lives instead).
+    """
+    async_logging = config.mlflow_async_logging if async_logging is None else async_logging
+    staging_dir = create_staging_dir()
+    page_dir = None
+    if config.out_of_core_external_memory:
+        config.processed_data_dir.mkdir(parents=True, exist_ok=True)
+        page_dir = tempfile.mkdtemp(prefix="xgb-pages-", dir=config.processed_data_dir)
+    timer = _StageTimer("out_of_core")
+    try:
+        mlflow_utils.setup_mlflow()
+        *_, preprocessor = load_and_preprocess_data()
+        joblib.dump(preprocessor, staging_dir / config.preprocessor_file)
+        timer.lap("load_data")
+        _write_reference_profile(staging_dir / config.reference_profile_file)
+        timer.lap("reference_profile")
+
+        chunk_rows = config.out_of_core_chunk_rows
+        store = _training_store(preprocessor)
+        # Fixed up front, so every pass reads the same records and later ones are left for the next run
+        monitoring_records = len(store) if store is not None else 0
+        make_chunks = lambda: _training_chunks(preprocessor, chunk_rows, store, monitoring_records)
+        dtrain, dval = _training_matrices(make_chunks, preprocessor, page_dir)
+        timer.lap("matrices")
+        log.info(f"Training out of core on {dtrain.num_row()} rows ({dval.num_row()} held out), "
+                 f"{chunk_rows} rows per chunk...")
+
+        params = config.xgboost_params
+        booster = xgb.train(_booster_params(params), dtrain, num_boost_round=params["n_estimators"],
+                            evals=[(dval, "validation_0")], early_stopping_rounds=10, verbose_eval=False)
+        # Same model class as the other training modes, so serving and scoring are unchanged
+        model = xgb.XGBRegressor(**params)
+        model.load_model(bytearray(booster.save_raw("json")))
+        timer.lap("fit")
+
+        log.info("Evaluating model...")
+        y_val, predictions = [], []
+        for i, chunk in enumerate(make_chunks()):
+            chunk = chunk[_holdout_mask(i, len(chunk))]
+            if len(chunk):
+                y_val.append(chunk['SalePrice'].to_numpy())
+                predictions.append(model.predict(_transform_chunk(preprocessor, chunk)))
+        y_val, predictions = np.concatenate(y_val), np.concatenate(predictions)
         metrics = {
-            "rmse": rmse,
-            "mae": mae,
-            "r2": r2
+            "rmse": mean_squared_error(y_val, predictions, squared=False),
+            "mae": mean_absolute_error(y_val, predictions),
+            "r2": r2_score(y_val, predictions)
         }
-        
-        log.info("Logging to MLflow...")
-        mlflow_utils.log_params(params)
-        mlflow_utils.log_metrics(metrics)
-        mlflow_utils.log_model(model, "model")
-        
-        # Log the preprocessor as an artifact
-        import mlflow
-        mlflow.log_artifact(str(preprocessor_path), "preprocessor")
-        
-        mlflow_utils.log_plots(model, X_val, y_val)
-
-        
-        # Save Model Locally
-        model_path = config.models_dir / config.model_name
-        joblib.dump(model, model_path)
-        log.info(f"Model saved localy to {model_path}")
-        
-        log.info("Training pipeline completed successfully.")
-        
+        _save_training_state(staging_dir / config.training_state_file, "out_of_core",
+                             monitoring_records=monitoring_records)
+        timer.lap("evaluate")
+
+        version, run_logger = _log_and_publish(staging_dir, model,
+                                               {**params, "mode": "out_of_core", "rows": dtrain.num_row()},
+                                               metrics, None, y_val, predictions, async_logging)
+        timer.lap("publish")
+        timer.finish()
+        log.info(f"Out-of-core training completed successfully (model version {version}).")
+        return run_logger
+
     except Exception as e:
-        log.error(f"Error in training pipeline: {str(e)}")
+        log.error(f"Error in out-of-core training: {str(e)}")
+        shutil.rmtree(staging_dir, ignore_errors=True)
         raise
+    finally:
+        if page_dir is not None:
+            shutil.rmtree(page_dir, ignore_errors=True)
+
+def _train_full(async_logging: bool = None) -> RunLogger:
+    return train_out_of_core(async_logging) if config.out_of_core_training else train(async_logging)
+
+def run_training(async_logging: bool = None) -> Optional[RunLogger]:
+    """Training entry point of the pipeline: incremental, out-of-core or in-memory, as configured."""
+    if config.incremental_retraining:
+        return train_incremental(async_logging)
+    return _train_full(async_logging)
 
 if __name__ == "__main__":
     train()
@@ -0,0 +1,279 @@
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from typing import Callable, Dict, List
+
+import numpy as np
+import xgboost as xgb
+
+from src.utils.config import config
+from src.utils.logger import logger
+
+log = logger.get_logger(__name__)
+
+# Search space helpers: candidates are points of the unit cube, decoded per parameter
+
+def _decode(spec, u: float):
+    low, high, kind = spec
+    if kind == "log":
+        return float(math.exp(math.log(low) + u * (math.log(high) - math.log(low))))
+    if kind == "int":
+        return int(round(low + u * (high - low)))
+    return float(low + u * (high - low))
+
+def decode(space: dict, position) -> dict:
+    return {name: _decode(spec, float(u)) for (name, spec), u in zip(space.items(), position)}
+
+class RandomSearch:
+    """Independent uniform samples of the search space, evaluated as one batch."""
+
+    def __init__(self, space: dict, n_trials: int, random_state: int = None):
+        self.space = space
+        self.n_trials = n_trials
+        self.rng = np.random.default_rng(random_state)
+
+    def search(self, evaluate: Callable[[List[dict]], List[dict]]):
+        evaluate([decode(self.space, self.rng.random(len(self.space))) for _ in range(self.n_trials)])
+
+class SuccessiveHalving:
+    """
+    Successive halving with boosting rounds as the budget.
+
+    `n_trials` random configurations are trained for `min_rounds` rounds; the best
+    1/`factor` of them are trained again with `factor` times more rounds, and so on until
+    one configuration is left. n_estimators is the budget, so it is not searched.
+    """
+
+    def __init__(self, space: dict, n_trials: int, random_state: int = None, factor: int = None,
+                 min_rounds: int = None):
+        self.space = {name: spec for name, spec in space.items() if name != "n_estimators"}
+        self.n_trials = n_trials
+        self.factor = factor or config.tuning_halving_factor
+        self.min_rounds = min_rounds or config.tuning_min_rounds
+        self.rng = np.random.default_rng(random_state)
+
+    def search(self, evaluate):
+        candidates = [decode(self.space, self.rng.random(len(self.space))) for _ in range(self.n_trials)]
+        rounds = self.min_rounds
+        while candidates:
+            results = evaluate([{**params, "n_estimators": rounds} for params in candidates])
+            if len(candidates) == 1:
+                break
+            ranked = sorted(zip(results, candidates), key=lambda pair: pair[0]["rmse"])
+            candidates = [params for _, params in ranked[:max(len(candidates) // self.factor, 1)]]
+            rounds *= self.factor
+
+class GreyWolfOptimizer:
+    """
+    Grey Wolf Optimizer (Mirjalili et al., 2014), as used in the modelling notebook.
+
+    A population of `population` wolves moves through the unit cube towards the three
+    best positions found so far (alpha, beta, delta); the exploration coefficient `a`
+    decreases linearly from 2 to 0 over the iterations. Each iteration is one batch, so
+    `n_trials` must exceed `population`: with a single iteration the wolves never move.
+    """
+
+    def __init__(self, space: dict, n_trials: int, random_state: int = None, population: int = None):
+        self.space = space
+        self.population = population or config.tuning_population
+        if n_trials <= self.population:
+            raise ValueError(f"GWO needs more trials than wolves to move them at least once "
+                             f"(n_trials={n_trials}, population={self.population})")
+        self.n_iter = math.ceil(n_trials / self.population)
+        self.rng = np.random.default_rng(random_state)
+
+    def search(self, evaluate):
+        wolves = self.rng.random((self.population, len(self.space)))
+        leaders, leader_scores = [], []
+        for iteration in range(self.n_iter):
+            results = evaluate([decode(self.space, wolf) for wolf in wolves])
+            leaders, leader_scores = self.update_leaders(leaders, leader_scores, wolves,
+                                                         [result["rmse"] for result in results])
+            if iteration < self.n_iter - 1:
+                wolves = self.move(wolves, leaders, a=2 - iteration * (2 / self.n_iter))
+
+    @staticmethod
+    def update_leaders(leaders, leader_scores, wolves, scores):
+        """The (up to) three best positions among the previous leaders and this iteration's wolves."""
+        # Leaders are the best positions seen in any iteration, not only the current one
+        leaders = list(leaders) + list(wolves)
+        leader_scores = list(leader_scores) + list(scores)
+        order = np.argsort(leader_scores, kind="stable")[:3]
+        return [leaders[i] for i in order], [leader_scores[i] for i in order]
+
+    def move(self, wolves, leaders, a: float):
+        """Move every wolf to the mean of its steps towards alpha, beta and delta, clipped to the unit cube."""
+        alpha, beta, delta = (list(leaders) + list(leaders[:1]) * 2)[:3]
+        moved = np.empty_like(wolves)
+        for i, wolf in enumerate(wolves):
+            steps = []
+            for leader in (alpha, beta, delta):
+                A = 2 * a * self.rng.random(wolf.shape) - a
+                C = 2 * self.rng.random(wolf.shape)
+                steps.append(leader - A * np.abs(C * leader - wolf))
+            moved[i] = np.clip(np.mean(steps, axis=0), 0.0, 1.0)
+        return moved
+
+STRATEGIES = {
+    "random": RandomSearch,
+    "halving": SuccessiveHalving,
+    "gwo": GreyWolfOptimizer
+}
+
+def make_strategy(name: str, space: dict, n_trials: int, random_state: int = None, **params):
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown search strategy '{name}', expected one of {sorted(STRATEGIES)}")
+    return STRATEGIES[name](space, n_trials, random_state=random_state, **params)
+
+# Trial execution (in the worker processes)
+
+class _MedianPruner(xgb.callback.TrainingCallback):
+    """Stop a trial whose best validation RMSE so far is worse than the median of finished trials at that round."""
+
+    def __init__(self, reference: Dict[int, float], interval: int, warmup: int):
+        super().__init__()
+        self.reference = reference
+        self.interval = interval
+        self.warmup = warmup
+        self.pruned = False
+
+    def after_iteration(self, model, epoch, evals_log):
+        rounds = epoch + 1
+        if rounds < self.warmup or rounds % self.interval or rounds not in self.reference:
+            return False
+        if min(evals_log["validation_0"]["rmse"]) > self.reference[rounds]:
+            self.pruned = True
+            return True
+        return False
+
+_trial_data = None
+
+def _init_worker(X_train, y_train, X_val, y_val):
+    # Sent once per worker process instead of once per trial
+    global _trial_data
+    _trial_data = X_train, y_train, X_val, y_val
+
+def _run_trial(trial_id: int, params: dict, n_jobs: int, reference: Dict[int, float]) -> dict:
+    X_train, y_train, X_val, y_val = _trial_data
+    pruner = _MedianPruner(reference, config.tuning_prune_interval, config.tuning_prune_warmup)
+    model = xgb.XGBRegressor(**{**params, "n_jobs": n_jobs}, early_stopping_rounds=10, callbacks=[pruner])
+    start = time.perf_counter()
+    model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+    curve = model.evals_result()["validation_0"]["rmse"]
+    return {"trial_id": trial_id, "params": params, "rmse": float(min(curve)), "curve": curve,
+            "best_iteration": int(np.argmin(curve)), "rounds": len(curve), "pruned": pruner.pruned,
+            "seconds": time.perf_counter() - start}
+
+class HyperparameterSearch:
+    """
+    Evaluate the candidates of a search strategy in parallel and keep the best one.
+
+    Trials run in a pool of `n_workers` spawned processes that each receive the data
+    once; each trial's XGBoost gets cores // n_workers threads, so the pool never
+    oversubscribes the machine. Trials are submitted as workers free up, with the median
+    learning curve of the trials finished so far, so bad trials are pruned early. One
+    nested MLflow run is logged per trial under a parent run for the search.
+    """
+
+    def __init__(self, strategy, X_train, y_train, X_val, y_val, base_params: dict = None, n_workers: int = None):
+        self.strategy = strategy
+        self.data = (X_train, y_train, X_val, y_val)
+        self.base_params = dict(config.xgboost_params if base_params is None else base_params)
+        cores = os.cpu_count() or 1
+        self.n_workers = max(n_workers or config.tuning_workers or cores, 1)
+        self.n_jobs = max(cores // self.n_workers, 1)
+        self.trials = []
+        self.best = None
+        self._pool = None
+
+    def _reference(self) -> Dict[int, float]:
+        curves = [trial["curve"] for trial in self.trials if not trial["pruned"]]
+        if len(curves) < config.tuning_prune_min_trials:
+            return {}
+        reference = {}
+        for rounds in range(config.tuning_prune_interval, max(len(c) for c in curves) + 1, config.tuning_prune_interval):
+            # Best RMSE each finished trial had reached by this round
+            reached = [min(c[:rounds]) for c in curves if len(c) >= rounds]
+            if len(reached) >= config.tuning_prune_min_trials:
+                reference[rounds] = float(np.median(reached))
+        return reference
+
+    def _evaluate(self, candidates: List[dict]) -> List[dict]:
+        results = [None] * len(candidates)
+        pending = list(enumerate(candidates))
+        running = {}
+        while pending or running:
+            while pending and len(running) < self.n_workers:
+                index, params = pending.pop(0)
+                trial_id = len(self.trials) + len(running) + 1
+                future = self._pool.submit(_run_trial, trial_id, {**self.base_params, **params}, self.n_jobs,
+                                           self._reference())
+                running[future] = index
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                result = future.result()
+                results[index] = result
+                self.trials.append(result)
+                self._log_trial(result)
+                if not result["pruned"] and (self.best is None or result["rmse"] < self.best["rmse"]):
+                    self.best = result
+        return results
+
+    def _log_trial(self, trial: dict):
+        import mlflow
+        state = "pruned" if trial["pruned"] else "complete"
+        log.info(f"Trial {trial['trial_id']} {state}: rmse {trial['rmse']:.1f} after {trial['rounds']} rounds "
+                 f"({trial['seconds']:.1f}s)")
+        try:
+            with mlflow.start_run(run_name=f"trial-{trial['trial_id']:03d}", nested=True):
+                mlflow.log_params(trial["params"])
+                mlflow.log_metrics({"rmse": trial["rmse"], "best_iteration": trial["best_iteration"],
+                                    "rounds": trial["rounds"], "seconds": trial["seconds"]})
+                mlflow.set_tag("state", state)
+        except Exception as e:
+            log.error(f"Error logging trial {trial['trial_id']} to MLflow: {str(e)}")
+
+    def run(self) -> dict:
+        """Run the search and return the best trial (params, rmse, ...)."""
+        import mlflow
+        name = type(self.strategy).__name__
+        log.info(f"Hyperparameter search with {name}: {self.n_workers} worker(s) x {self.n_jobs} thread(s)")
+        start = time.perf_counter()
+        with mlflow.start_run(run_name=f"tuning-{name}") as run:
+            mlflow.log_params({"strategy": name, "n_workers": self.n_workers, "n_jobs_per_trial": self.n_jobs})
+            # Spawned workers: no inherited threads or OpenMP state from the caller
+            with ProcessPoolExecutor(self.n_workers, mp_context=get_context("spawn"), initializer=_init_worker,
+                                     initargs=self.data) as self._pool:
+                self.strategy.search(self._evaluate)
+            self._pool = None
+            if self.best is None:
+                raise RuntimeError("Hyperparameter search finished without a completed trial")
+            n_pruned = sum(trial["pruned"] for trial in self.trials)
+            mlflow.log_metrics({"best_rmse": self.best["rmse"], "trials": len(self.trials), "pruned": n_pruned,
+                                "seconds": time.perf_counter() - start})
+            mlflow.log_params({f"best_{k}": v for k, v in self.best["params"].items()})
+        self.best["run_id"] = run.info.run_id
+        log.info(f"Search finished in {time.perf_counter() - start:.1f}s: {len(self.trials)} trials "
+                 f"({n_pruned} pruned), best rmse {self.best['rmse']:.1f} with {self.best['params']}")
+        return self.best
+
+def tune_hyperparameters(X_train, y_train, strategy: str = None, n_trials: int = None, n_workers: int = None) -> dict:
+    """
+    Pipeline stage: search XGBoost parameters on a split of the training data (the validation
+    set stays untouched for the final metrics). Returns the best trial; its "params" are
+    config.xgboost_params updated with the searched values, "run_id" is the search's MLflow run.
+    """
+    # Deferred like in load_and_preprocess_data: pulls in scipy.stats
+    from sklearn.model_selection import train_test_split
+    try:
+        X_fit, X_eval, y_fit, y_eval = train_test_split(X_train, y_train, test_size=config.test_size,
+                                                        random_state=config.random_state)
+        search_strategy = make_strategy(strategy or config.tuning_strategy, config.tuning_search_space,
+                                        n_trials or config.tuning_trials, random_state=config.random_state)
+        return HyperparameterSearch(search_strategy, X_fit, y_fit, X_eval, y_eval, n_workers=n_workers).run()
+    except Exception as e:
+        log.error(f"Error in hyperparameter search: {str(e)}")
+        raise
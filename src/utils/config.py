@@ -14,9 +14,24 @@ class config:
     test_file = "test.csv"
     processed_train = "train_processed.csv"
     processed_test = "test_processed.csv"
-    monitoring_data = "monitoring_data.csv"
+    # Fitted preprocessor + training matrices, keyed by a hash of the raw data and preprocessing code
+    feature_cache_enabled = os.getenv("FEATURE_CACHE", "true").lower() == "true"
+    feature_cache_dir = "features"  # under processed_data_dir
+    feature_cache_keep = 3
+    monitoring_data = "monitoring_data.csv"  # legacy log, migrated into the monitoring store
+    monitoring_store_dir = "monitoring_store"
+    drift_state_file = "drift_state.npz"
+    reference_profile_file = "reference_profile.npz"
+    
+    # One-hot encode to CSR and train / predict on sparse matrices (XGBoost then treats zeros as missing)
+    sparse_preprocessing = os.getenv("SPARSE_PREPROCESSING", "false").lower() == "true"
     
     model_name = "house_price_model.pkl"
+    preprocessor_file = "preprocessor.joblib"
+    model_versions_dir = models_dir / "versions"
+    model_current_file = "CURRENT"  # holds the name of the version the API serves
+    model_versions_keep = 5
+    training_state_file = "training_state.json"  # how a version was trained (mode, monitoring records seen)
     random_state = 42
     test_size = 0.2
     
@@ -28,17 +43,118 @@ class config:
         'n_jobs': -1
     }
     
+    # Hyperparameter search stage of train() (src/models/tuning.py)
+    tuning_enabled = os.getenv("TUNING_ENABLED", "false").lower() == "true"
+    tuning_strategy = os.getenv("TUNING_STRATEGY", "random")  # "random", "halving" or "gwo"
+    tuning_trials = 24  # configurations to evaluate (GWO: population x iterations)
+    tuning_workers = 0  # trials run in parallel (0 = one per core); cores are split evenly between them
+    tuning_population = 6  # GWO wolves per iteration (tuning_trials must be larger)
+    tuning_halving_factor = 3  # successive halving keeps 1/factor of the configurations per rung
+    tuning_min_rounds = 30  # boosting rounds of the first successive halving rung
+    tuning_prune_interval = 10  # rounds between pruning checks against the median of finished trials
+    tuning_prune_warmup = 20  # no pruning before this many rounds
+    tuning_prune_min_trials = 3  # finished trials needed before pruning starts
+    # name: (low, high, "int" | "float" | "log")
+    tuning_search_space = {
+        'n_estimators': (50, 500, "int"),
+        'learning_rate': (0.01, 0.3, "log"),
+        'max_depth': (3, 10, "int"),
+        'min_child_weight': (1, 10, "int"),
+        'subsample': (0.5, 1.0, "float"),
+        'colsample_bytree': (0.3, 1.0, "float"),
+        'reg_lambda': (0.1, 10.0, "log")
+    }
+    
     mlflow_tracking_uri = "file:///app/mlruns" if os.getenv("DOCKER_ENV") else mlruns_dir.as_uri()
     mlflow_experiment_name = "house_price_prediction"
+    # Publish the model first and log params, metrics, the model and plots to MLflow on a background thread
+    mlflow_async_logging = os.getenv("MLFLOW_ASYNC_LOGGING", "false").lower() == "true"
+    mlflow_log_retries = 3  # retries per logging step, with exponential backoff
+    mlflow_log_retry_backoff = 1.0  # seconds before the first retry
+    mlflow_log_plots = os.getenv("MLFLOW_LOG_PLOTS", "true").lower() == "true"
+    mlflow_plot_max_points = 10_000  # larger validation sets are randomly downsampled for plotting (0 = never)
+    mlflow_plot_workers = 3  # figures rendered in parallel
+    
+    # Offline scoring (score.py)
+    scoring_chunk_size = 50_000  # rows read, transformed and predicted at a time
     
     # API settings
     api_host = "0.0.0.0"
     api_port = 8000
+    batch_max_records = 100_000
+    model_watch_interval = 2.0  # seconds between checks for a newly published model (0 disables)
+    model_warmup_runs = 3  # predictions run on a new model before it is swapped in
+    fast_path_enabled = True  # encode single records with the compiled preprocessor instead of pandas
+    # /predict result cache, keyed on the canonicalized features and the model version
+    prediction_cache_enabled = os.getenv("PREDICTION_CACHE", "false").lower() == "true"
+    prediction_cache_max_entries = 100_000
+    prediction_cache_ttl_seconds = 300.0
+    prediction_cache_max_bytes = 64 * 1024 * 1024
+
+    # Micro-batching of concurrent single-row /predict calls
+    micro_batching_enabled = os.getenv("MICRO_BATCHING", "false").lower() == "true"
+    micro_batch_max_size = 64
+    micro_batch_max_wait_ms = 5.0
+    micro_batch_timeout_margin = 5.0  # seconds a /predict call waits for its batch beyond max_wait_ms
+
+    # Background monitoring worker used by /predict?mode=retrain
+    monitoring_queue_size = 10_000
+    monitoring_overflow_policy = "drop_oldest"  # "block", "drop_newest" or "drop_oldest"
+    monitoring_submit_timeout = 0.05  # seconds a request may wait for queue space with "block"
+    monitoring_shutdown_timeout = 30.0
+    monitoring_idle_interval = 1.0  # seconds without records before the worker closes expired time windows
+    monitoring_flush_rows = 256  # buffered records written per store segment
+    monitoring_flush_seconds = 5.0  # max age of buffered records before a flush
+    monitoring_compact_segments = 16  # small segments that trigger a compaction
+    monitoring_segment_max_rows = 100_000  # segments this large are no longer compacted
+    # Set in serve.py's API workers: records go to the one monitoring process instead of being
+    # checked in every worker (drift state, store writer and retrain scheduler live there)
+    monitoring_forward_only = False
+
+    # Drift detection
+    drift_threshold = 0.05
+    drift_min_samples = 10
+    drift_n_bins = 64
+    drift_checkpoint_every = 50  # records between drift state checkpoints
+    drift_correction = "fdr_bh"  # multiple-testing correction: "fdr_bh", "bonferroni" or "none"
+    drift_features_trigger_retrain = False  # retrain on input-feature drift, not only target drift
+    # Which strategy triggers retraining: "cumulative" (KS over all records since start),
+    # "window" (KS over the latest window) or "sequential" (online change detectors)
+    drift_decision = "cumulative"
+    drift_window_mode = "count"  # "count" (last N records) or "time" (last N seconds)
+    drift_window_size = 500
+    drift_window_stride = 100  # stride == size gives tumbling (non-overlapping) windows
+    drift_window_capacity = 10_000  # max records held for time-based windows
+    drift_window_history = 1000  # window results kept in memory
+    # Online change detectors per stream: a record field or "residual" -> "adwin", "page_hinkley" or "cusum"
+    sequential_detectors = {"SalePrice": "cusum", "residual": "adwin"}
+    sequential_warmup = 50  # values used to standardize streams without a reference distribution
+
+    # Retraining scheduler
+    retrain_cooldown_seconds = 600.0  # minimum time between the end of one retrain and the next
+    retrain_min_new_samples = 100  # monitoring records required since the previous retrain
+    retrain_debounce_seconds = 5.0  # triggers within this delay are coalesced into one job
+    retrain_shutdown_timeout = 60.0  # grace period for a running retrain on API shutdown
+    retrain_lock_file = "retrain.lock"  # under models_dir, held by the running retrain of any process
+    retrain_state_file = "retrain_state.json"  # under data_dir, scheduler state kept across restarts
+    # Retrain by continuing to boost the current model on new labelled monitoring records
+    # (falls back to a full retrain when the preprocessor no longer fits the data)
+    incremental_retraining = os.getenv("INCREMENTAL_RETRAINING", "false").lower() == "true"
+    incremental_boost_rounds = 50  # trees added per incremental retrain (with early stopping)
+    incremental_min_samples = 50  # new labelled records required, otherwise the current model is kept
+    # Full retrains on train.csv + labelled monitoring records, streamed in chunks into a QuantileDMatrix
+    out_of_core_training = os.getenv("OUT_OF_CORE_TRAINING", "false").lower() == "true"
+    out_of_core_chunk_rows = 50_000
+    # Page the training matrix to disk (XGBoost external memory) instead of keeping its quantized
+    # form in memory; much slower, for data whose quantized form does not fit either
+    out_of_core_external_memory = os.getenv("OUT_OF_CORE_EXTERNAL_MEMORY", "false").lower() == "true"
     
     # Logging
     log_level = "INFO"
     log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     log_file = "mlops_pipeline.log"
+    # Stage timings of the last training run (Prometheus text format, under logs_dir), appended to GET /metrics
+    training_metrics_file = "training_metrics.prom"
     
     @classmethod
     def create_directories(cls):
@@ -51,4 +167,4 @@ class config:
             cls.mlruns_dir
         ]
         for directory in directories:
-            directory.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+            directory.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
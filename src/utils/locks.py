@@ -0,0 +1,33 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, locks only hold within the process
+    fcntl = None
+
+@contextmanager
+def file_lock(path: Path, blocking: bool = True):
+    """
+    Exclusive advisory lock (flock) on a file or directory, shared by all processes on the host.
+
+    Lock files are created if needed. Yields whether the lock is held: with blocking=False it
+    yields False instead of waiting for another holder. The OS releases the lock if the holder dies.
+    """
+    path = Path(path)
+    if path.is_dir():
+        fd = os.open(path, os.O_RDONLY)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+        yield True
+    finally:
+        os.close(fd)
@@ -0,0 +1,258 @@
+import os
+import threading
+import uuid
+import weakref
+from bisect import bisect_left
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, Sequence
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers sub-millisecond stages up to multi-second batch requests
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+class _ThreadSlot:
+    """Dropped with its thread's locals when the thread exits, which folds the thread's values."""
+
+    __slots__ = ("__weakref__",)
+
+class _Shards:
+    """
+    Per-thread value arrays. A thread only ever writes to its own array, so updates take no
+    lock; the lock is only taken when a thread writes for the first time, when it exits
+    (its values are folded into a base total) and on collection.
+    """
+
+    __slots__ = ("size", "_local", "_arrays", "_base", "_lock")
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._arrays = {}
+        self._base = [0.0] * size
+        # Reentrant: a thread's locals may be released (and folded) by the thread holding the lock
+        self._lock = threading.RLock()
+
+    def local(self) -> list:
+        values = getattr(self._local, "values", None)
+        if values is None:
+            values = self._local.values = [0.0] * self.size
+            self._local.slot = slot = _ThreadSlot()
+            with self._lock:
+                self._arrays[id(values)] = values
+            weakref.finalize(slot, self._fold, values)
+        return values
+
+    def _fold(self, values: list):
+        with self._lock:
+            del self._arrays[id(values)]
+            self._base = [base + value for base, value in zip(self._base, values)]
+
+    def total(self) -> list:
+        """
+        Sum over all threads. Each array is copied under the lock, so no thread is folded or
+        added halfway through; writers are not stopped, though, so a scrape taken during an
+        update may see part of it (e.g. a histogram bucket without its sum): scrapes are approximate.
+        """
+        with self._lock:
+            arrays = [list(self._base), *(list(values) for values in self._arrays.values())]
+        return [sum(column) for column in zip(*arrays)]
+
+class _Timer:
+    """Context manager passing the elapsed seconds to `record`."""
+
+    __slots__ = ("_record", "_start")
+
+    def __init__(self, record):
+        self._record = record
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._record(perf_counter() - self._start)
+
+class _CounterChild:
+    __slots__ = ("_shards",)
+
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1.0):
+        self._shards.local()[0] += amount
+
+    def samples(self, name: str):
+        yield name, {}, self._shards.total()[0]
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def time(self) -> _Timer:
+        return _Timer(self.set)
+
+    def samples(self, name: str):
+        yield name, {}, self.value
+
+class _HistogramChild:
+    __slots__ = ("bounds", "_shards")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        # One count per bucket (the last one is +Inf), then the sum of observed values
+        self._shards = _Shards(len(bounds) + 2)
+
+    def observe(self, value: float):
+        values = self._shards.local()
+        values[bisect_left(self.bounds, value)] += 1
+        values[-1] += value
+
+    def time(self) -> _Timer:
+        return _Timer(self.observe)
+
+    def samples(self, name: str):
+        values = self._shards.total()
+        cumulative = 0.0
+        for bound, count in zip(self.bounds + (float("inf"),), values):
+            cumulative += count
+            yield f"{name}_bucket", {"le": _format_value(bound)}, cumulative
+        yield f"{name}_sum", {}, values[-1]
+        yield f"{name}_count", {}, cumulative
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        # Unlabelled metrics are their own single child
+        self._child = None if self.labelnames else self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        """Child for one combination of label values; keep it to skip this lookup on hot paths."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            for name, extra, value in child.samples(self.name):
+                lines.append(f"{name}{_format_labels({**dict(zip(self.labelnames, key)), **extra})} "
+                             f"{_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+class Counter(_Metric):
+    """Monotonic count; name it with a _total suffix."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        (self._child or self.labels()).inc(amount)
+
+class Gauge(_Metric):
+    """Value that is set, e.g. the duration or timestamp of the last run of a job."""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        (self._child or self.labels()).set(value)
+
+class Histogram(_Metric):
+    """Distribution of observed values (latencies in seconds) over fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        (self._child or self.labels()).observe(value)
+
+    def time(self) -> _Timer:
+        return (self._child or self.labels()).time()
+
+class MetricsRegistry:
+    """
+    Named metrics of one process, rendered in the Prometheus text format.
+
+    Counters and histograms are updated without locks (see _Shards), so they can be used on
+    the request path; values are summed over threads when the registry is rendered.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+    def write_textfile(self, path: Path):
+        """Write the rendered metrics atomically (textfile format, for jobs that exit before a scrape)."""
+        path = Path(path)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}")
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+# Metrics of the current process (API or pipeline); training runs keep their own, see train_model
+registry = MetricsRegistry()
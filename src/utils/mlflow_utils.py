@@ -1,9 +1,12 @@
 import mlflow
-import matplotlib.pyplot as plt
-import seaborn as sns
 import pandas as pd
 import numpy as np
 import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from src.utils.config import config
 from src.utils.logger import logger
 
@@ -21,6 +24,27 @@ class mlflow_utils:
         except Exception as e:
             log.error(f"Error setting up MLflow: {str(e)}")
             raise
+
+    @staticmethod
+    def start_run():
+        """Start the MLflow run that the following log_* calls go to"""
+        try:
+            run = mlflow.start_run()
+            log.info(f"Started MLflow run {run.info.run_id}")
+            return run
+        except Exception as e:
+            log.error(f"Error starting MLflow run: {str(e)}")
+            raise
+
+    @staticmethod
+    def end_run(status: str = "FINISHED"):
+        """End the active MLflow run, if any"""
+        try:
+            if mlflow.active_run() is not None:
+                mlflow.end_run(status=status)
+        except Exception as e:
+            log.error(f"Error ending MLflow run: {str(e)}")
+            raise
     
     @staticmethod
     def log_params(params: dict):
@@ -53,60 +77,191 @@ class mlflow_utils:
             raise
 
     @staticmethod
-    def log_plots(model, X_val, y_val, model_type='xgboost'):
+    def log_plots(model, X_val, y_val, predictions=None, model_type='xgboost'):
         """
-        Generate and log plots to MLflow.
+        Render the evaluation plots and log them to MLflow.
+
+        `predictions` are the model's predictions on X_val (recomputed when not given).
+        Figures are drawn with matplotlib's object-oriented API on the Agg canvas, in
+        parallel, into a temporary directory of their own; validation sets larger than
+        config.mlflow_plot_max_points are randomly downsampled first.
         """
         try:
             log.info("Generating and logging plots...")
-            
-            # Create a temporary directory for plots
-            plot_dir = "temp_plots"
-            os.makedirs(plot_dir, exist_ok=True)
-            
-            # Actual vs Predicted Scatter Plot
-            predictions = model.predict(X_val)
-            plt.figure(figsize=(10, 6))
-            sns.scatterplot(x=y_val, y=predictions)
-            plt.plot([y_val.min(), y_val.max()], [y_val.min(), y_val.max()], 'r--')
-            plt.xlabel("Actual Price")
-            plt.ylabel("Predicted Price")
-            plt.title("Actual vs Predicted House Prices")
-            scatter_path = os.path.join(plot_dir, "actual_vs_predicted.png")
-            plt.savefig(scatter_path)
-            plt.close()
-            mlflow.log_artifact(scatter_path, "plots")
-            
-            # Residuals Plot
-            residuals = y_val - predictions
-            plt.figure(figsize=(10, 6))
-            sns.histplot(residuals, kde=True)
-            plt.title("Residuals Distribution")
-            plt.xlabel("Residual (Actual - Predicted)")
-            residuals_path = os.path.join(plot_dir, "residuals_distribution.png")
-            plt.savefig(residuals_path)
-            plt.close()
-            mlflow.log_artifact(residuals_path, "plots")
-            
+            # Imported here, once, rather than concurrently by the first renderers
+            import matplotlib.figure
+            import matplotlib.backends.backend_agg
+            import scipy.stats
+            y_val = np.asarray(y_val, dtype=float)
+            predictions = model.predict(X_val) if predictions is None else predictions
+            predictions = np.asarray(predictions, dtype=float)
+
+            max_points = config.mlflow_plot_max_points
+            if max_points and len(y_val) > max_points:
+                sample = np.random.default_rng(config.random_state).choice(len(y_val), max_points, replace=False)
+                y_val, predictions = y_val[sample], predictions[sample]
+                log.info(f"Plotting a random sample of {max_points} validation rows")
+
+            jobs = [(_plot_actual_vs_predicted, "actual_vs_predicted.png", (y_val, predictions)),
+                    (_plot_residuals, "residuals_distribution.png", (y_val - predictions,))]
             # Feature Importance (Specific for XGBoost/Tree models)
             if hasattr(model, 'feature_importances_'):
-                plt.figure(figsize=(12, 8))
-                
-                importances = model.feature_importances_
-                indices = np.argsort(importances)[::-1][:20] 
-                
-                plt.title("Top 20 Feature Importances")
-                plt.bar(range(len(indices)), importances[indices], align='center')
-                plt.xticks(range(len(indices)), indices, rotation=90)
-                plt.tight_layout()
-                
-                importance_path = os.path.join(plot_dir, "feature_importance.png")
-                plt.savefig(importance_path)
-                plt.close()
-                mlflow.log_artifact(importance_path, "plots")
+                jobs.append((_plot_feature_importance, "feature_importance.png", (model.feature_importances_,)))
+
+            # Own directory per call, so concurrent training runs never overwrite each other's plots
+            with tempfile.TemporaryDirectory(prefix="plots-") as plot_dir:
+                with ThreadPoolExecutor(max_workers=min(config.mlflow_plot_workers, len(jobs))) as executor:
+                    futures = [executor.submit(_render, plot, os.path.join(plot_dir, name), *args)
+                               for plot, name, args in jobs]
+                    for future in futures:
+                        future.result()
+                mlflow.log_artifacts(plot_dir, "plots")
 
             log.info("Plots logged successfully.")
             
-            
         except Exception as e:
-            log.error(f"Error logging plots: {str(e)}")
\ No newline at end of file
+            log.error(f"Error logging plots: {str(e)}")
+            raise
+
+# Plot renderers: each draws on its own Figure with Axes methods only. pyplot (and seaborn,
+# which goes through it) keeps global figure state, so neither is used: they run in parallel threads
+
+def _render(plot, path: str, *args):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = plot(*args)
+    FigureCanvasAgg(fig).print_png(path)
+
+def _plot_actual_vs_predicted(y_val, predictions):
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.scatter(y_val, predictions, s=20, alpha=0.7, edgecolors="white", linewidths=0.5)
+    ax.plot([y_val.min(), y_val.max()], [y_val.min(), y_val.max()], 'r--')
+    ax.set_xlabel("Actual Price")
+    ax.set_ylabel("Predicted Price")
+    ax.set_title("Actual vs Predicted House Prices")
+    return fig
+
+def _plot_residuals(residuals):
+    from matplotlib.figure import Figure
+    from scipy.stats import gaussian_kde
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    _, edges, _ = ax.hist(residuals, bins="auto", alpha=0.6, edgecolor="white")
+    if len(residuals) > 1 and np.ptp(residuals) > 0:
+        # Density scaled to the histogram's counts
+        grid = np.linspace(edges[0], edges[-1], 200)
+        ax.plot(grid, gaussian_kde(residuals)(grid) * len(residuals) * np.diff(edges).mean())
+    ax.set_ylabel("Count")
+    ax.set_title("Residuals Distribution")
+    ax.set_xlabel("Residual (Actual - Predicted)")
+    return fig
+
+def _plot_feature_importance(importances):
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
+    indices = np.argsort(importances)[::-1][:20]
+    ax.set_title("Top 20 Feature Importances")
+    ax.bar(range(len(indices)), importances[indices], align='center')
+    ax.set_xticks(range(len(indices)), indices, rotation=90)
+    fig.tight_layout()
+    return fig
+
+class RunLogger:
+    """
+    Runs the MLflow logging steps of a training run, with retries, and ends the run.
+
+    With `background=True` the steps are queued and executed in order on a dedicated
+    thread, so the caller can publish the model without waiting for plots and uploads;
+    `wait()` blocks until everything has been logged and returns a summary. Otherwise
+    each step runs immediately. A failed step is retried `retries` times with exponential
+    backoff; when it still fails, a `required` step raises in foreground mode, while in
+    background mode the failure is recorded and the run is ended as FAILED.
+    """
+
+    _STOP = object()
+
+    def __init__(self, background: bool = False, retries: int = None, backoff: float = None):
+        self.background = background
+        self.retries = config.mlflow_log_retries if retries is None else retries
+        self.backoff = config.mlflow_log_retry_backoff if backoff is None else backoff
+        self.completed = []
+        self.failed = []
+        self._started = time.perf_counter()
+        self._finished = None
+        self._done = threading.Event()
+        self._queue = queue.Queue()
+        self._thread = None
+        if background:
+            # Not a daemon: the interpreter waits for pending uploads before exiting
+            self._thread = threading.Thread(target=self._worker, name="mlflow-logger")
+            self._thread.start()
+
+    def submit(self, name: str, fn, *args, required: bool = True, **kwargs):
+        """Run (or queue) one logging step, e.g. submit("params", mlflow_utils.log_params, params)."""
+        if self.background:
+            self._queue.put((name, fn, args, kwargs))
+            return
+        try:
+            self._run(name, fn, args, kwargs)
+        except Exception:
+            if required:
+                raise
+
+    def _run(self, name, fn, args, kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                fn(*args, **kwargs)
+                self.completed.append(name)
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    log.error(f"MLflow logging step '{name}' failed after {attempt + 1} attempt(s): {str(e)}")
+                    self.failed.append(name)
+                    raise
+                delay = self.backoff * 2 ** attempt
+                log.warning(f"MLflow logging step '{name}' failed ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _worker(self):
+        while True:
+            task = self._queue.get()
+            if task is self._STOP:
+                break
+            try:
+                self._run(*task)
+            except Exception:
+                pass
+        self._end()
+
+    def _end(self):
+        try:
+            mlflow_utils.end_run("FAILED" if self.failed else "FINISHED")
+        except Exception:
+            pass
+        self._finished = time.perf_counter()
+        log.info(f"MLflow logging finished in {self._finished - self._started:.1f}s: "
+                 f"{len(self.completed)} step(s) logged, {len(self.failed)} failed")
+        self._done.set()
+
+    def close(self):
+        """No more steps: end the run once the queued ones are done."""
+        if self.background:
+            self._queue.put(self._STOP)
+        elif not self._done.is_set():
+            self._end()
+
+    def wait(self, timeout: float = None) -> dict:
+        """Block until the run has been ended (see close) and return a summary of what was logged."""
+        self._done.wait(timeout)
+        return self.summary()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def summary(self) -> dict:
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return {"done": self.done, "completed": list(self.completed), "failed": list(self.failed),
+                "seconds": round(end - self._started, 3)}
\ No newline at end of file
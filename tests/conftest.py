@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.config import config
+
+# Test runs log to a temporary directory instead of logs/mlops_pipeline.log
+config.logs_dir = Path(tempfile.mkdtemp(prefix="test-logs-"))
+
+from src.data.preprocessing import preprocess_data
+
+@pytest.fixture(scope="session")
+def train_df() -> pd.DataFrame:
+    return pd.read_csv(config.raw_data_dir / config.train_file).drop(columns=['Id'])
+
+@pytest.fixture(scope="session")
+def test_df() -> pd.DataFrame:
+    return pd.read_csv(config.raw_data_dir / config.test_file).drop(columns=['Id'])
+
+@pytest.fixture(scope="session")
+def trained(train_df):
+    """A small model and the preprocessor it was fitted with, both trained on train.csv."""
+    X, y, preprocessor = preprocess_data(train_df, is_train=True, sparse=False)
+    model = xgb.XGBRegressor(n_estimators=20, max_depth=3, random_state=0)
+    model.fit(X, y)
+    return model, preprocessor
@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import main
+from src.app.model_store import ModelSnapshot
+from src.utils.config import config
+
+@pytest.fixture
+def client(monkeypatch, trained):
+    model, preprocessor = trained
+    # Serve the test model without the startup handlers (no watcher, workers or artifacts on disk)
+    monkeypatch.setattr(main.model_store, "_snapshot", ModelSnapshot(model, preprocessor, "test", ("version", "test")))
+    return TestClient(main.app)
+
+@pytest.fixture
+def records(test_df):
+    return json.loads(test_df.head(5).to_json(orient="records"))
+
+def test_batch_matches_model(client, trained, test_df, records):
+    model, preprocessor = trained
+    response = client.post("/predict/batch", json={"records": records})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["n_records"] == 5 and body["n_failed"] == 0 and body["errors"] == []
+    expected = model.predict(preprocessor.transform(test_df.head(5)))
+    np.testing.assert_allclose(body["predictions"], expected, rtol=1e-5)
+
+def test_columnar_payload_matches_records(client, records):
+    columns = {name: [record[name] for record in records] for name in records[0]}
+    by_records = client.post("/predict/batch", json={"records": records}).json()["predictions"]
+    by_columns = client.post("/predict/batch", json={"columns": columns}).json()["predictions"]
+    assert by_columns == pytest.approx(by_records)
+
+def test_per_row_errors(client, records):
+    records[1]["LotArea"] = "not a number"
+    records[3]["GrLivArea"] = "1710"  # numeric strings are coerced
+    body = client.post("/predict/batch", json={"records": records}).json()
+    assert body["n_failed"] == 1
+    assert body["errors"][0]["index"] == 1 and "LotArea" in body["errors"][0]["detail"]
+    assert body["predictions"][1] is None
+    assert all(p is not None for i, p in enumerate(body["predictions"]) if i != 1)
+
+def test_missing_columns_are_imputed(client):
+    body = client.post("/predict/batch", json={"records": [{"LotArea": 8450, "Neighborhood": "CollgCr"}]}).json()
+    assert body["n_failed"] == 0 and body["predictions"][0] is not None
+
+def test_invalid_payloads(client, records, monkeypatch):
+    assert client.post("/predict/batch", json={}).status_code == 400
+    assert client.post("/predict/batch", json={"records": records, "columns": {"LotArea": [1]}}).status_code == 400
+    assert client.post("/predict/batch", json={"columns": {"LotArea": [1, 2], "GrLivArea": [1]}}).status_code == 400
+    monkeypatch.setattr(config, "batch_max_records", 2)
+    assert client.post("/predict/batch", json={"records": records}).status_code == 413
+
+def test_no_model(monkeypatch, records):
+    monkeypatch.setattr(main.model_store, "_snapshot", None)
+    assert TestClient(main.app).post("/predict/batch", json={"records": records}).status_code == 503
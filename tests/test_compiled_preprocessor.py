@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import StandardScaler
+
+from src.data.preprocessing import compile_preprocessor, preprocess_data, verify_compiled
+
+@pytest.fixture(scope="module")
+def sparse_preprocessor(train_df):
+    return preprocess_data(train_df, is_train=True, sparse=True)[2]
+
+def test_matches_sklearn(trained, test_df):
+    preprocessor = trained[1]
+    compiled = compile_preprocessor(preprocessor)
+    assert compiled.n_features == preprocessor.transform(test_df.head(1)).shape[1]
+    # test.csv has missing numeric and categorical values
+    assert verify_compiled(compiled, preprocessor, test_df) <= 1e-9
+
+def test_sparse_zeros_are_missing(sparse_preprocessor, test_df):
+    compiled = compile_preprocessor(sparse_preprocessor)
+    assert compiled.zeros_as_missing
+    verify_compiled(compiled, sparse_preprocessor, test_df.head(200))
+    assert not np.any(compiled.transform_record(test_df.iloc[0].to_dict()) == 0.0)
+
+def test_unknown_levels_and_missing_values(trained, test_df):
+    preprocessor = trained[1]
+    df = test_df.head(20).copy()
+    df["Neighborhood"] = "Atlantis"
+    df["LotFrontage"] = np.nan
+    verify_compiled(compile_preprocessor(preprocessor), preprocessor, df)
+
+def test_reuses_output_buffer(trained, test_df):
+    compiled = compile_preprocessor(trained[1])
+    records = test_df.head(2).to_dict(orient="records")
+    out = np.empty((1, compiled.n_features))
+    first = compiled.transform_record(records[0]).copy()
+    compiled.transform_record(records[1], out=out)
+    assert compiled.transform_record(records[0], out=out) is out
+    np.testing.assert_array_equal(out, first)
+
+def test_missing_column(trained, test_df):
+    record = test_df.iloc[0].to_dict()
+    del record["LotArea"]
+    with pytest.raises(KeyError):
+        compile_preprocessor(trained[1]).transform_record(record)
+
+def test_verify_detects_mismatch(trained, test_df):
+    preprocessor = trained[1]
+    compiled = compile_preprocessor(preprocessor)
+    compiled.means = compiled.means + 1.0
+    with pytest.raises(ValueError):
+        verify_compiled(compiled, preprocessor, test_df.head(5))
+
+def test_rejects_other_transformers(train_df):
+    preprocessor = ColumnTransformer([("scaled", StandardScaler(), ["LotArea"])]).fit(train_df)
+    with pytest.raises(ValueError):
+        compile_preprocessor(preprocessor)
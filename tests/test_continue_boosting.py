@@ -0,0 +1,34 @@
+import numpy as np
+import xgboost as xgb
+
+from src.data.preprocessing import preprocess_data
+from src.models.train_model import continue_boosting
+
+def _split(train_df):
+    X, y, _ = preprocess_data(train_df, is_train=True, sparse=False)
+    return X[:1000], y[:1000], X[1000:], y[1000:]
+
+def test_keeps_base_model_parameters(train_df):
+    X_old, y_old, X_new, y_new = _split(train_df)
+    base = xgb.XGBRegressor(n_estimators=20, max_depth=2, learning_rate=0.3, subsample=0.9, random_state=0)
+    base.fit(X_old, y_old)
+    model = continue_boosting(base, X_new[:300], y_new[:300], X_new[300:], y_new[300:], n_rounds=15)
+    params = model.get_params()
+    assert (params["max_depth"], params["learning_rate"], params["subsample"]) == (2, 0.3, 0.9)
+    assert params["n_estimators"] == 15
+    n_trees = len(model.get_booster().get_dump())
+    assert 20 < n_trees <= 35
+    # The base model is left untouched
+    assert len(base.get_booster().get_dump()) == 20
+
+def test_starts_from_best_iteration(train_df):
+    X_old, y_old, X_new, y_new = _split(train_df)
+    base = xgb.XGBRegressor(n_estimators=500, learning_rate=0.5, early_stopping_rounds=5, random_state=0)
+    base.fit(X_old[:800], y_old[:800], eval_set=[(X_old[800:], y_old[800:])], verbose=False)
+    assert base.best_iteration < 499
+    model = continue_boosting(base, X_new[:300], y_new[:300], X_new[300:], y_new[300:], n_rounds=5)
+    assert len(model.get_booster().get_dump()) <= base.best_iteration + 1 + 5
+    # Starting from the base model beats boosting 5 rounds from scratch
+    scratch = xgb.XGBRegressor(n_estimators=5, learning_rate=0.5).fit(X_new[:300], y_new[:300])
+    error = lambda m: np.mean((m.predict(X_new[300:]) - y_new[300:]) ** 2)
+    assert error(model) < error(scratch)
@@ -0,0 +1,93 @@
+import math
+
+import numpy as np
+import pytest
+
+from monitoring.detectors import ADWIN, CUSUM, DETECTORS, PageHinkley, SequentialMonitor, make_detector
+
+def _first_alarm(detector, values):
+    for i, value in enumerate(values):
+        if detector.update(float(value)):
+            return i
+    return None
+
+@pytest.fixture
+def stationary():
+    # The default CUSUM has an in-control run length of ~9500, so a false alarm within 3000 values is
+    # possible for some seeds; this one has none for any detector
+    return np.random.default_rng(2).normal(0.0, 1.0, 3000)
+
+@pytest.fixture
+def shifted():
+    # 500 in-control values, then the mean moves by 2 standard deviations
+    rng = np.random.default_rng(1)
+    return np.concatenate([rng.normal(0.0, 1.0, 500), rng.normal(2.0, 1.0, 500)])
+
+@pytest.mark.parametrize("name", sorted(DETECTORS))
+def test_no_alarm_on_stationary_stream(name, stationary):
+    assert _first_alarm(make_detector(name), stationary) is None
+
+@pytest.mark.parametrize("name", sorted(DETECTORS))
+def test_alarm_shortly_after_mean_shift(name, shifted):
+    alarm = _first_alarm(make_detector(name), shifted)
+    assert alarm is not None and 500 <= alarm < 600
+
+@pytest.mark.parametrize("name", sorted(DETECTORS))
+def test_downward_shift(name, shifted):
+    alarm = _first_alarm(make_detector(name), -shifted)
+    assert alarm is not None and 500 <= alarm < 600
+
+def test_unknown_detector():
+    with pytest.raises(ValueError):
+        make_detector("ewma")
+
+def test_cusum_resets_after_alarm():
+    detector = CUSUM(k=0.5, h=4.0)
+    assert [detector.update(3.0) for _ in range(2)] == [False, True]
+    assert detector.state() == {"n": 0, "upper": 0.0, "lower": 0.0}
+
+def test_page_hinkley_waits_for_min_samples():
+    detector = PageHinkley(threshold=1.0, min_samples=30)
+    assert not any(detector.update(v) for v in [0.0] * 10 + [100.0] * 10)
+    assert detector.state()["n"] == 20
+
+def test_adwin_window_statistics(stationary):
+    detector = ADWIN()
+    for value in stationary:
+        detector.update(float(value))
+    assert detector.width == len(stationary)
+    assert detector.mean == pytest.approx(stationary.mean())
+    assert detector.variance / detector.width == pytest.approx(stationary.var(), rel=1e-6)
+    # Exponential histogram: at most max_buckets buckets per power-of-two size
+    assert len(detector.buckets) <= detector.max_buckets * (math.log2(detector.width) + 1)
+
+def test_adwin_drops_data_before_the_change(shifted):
+    detector = ADWIN()
+    alarm = _first_alarm(detector, shifted)
+    for value in shifted[alarm + 1:]:
+        detector.update(float(value))
+    assert detector.width < 600
+    assert detector.mean == pytest.approx(2.0, abs=0.3)
+
+def test_sequential_monitor_streams():
+    monitor = SequentialMonitor({"SalePrice": "cusum", "residual": ("page_hinkley", {"threshold": 20.0})},
+                                references={"residual": (0.0, 10_000.0)}, warmup=20)
+    rng = np.random.default_rng(2)
+    alarms = []
+    for price in rng.normal(180_000, 20_000, 200):
+        # The model keeps predicting well until the residuals start drifting upwards
+        alarms += monitor.update({"SalePrice": price}, prediction=price - rng.normal(0, 10_000))
+    assert alarms == []
+    for price in rng.normal(180_000, 20_000, 200):
+        alarms += monitor.update({"SalePrice": price}, prediction=price - 40_000)
+    assert alarms and set(alarms) == {"residual"}
+    assert monitor.references["SalePrice"][0] == pytest.approx(180_000, rel=0.1)
+    state = monitor.state()
+    assert state["streams"]["residual"]["detector"] == "page_hinkley"
+    assert state["alarms"][0]["stream"] == "residual"
+
+def test_sequential_monitor_skips_missing_values():
+    monitor = SequentialMonitor({"GrLivArea": "adwin", "residual": "cusum"}, warmup=5)
+    assert monitor.update({"GrLivArea": None, "SalePrice": None}, prediction=None) == []
+    assert monitor.update({"GrLivArea": "n/a"}) == []
+    assert monitor.detectors["GrLivArea"][1].width == 0
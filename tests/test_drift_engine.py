@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from monitoring.drift_engine import DriftEngine, adjust_p_values
+from monitoring.drift_state import ks_from_counts
+from src.data.reference_profile import ReferenceProfile, build_reference_profile
+
+@pytest.fixture(scope="module")
+def engine(train_df):
+    return DriftEngine(ReferenceProfile(build_reference_profile(train_df)))
+
+def test_bonferroni():
+    np.testing.assert_allclose(adjust_p_values([0.01, 0.2, 0.5], "bonferroni"), [0.03, 0.6, 1.0])
+
+def test_benjamini_hochberg():
+    # Sorted: 0.005, 0.01, 0.03, 0.04 -> p * n / rank = 0.02, 0.02, 0.04, 0.04
+    np.testing.assert_allclose(adjust_p_values([0.01, 0.04, 0.03, 0.005], "fdr_bh"), [0.02, 0.04, 0.04, 0.02])
+    # Monotone in the raw p-values, never above 1
+    adjusted = adjust_p_values([0.001, 0.9, 0.04, 0.045, 0.5], "fdr_bh")
+    order = np.argsort([0.001, 0.9, 0.04, 0.045, 0.5])
+    assert np.all(np.diff(adjusted[order]) >= 0) and adjusted.max() <= 1.0
+
+def test_no_correction_and_unknown_method():
+    np.testing.assert_array_equal(adjust_p_values([0.2, 0.01], "none"), [0.2, 0.01])
+    assert len(adjust_p_values([], "fdr_bh")) == 0
+    with pytest.raises(ValueError):
+        adjust_p_values([0.1], "holm")
+
+def test_no_drift_on_training_sample(engine, train_df):
+    report = engine.evaluate_frame(train_df.sample(400, random_state=0))
+    assert not report.drift_detected
+    assert len(report.features) == len(engine.features)
+
+def test_shifted_features_drift(engine, train_df):
+    df = train_df.sample(400, random_state=0).assign(GrLivArea=lambda d: d["GrLivArea"] * 1.5,
+                                                    Neighborhood="NoRidge")
+    report = engine.evaluate_frame(df)
+    assert {"GrLivArea", "Neighborhood"} <= set(report.drifted_features)
+    assert len(report.drifted_features) <= 4
+
+def test_correction_is_less_sensitive(engine, train_df):
+    df = train_df.sample(200, random_state=1).assign(LotArea=lambda d: d["LotArea"] * 1.1)
+    raw = engine.evaluate_frame(df, correction="none").features
+    bonferroni = engine.evaluate_frame(df, correction="bonferroni").features
+    np.testing.assert_allclose(raw["p_value"], bonferroni["p_value"])
+    assert np.all(bonferroni["p_adjusted"] >= raw["p_adjusted"])
+    assert bonferroni["drifted"].sum() <= raw["drifted"].sum()
+
+def test_ks_p_values_match_drift_state(engine, train_df):
+    df = train_df.sample(300, random_state=2)
+    numeric_counts, _ = engine.count(*engine.encode(df))
+    report = engine.evaluate(numeric_counts, engine.empty_counts()[1], correction="none").features
+    for j, column in enumerate(engine.numeric_features[:5]):
+        statistic, p_value = ks_from_counts(engine.numeric_reference[j], numeric_counts[j, :engine.n_bins])
+        row = report[report["feature"] == column].iloc[0]
+        assert row["statistic"] == pytest.approx(statistic)
+        assert row["p_value"] == pytest.approx(p_value)
+
+def test_record_encoding_matches_frame_encoding(engine, test_df):
+    df = test_df.head(50)
+    numeric_codes, categorical_codes = engine.encode(df)
+    for i, record in enumerate(df.to_dict(orient="records")):
+        record_numeric, record_categorical = engine.encode_record(record)
+        np.testing.assert_array_equal(record_numeric, numeric_codes[i])
+        np.testing.assert_array_equal(record_categorical, categorical_codes[i])
+
+def test_unseen_levels_and_missing_columns(engine, train_df):
+    df = train_df.head(10).drop(columns=["LotArea"]).assign(Neighborhood="Atlantis")
+    numeric_codes, categorical_codes = engine.encode(df)
+    assert np.all(numeric_codes[:, engine.numeric_features.index("LotArea")] == engine.n_bins)
+    assert np.all(categorical_codes[:, engine.categorical_features.index("Neighborhood")] == engine.n_slots - 1)
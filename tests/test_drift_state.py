@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from monitoring.drift_state import DriftState, ks_from_counts
+
+def test_ks_from_counts_edge_cases():
+    counts = np.array([5, 10, 5])
+    assert ks_from_counts(counts, counts) == (0.0, 1.0)
+    assert ks_from_counts(counts, np.zeros(3, dtype=int)) == (0.0, 1.0)
+    statistic, p_value = ks_from_counts(np.array([100, 0]), np.array([0, 100]))
+    assert statistic == 1.0 and p_value < 1e-10
+
+def test_ks_from_counts_matches_scipy_on_discrete_data():
+    # With one bin per distinct value the binned CDFs are the exact empirical CDFs
+    rng = np.random.default_rng(0)
+    reference, current = rng.integers(0, 10, 2000), rng.integers(1, 11, 500)
+    statistic, p_value = ks_from_counts(np.bincount(reference, minlength=11), np.bincount(current, minlength=11))
+    expected = stats.ks_2samp(reference, current, method="asymp")
+    assert statistic == pytest.approx(expected.statistic)
+    # Same asymptotic distribution; scipy adds a small-sample correction to the p-value
+    assert p_value == pytest.approx(expected.pvalue, rel=0.2)
+
+@pytest.fixture
+def state():
+    rng = np.random.default_rng(1)
+    return DriftState.from_reference({"SalePrice": rng.normal(180_000, 40_000, 5000)}, n_bins=32)
+
+def test_summary_tracks_running_statistics(state):
+    values = np.random.default_rng(2).normal(180_000, 40_000, 300)
+    for value in values:
+        state.update({"SalePrice": value})
+    state.update({"SalePrice": None})
+    state.update({"SalePrice": "not a number"})
+
+    summary = state.summary("SalePrice")
+    assert state.n_records == 302
+    assert summary["count"] == 300 and summary["missing"] == 2
+    assert summary["mean"] == pytest.approx(values.mean())
+    assert summary["std"] == pytest.approx(values.std(ddof=1))
+    assert (summary["min"], summary["max"]) == (values.min(), values.max())
+    assert summary["median"] == pytest.approx(np.median(values), rel=0.02)
+
+def test_update_frame_equals_record_updates(state):
+    frame = pd.DataFrame({"SalePrice": np.random.default_rng(3).normal(180_000, 40_000, 100)})
+    other = DriftState(state.edges, state.reference_counts)
+    state.update_frame(frame)
+    for record in frame.to_dict(orient="records"):
+        other.update(record)
+    np.testing.assert_array_equal(state.counts["SalePrice"], other.counts["SalePrice"])
+    np.testing.assert_allclose(state.stats["SalePrice"], other.stats["SalePrice"])
+
+def test_detect_drift(state):
+    rng = np.random.default_rng(4)
+    same = DriftState(state.edges, state.reference_counts)
+    same.update_frame(pd.DataFrame({"SalePrice": rng.normal(180_000, 40_000, 500)}))
+    shifted = DriftState(state.edges, state.reference_counts)
+    shifted.update_frame(pd.DataFrame({"SalePrice": rng.normal(230_000, 40_000, 500)}))
+    assert not same.detect_drift("SalePrice")[0]
+    is_drifted, p_value = shifted.detect_drift("SalePrice")
+    assert is_drifted and p_value < 1e-6
+
+def test_checkpoint_round_trip(state, tmp_path):
+    state.update_frame(pd.DataFrame({"SalePrice": [150_000.0, 210_000.0, np.nan]}))
+    path = tmp_path / "drift_state.npz"
+    state.save(path)
+    restored = DriftState.load(path)
+
+    assert restored.n_records == 3
+    assert restored.fingerprint == state.fingerprint
+    np.testing.assert_array_equal(restored.counts["SalePrice"], state.counts["SalePrice"])
+    np.testing.assert_array_equal(restored.stats["SalePrice"], state.stats["SalePrice"])
+    assert not list(tmp_path.glob("*.tmp.npz"))
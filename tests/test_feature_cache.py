@@ -0,0 +1,60 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from src.data import feature_cache
+from src.data.preprocessing import preprocess_data
+from src.utils.config import config
+
+@pytest.fixture
+def cache_dirs(tmp_path, monkeypatch):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    shutil.copy(config.raw_data_dir / config.train_file, raw / config.train_file)
+    monkeypatch.setattr(config, "raw_data_dir", raw)
+    monkeypatch.setattr(config, "processed_data_dir", tmp_path / "processed")
+    return tmp_path
+
+def test_key_tracks_data_and_settings(cache_dirs):
+    key = feature_cache.training_data_key(sparse=False)
+    assert feature_cache.training_data_key(sparse=False) == key
+    assert feature_cache.training_data_key(sparse=True) != key
+    with open(config.raw_data_dir / config.train_file, "a") as f:
+        f.write("\n")
+    assert feature_cache.training_data_key(sparse=False) != key
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_round_trip(cache_dirs, train_df, sparse):
+    X, y, preprocessor = preprocess_data(train_df.head(200), is_train=True, sparse=sparse)
+    assert feature_cache.load_features("entry") is None
+    feature_cache.save_features("entry", X, y, preprocessor)
+    cached_X, cached_y, cached_preprocessor = feature_cache.load_features("entry")
+    assert sp.issparse(cached_X) == sparse
+    dense = lambda m: m.toarray() if sp.issparse(m) else np.asarray(m)
+    np.testing.assert_array_equal(dense(cached_X), dense(X))
+    np.testing.assert_array_equal(cached_y, y)
+    assert cached_y.name == y.name
+    np.testing.assert_array_equal(dense(cached_preprocessor.transform(train_df.head(5))),
+                                  dense(preprocessor.transform(train_df.head(5))))
+    assert not list((cache_dirs / "processed" / config.feature_cache_dir).glob(".tmp-*"))
+
+def test_unreadable_entry_is_a_miss(cache_dirs, train_df):
+    X, y, preprocessor = preprocess_data(train_df.head(50), is_train=True, sparse=False)
+    feature_cache.save_features("entry", X, y, preprocessor)
+    feature_cache.cached_file("entry", "X.npy").write_bytes(b"not an array")
+    assert feature_cache.load_features("entry") is None
+
+def test_prune_keeps_most_recently_used(cache_dirs, train_df, monkeypatch):
+    monkeypatch.setattr(config, "feature_cache_keep", 2)
+    X, y, preprocessor = preprocess_data(train_df.head(50), is_train=True, sparse=False)
+    root = cache_dirs / "processed" / config.feature_cache_dir
+    for i, key in enumerate(["a", "b"]):
+        feature_cache.save_features(key, X, y, preprocessor)
+        os.utime(root / key, (1000 + i, 1000 + i))
+    # Loading "a" makes "b" the least recently used entry
+    assert feature_cache.load_features("a") is not None
+    feature_cache.save_features("c", X, y, preprocessor)
+    assert sorted(p.name for p in root.iterdir()) == ["a", "c"]
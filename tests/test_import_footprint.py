@@ -0,0 +1,22 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY_MODULES = ["mlflow", "matplotlib", "seaborn", "run_pipeline", "src.models.train_model", "src.utils.mlflow_utils"]
+
+def test_api_import_skips_training_stack(tmp_path):
+    # A fresh interpreter: the test session itself has already imported most of these
+    script = (
+        "import json, sys\n"
+        "from pathlib import Path\n"
+        "from src.utils.config import config\n"
+        f"config.logs_dir = Path({str(tmp_path)!r})\n"
+        "import src.app.main\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from src.utils.metrics import MetricsRegistry
+
+def test_render_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["endpoint"])
+    duration = registry.gauge("job_seconds", "Duration of the last job")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    requests.labels(endpoint="/predict").inc()
+    requests.labels(endpoint='/a"b').inc(2)
+    duration.set(3)
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{endpoint="/a\\"b"} 2.0',
+        'requests_total{endpoint="/predict"} 1.0',
+        "# HELP job_seconds Duration of the last job",
+        "# TYPE job_seconds gauge",
+        "job_seconds 3.0",
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1.0',
+        'latency_seconds_bucket{le="1.0"} 2.0',
+        'latency_seconds_bucket{le="+Inf"} 3.0',
+        "latency_seconds_sum 5.55",
+        "latency_seconds_count 3.0",
+    ]
+
+def test_duplicate_name():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs")
+    with pytest.raises(ValueError):
+        registry.gauge("jobs_total", "Jobs")
+
+def test_values_of_exited_threads_are_folded():
+    registry = MetricsRegistry()
+    counter = registry.counter("events_total", "Events")
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(1.0,))
+
+    def work():
+        for _ in range(100):
+            counter.inc()
+            histogram.observe(0.5)
+
+    for _ in range(5):
+        threads = [threading.Thread(target=work) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    counter.inc()
+
+    # Only the live (main) thread keeps a shard; the 50 exited threads were folded into the base
+    assert len(counter._child._shards._arrays) == 1
+    assert len(histogram._child._shards._arrays) == 0
+    assert "events_total 5001.0" in registry.render()
+    assert 'latency_seconds_bucket{le="1.0"} 5000.0' in registry.render()
+
+def test_write_textfile(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter("runs_total", "Runs").inc()
+    registry.write_textfile(tmp_path / "metrics.prom")
+    assert (tmp_path / "metrics.prom").read_text() == registry.render()
+    assert [p.name for p in tmp_path.iterdir()] == ["metrics.prom"]
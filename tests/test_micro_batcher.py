@@ -0,0 +1,82 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import main
+from src.app.batching import BatcherStopped, MicroBatcher
+from src.app.model_store import ModelSnapshot
+
+def _double(frame):
+    if (frame["x"] < 0).any():
+        raise ValueError("negative input")
+    return frame["x"].to_numpy() * 2.0
+
+@pytest.fixture
+def batcher():
+    batcher = MicroBatcher(_double, max_batch_size=8, max_wait_ms=20)
+    batcher.start()
+    yield batcher
+    batcher.stop()
+
+def test_results_go_to_their_callers(batcher):
+    futures = [batcher.submit({"x": float(i)}) for i in range(50)]
+    assert [future.result(5) for future in futures] == [2.0 * i for i in range(50)]
+    stats = batcher.stats()
+    assert stats["rows"] == 50 and stats["max_batch_size_seen"] <= 8
+    # Rows queued together were predicted together
+    assert stats["batches"] < 50
+
+def test_concurrent_callers_are_coalesced(batcher):
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(lambda i: batcher.predict({"x": float(i)}, timeout=5), range(200)))
+    np.testing.assert_array_equal(results, np.arange(200) * 2.0)
+    assert batcher.stats()["avg_batch_size"] > 1
+
+def test_failing_row_is_isolated(batcher):
+    futures = [batcher.submit({"x": x}) for x in (1.0, -1.0, 3.0)]
+    assert futures[0].result(5) == 2.0 and futures[2].result(5) == 6.0
+    with pytest.raises(ValueError):
+        futures[1].result(5)
+
+def test_stop_drains_queue():
+    batcher = MicroBatcher(_double, max_batch_size=4, max_wait_ms=1)
+    batcher.start()
+    futures = [batcher.submit({"x": 1.0}) for _ in range(20)]
+    batcher.stop()
+    assert all(future.result(1) == 2.0 for future in futures)
+
+def test_submit_after_stop():
+    batcher = MicroBatcher(_double)
+    with pytest.raises(BatcherStopped):
+        batcher.submit({"x": 1.0})
+    batcher.start()
+    assert batcher.predict({"x": 1.0}, timeout=5) == 2.0
+    batcher.stop()
+    with pytest.raises(BatcherStopped):
+        batcher.predict({"x": 1.0}, timeout=5)
+
+def test_predict_with_snapshot():
+    snapshots = iter(range(1000))
+    batcher = MicroBatcher(lambda frame, snapshot: _double(frame) + snapshot, snapshot_fn=lambda: next(snapshots))
+    batcher.start()
+    try:
+        prediction, snapshot = batcher.predict_with_snapshot({"x": 1.0}, timeout=5)
+    finally:
+        batcher.stop()
+    assert prediction == 2.0 + snapshot
+
+def test_predict_endpoint_falls_back_after_stop(monkeypatch, trained, test_df):
+    model, preprocessor = trained
+    monkeypatch.setattr(main.model_store, "_snapshot", ModelSnapshot(model, preprocessor, "test", ("version", "test")))
+    stopped = MicroBatcher(main._predict_frame)
+    stopped.start()
+    stopped.stop()
+    monkeypatch.setattr(main, "batcher", stopped)
+    features = json.loads(test_df.head(1).to_json(orient="records"))[0]
+    response = TestClient(main.app).post("/predict", json={"features": features})
+    assert response.status_code == 200
+    assert response.json()["prediction"] == pytest.approx(float(model.predict(preprocessor.transform(test_df.head(1)))[0]),
+                                                          rel=1e-5)
@@ -0,0 +1,39 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.utils.config import config
+from src.utils.mlflow_utils import mlflow_utils
+
+PLOTS = {"actual_vs_predicted.png", "residuals_distribution.png", "feature_importance.png"}
+
+@pytest.fixture
+def logged(monkeypatch):
+    import mlflow
+    logged = []
+
+    def log_artifacts(local_dir, artifact_path=None):
+        files = {}
+        for name in os.listdir(local_dir):
+            with open(os.path.join(local_dir, name), "rb") as f:
+                files[name] = f.read()
+        logged.append(files)
+
+    monkeypatch.setattr(mlflow, "log_artifacts", log_artifacts)
+    monkeypatch.setattr(config, "mlflow_plot_workers", 3)
+    return logged
+
+def test_parallel_plots_are_all_rendered(logged, trained, train_df):
+    model, preprocessor = trained
+    X = preprocessor.transform(train_df.drop(columns=["SalePrice"]))
+    y = train_df["SalePrice"]
+    # Several training runs plotting at once, each rendering its figures on 3 threads
+    with ThreadPoolExecutor(4) as pool:
+        for future in [pool.submit(mlflow_utils.log_plots, model, X, y) for _ in range(4)]:
+            future.result()
+
+    assert len(logged) == 4
+    for files in logged:
+        assert set(files) == PLOTS
+        assert all(data.startswith(b"\x89PNG") and len(data) > 1000 for data in files.values())
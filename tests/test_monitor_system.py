@@ -0,0 +1,33 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from monitoring import monitor
+
+@pytest.fixture
+def retrains(monkeypatch, train_df):
+    calls = []
+    monkeypatch.setattr(monitor, "load_reference_data", lambda: train_df["SalePrice"].to_numpy())
+    monkeypatch.setitem(sys.modules, "run_pipeline", types.SimpleNamespace(main=lambda: calls.append(1)))
+    return calls
+
+def test_generate_data_resamples_reference():
+    reference = np.arange(100.0)
+    data = monitor.generate_data(n_samples=50, reference=reference, seed=0)
+    assert len(data) == 50 and set(data) <= set(reference)
+
+def test_no_drift_does_not_retrain(retrains):
+    for seed in range(5):
+        monitor.monitor_system(simulate_drift=False, seed=seed)
+    assert retrains == []
+
+def test_drift_triggers_retrain(retrains):
+    monitor.monitor_system(simulate_drift=True, seed=0)
+    assert retrains == [1]
+
+def test_fallback_reference_matches_generated_batch():
+    reference = monitor.generate_data(n_samples=1000, seed=0)
+    drifted, _ = monitor.detect_drift(reference, monitor.generate_data(n_samples=500, reference=reference, seed=1))
+    assert not drifted
@@ -0,0 +1,111 @@
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from monitoring.monitor import _migrate_csv
+from monitoring.store import MonitoringStore
+
+NUMERIC, CATEGORICAL = ["LotArea", "SalePrice"], ["Neighborhood"]
+
+def _open(root, **kwargs):
+    return MonitoringStore.open(root, NUMERIC, CATEGORICAL, **kwargs)
+
+def _record(i: int, prefix: str = "N") -> dict:
+    return {"LotArea": float(i), "SalePrice": 1000.0 * i, "Neighborhood": f"{prefix}{i % 3}"}
+
+def test_round_trip(tmp_path):
+    store = _open(tmp_path / "store")
+    store.append({"LotArea": 8450, "SalePrice": "208500", "Neighborhood": "CollgCr", "Unknown": 1}, prediction=2e5)
+    store.append({"LotArea": "n/a", "Neighborhood": None})
+    store.append({"LotArea": 9600, "Neighborhood": float("nan")}, prediction=None)
+
+    frame = store.read()
+    assert list(frame.columns) == NUMERIC + CATEGORICAL
+    np.testing.assert_array_equal(frame["LotArea"], [8450.0, np.nan, 9600.0])
+    np.testing.assert_array_equal(frame["SalePrice"], [208500.0, np.nan, np.nan])
+    assert frame["Neighborhood"].iloc[0] == "CollgCr" and frame["Neighborhood"].iloc[1:].isna().all()
+    selected = store.select(["prediction", "timestamp", "Neighborhood"])
+    np.testing.assert_array_equal(selected["prediction"], [2e5, np.nan, np.nan])
+    np.testing.assert_array_equal(selected["Neighborhood"], [0, -1, -1])
+    assert np.all(np.diff(selected["timestamp"]) >= 0)
+    with pytest.raises(KeyError):
+        store.select(["GrLivArea"])
+
+def test_ranges_span_segments(tmp_path):
+    store = _open(tmp_path / "store", flush_rows=7, compact_segments=100)
+    for i in range(50):
+        store.append(_record(i))
+    assert len(store) == 50
+    np.testing.assert_array_equal(store.select(["LotArea"], start=5, stop=23)["LotArea"], np.arange(5, 23))
+    assert store.read(start=45)["Neighborhood"].tolist() == [f"N{i % 3}" for i in range(45, 50)]
+    assert len(store.read(start=60)) == 0
+
+def test_reopen(tmp_path):
+    store = _open(tmp_path / "store", flush_rows=10)
+    for i in range(25):
+        store.append(_record(i))
+    store.flush()
+    reopened = MonitoringStore.open_existing(tmp_path / "store")
+    assert reopened.schema == store.schema and len(reopened) == 25
+    pd.testing.assert_frame_equal(reopened.read(), store.read())
+    assert MonitoringStore.open_existing(tmp_path / "missing") is None
+
+def test_schema_change_archives_store(tmp_path):
+    store = _open(tmp_path / "store")
+    store.append(_record(1))
+    store.flush()
+    changed = MonitoringStore.open(tmp_path / "store", ["LotArea"], CATEGORICAL)
+    assert len(changed) == 0
+    assert len(list(tmp_path.glob("store.*"))) == 1
+
+def test_compaction(tmp_path):
+    store = _open(tmp_path / "store", flush_rows=5, compact_segments=4)
+    for i in range(100):
+        store.append(_record(i))
+    assert len(store._segments) < 4
+    assert len(list((tmp_path / "store" / "segments").iterdir())) == len(store._segments)
+    frame = store.read()
+    np.testing.assert_array_equal(frame["LotArea"], np.arange(100))
+    assert frame["Neighborhood"].tolist() == [f"N{i % 3}" for i in range(100)]
+
+def test_large_segments_are_not_compacted(tmp_path):
+    store = _open(tmp_path / "store", flush_rows=10, compact_segments=2, segment_max_rows=10)
+    for i in range(40):
+        store.append(_record(i))
+    assert [rows for _, rows in store._segments] == [10, 10, 10, 10]
+
+def test_legacy_csv_migration(tmp_path):
+    csv_path = tmp_path / "monitoring_data.csv"
+    pd.DataFrame({"LotArea": [8450, 9600], "SalePrice": [208500, 181500],
+                  "Neighborhood": ["CollgCr", "Veenker"], "Extra": ["x", "y"]}).to_csv(csv_path, index=False)
+    store = _open(tmp_path / "store")
+    _migrate_csv(store, csv_path)
+    assert not csv_path.exists() and (tmp_path / "monitoring_data.csv.migrated").exists()
+    frame = store.read()
+    assert frame["SalePrice"].tolist() == [208500.0, 181500.0]
+    assert frame["Neighborhood"].tolist() == ["CollgCr", "Veenker"]
+
+def _append_from_process(root, prefix: str, n: int):
+    store = MonitoringStore.open(root, NUMERIC, CATEGORICAL, flush_rows=7, compact_segments=3)
+    for i in range(n):
+        store.append(_record(i, prefix))
+    store.flush()
+
+def test_concurrent_writers(tmp_path):
+    root = tmp_path / "store"
+    _open(root)
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_append_from_process, args=(root, prefix, 100)) for prefix in "AB"]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+
+    frame = MonitoringStore.open_existing(root).read()
+    assert len(frame) == 200
+    # Levels first seen by different processes never share a code
+    expected = {(float(i), f"{prefix}{i % 3}") for prefix in "AB" for i in range(100)}
+    assert set(zip(frame["LotArea"], frame["Neighborhood"])) == expected
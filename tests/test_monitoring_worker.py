@@ -0,0 +1,64 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from monitoring.worker import MonitoringWorker
+
+class _Recorder:
+    def __init__(self):
+        self.records = []
+        self.lock = threading.Lock()
+
+    def __call__(self, record, **kwargs):
+        with self.lock:
+            self.records.append((record, kwargs))
+
+def test_flushes_queued_records_on_stop():
+    handler = _Recorder()
+    worker = MonitoringWorker(handler, max_queue_size=100)
+    worker.start()
+    for i in range(50):
+        assert worker.submit({"i": i}, prediction=float(i))
+    worker.stop()
+    assert [record["i"] for record, _ in handler.records] == list(range(50))
+    assert handler.records[-1][1] == {"prediction": 49.0}
+    assert worker.stats()["processed"] == 50
+    assert not worker.submit({"i": 50})
+
+def test_idle_handler_runs_without_records():
+    ticked = threading.Event()
+    worker = MonitoringWorker(lambda record: None, max_queue_size=10, idle_handler=ticked.set, idle_interval=0.01)
+    worker.start()
+    assert ticked.wait(2.0)
+    worker.stop()
+
+def test_drop_newest_when_full():
+    worker = MonitoringWorker(lambda record: None, max_queue_size=2, overflow_policy="drop_newest")
+    worker.start_forwarding()
+    assert [worker.submit({"i": i}) for i in range(3)] == [True, True, False]
+    assert worker.stats()["dropped"] == 1
+
+def test_unknown_overflow_policy():
+    with pytest.raises(ValueError):
+        MonitoringWorker(lambda record: None, overflow_policy="spill")
+
+def _forward(worker, start, n):
+    worker.start_forwarding()
+    for i in range(start, start + n):
+        worker.submit({"i": i})
+    worker.stop()
+
+def test_forwarding_processes_share_one_consumer():
+    context = multiprocessing.get_context("fork")
+    handler = _Recorder()
+    worker = MonitoringWorker(handler, record_queue=context.Queue(1000))
+    processes = [context.Process(target=_forward, args=(worker, start, 100)) for start in (0, 100)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+    worker.start()
+    worker.stop()
+    assert sorted(record["i"] for record, _ in handler.records) == list(range(200))
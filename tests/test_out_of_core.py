@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from src.models import train_model
+
+@pytest.fixture
+def make_chunks(trained):
+    preprocessor = trained[1]
+    return lambda: train_model._training_chunks(preprocessor, 300, None)
+
+def _holdout_rows(make_chunks):
+    masks = [train_model._holdout_mask(i, len(chunk)) for i, chunk in enumerate(make_chunks())]
+    return sum(int(mask.sum()) for mask in masks), sum(len(mask) for mask in masks)
+
+@pytest.mark.parametrize("external_memory", [False, True])
+def test_training_matrices_split_every_chunk(trained, make_chunks, tmp_path, external_memory):
+    page_dir = str(tmp_path) if external_memory else None
+    dtrain, dval = train_model._training_matrices(make_chunks, trained[1], page_dir)
+    n_holdout, n_rows = _holdout_rows(make_chunks)
+    assert (dtrain.num_row(), dval.num_row()) == (n_rows - n_holdout, n_holdout)
+    assert dtrain.num_col() == len(trained[1].get_feature_names_out())
+
+def test_holdout_mask_is_stable():
+    np.testing.assert_array_equal(train_model._holdout_mask(3, 100), train_model._holdout_mask(3, 100))
+    assert not np.array_equal(train_model._holdout_mask(3, 100), train_model._holdout_mask(4, 100))
+
+def test_streamed_model_matches_in_memory(trained, make_chunks):
+    preprocessor = trained[1]
+    params = {"objective": "reg:squarederror", "tree_method": "hist", "max_depth": 3, "seed": 0}
+    dtrain, _ = train_model._training_matrices(make_chunks, preprocessor)
+    streamed = xgb.train(params, dtrain, num_boost_round=20)
+
+    chunks = list(make_chunks())
+    train_rows = [chunk[~train_model._holdout_mask(i, len(chunk))] for i, chunk in enumerate(chunks)]
+    X = np.vstack([train_model._transform_chunk(preprocessor, chunk) for chunk in train_rows])
+    y = np.concatenate([chunk['SalePrice'].to_numpy() for chunk in train_rows])
+    in_memory = xgb.train(params, xgb.DMatrix(X, label=y), num_boost_round=20)
+    # Quantile sketches differ slightly between a chunked and a single pass
+    np.testing.assert_allclose(streamed.predict(xgb.DMatrix(X)), in_memory.predict(xgb.DMatrix(X)), rtol=0.05)
@@ -0,0 +1,89 @@
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import main
+from src.app.batching import MicroBatcher
+from src.app.cache import PredictionCache, feature_key
+from src.app.model_store import ModelSnapshot
+
+def test_feature_key_is_canonical():
+    assert feature_key({"a": 1, "b": "x"}) == feature_key({"b": "x", "a": 1.0})
+    assert feature_key({"a": 1}) != feature_key({"a": "1"})
+    assert feature_key({"a": True}) != feature_key({"a": 1})
+    assert feature_key({"a": None}) != feature_key({"a": 0})
+
+def test_lru_eviction():
+    cache = PredictionCache(max_entries=2, ttl_seconds=60, max_bytes=10**6)
+    cache.put(b"a", "v1", 1.0)
+    cache.put(b"b", "v1", 2.0)
+    assert cache.get(b"a", "v1") == 1.0  # "b" is now the least recently used
+    cache.put(b"c", "v1", 3.0)
+    assert cache.get(b"b", "v1") is None
+    assert (cache.get(b"a", "v1"), cache.get(b"c", "v1")) == (1.0, 3.0)
+    assert cache.stats()["evictions"] == 1
+
+def test_memory_cap():
+    cache = PredictionCache(max_entries=1000, ttl_seconds=60, max_bytes=2000)
+    for i in range(100):
+        cache.put(feature_key({"i": i}), "v1", float(i))
+    stats = cache.stats()
+    assert 0 < stats["entries"] < 100 and stats["bytes"] <= 2000
+    assert stats["evictions"] == 100 - stats["entries"]
+    # Overwriting an entry does not count its size twice
+    key = feature_key({"i": 99})
+    cache.put(key, "v1", 0.0)
+    assert cache.stats()["bytes"] == stats["bytes"]
+
+def test_ttl():
+    cache = PredictionCache(max_entries=10, ttl_seconds=0.05, max_bytes=10**6)
+    cache.put(b"a", "v1", 1.0)
+    assert cache.get(b"a", "v1") == 1.0
+    time.sleep(0.1)
+    assert cache.get(b"a", "v1") is None
+    stats = cache.stats()
+    assert (stats["expirations"], stats["entries"], stats["bytes"]) == (1, 0, 0)
+
+def test_version_change_invalidates():
+    cache = PredictionCache(max_entries=10, ttl_seconds=60, max_bytes=10**6)
+    cache.put(b"a", "v1", 1.0)
+    assert cache.get(b"a", "v2") is None
+    assert cache.get(b"a", "v1") is None
+    stats = cache.stats()
+    # Switching back finds an empty cache, which is not counted as another invalidation
+    assert stats["invalidations"] == 1 and stats["hits"] == 0
+
+def test_predict_endpoint_uses_cache(monkeypatch, trained, test_df):
+    model, preprocessor = trained
+    monkeypatch.setattr(main.model_store, "_snapshot", ModelSnapshot(model, preprocessor, "v1", ("version", "v1")))
+    monkeypatch.setattr(main, "prediction_cache", PredictionCache(max_entries=10, ttl_seconds=60, max_bytes=10**6))
+    client = TestClient(main.app)
+    features = json.loads(test_df.head(1).to_json(orient="records"))[0]
+
+    first = client.post("/predict", json={"features": features}).json()["prediction"]
+    assert client.post("/predict", json={"features": features}).json()["prediction"] == pytest.approx(first)
+    assert client.get("/stats/cache").json()["hits"] == 1
+
+    monkeypatch.setattr(main.model_store, "_snapshot", ModelSnapshot(model, preprocessor, "v2", ("version", "v2")))
+    client.post("/predict", json={"features": features})
+    stats = client.get("/stats/cache").json()
+    assert stats["hits"] == 1 and stats["invalidations"] == 1
+
+def test_batched_prediction_cached_under_scoring_version(monkeypatch, trained, test_df):
+    model, preprocessor = trained
+    monkeypatch.setattr(main.model_store, "_snapshot", ModelSnapshot(model, preprocessor, "v1", ("version", "v1")))
+    cache = PredictionCache(max_entries=10, ttl_seconds=60, max_bytes=10**6)
+    monkeypatch.setattr(main, "prediction_cache", cache)
+    # The model is swapped between the request's cache lookup and its batch
+    swapped = ModelSnapshot(model, preprocessor, "v2", ("version", "v2"))
+    batcher = MicroBatcher(main._predict_frame, snapshot_fn=lambda: swapped)
+    batcher.start()
+    monkeypatch.setattr(main, "batcher", batcher)
+    try:
+        features = json.loads(test_df.head(1).to_json(orient="records"))[0]
+        prediction = TestClient(main.app).post("/predict", json={"features": features}).json()["prediction"]
+    finally:
+        batcher.stop()
+    assert cache.get(feature_key(features), ("version", "v2")) == pytest.approx(prediction)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from src.data.reference_profile import (
+    MISSING_CATEGORY, ReferenceProfile, bin_values, build_reference_profile, save_reference_profile
+)
+
+@pytest.fixture(scope="module")
+def profile(train_df, tmp_path_factory):
+    path = tmp_path_factory.mktemp("profile") / "reference_profile.npz"
+    save_reference_profile(build_reference_profile(train_df, n_bins=16), path)
+    return ReferenceProfile.load(path)
+
+def test_columns(profile, train_df):
+    assert profile.n_rows == len(train_df)
+    assert "SalePrice" in profile.numeric_columns and "Neighborhood" in profile.categorical_columns
+    assert set(profile.numeric_columns) | set(profile.categorical_columns) == set(train_df.columns)
+
+def test_numeric_summary(profile, train_df):
+    values = train_df["LotFrontage"].dropna().to_numpy()
+    np.testing.assert_allclose(profile.sorted_values("LotFrontage"), np.sort(values))
+    assert profile.quantiles("LotFrontage")[[0, 50, 100]] == pytest.approx(np.quantile(values, [0, 0.5, 1]))
+    assert len(profile.edges("LotFrontage")) == 17
+    assert profile.counts("LotFrontage").sum() == len(values)
+
+def test_categorical_summary(profile, train_df):
+    levels = list(profile.levels("Alley"))
+    assert MISSING_CATEGORY in levels
+    counts = dict(zip(levels, profile.level_counts("Alley")))
+    assert counts[MISSING_CATEGORY] == train_df["Alley"].isna().sum()
+    assert profile.frequencies("Alley").sum() == pytest.approx(1.0)
+
+def test_bin_values_open_ended():
+    edges = np.array([0.0, 10.0, 20.0, 30.0])
+    np.testing.assert_array_equal(bin_values(edges, [-5.0, 0.0, 10.0, 25.0, 99.0]), [0, 0, 1, 2, 2])
@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.models import registry
+from src.utils.config import config
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "models_dir", tmp_path)
+    monkeypatch.setattr(config, "model_versions_dir", tmp_path / "versions")
+    return tmp_path
+
+def _publish(tag: str) -> str:
+    staging = registry.create_staging_dir()
+    for name in registry.VERSION_ARTIFACTS:
+        (staging / name).write_text(tag)
+    return registry.publish_version(staging)
+
+def test_publish_and_prune(models_dir, monkeypatch):
+    assert registry.current_version() is None
+    assert registry.artifact_path(config.model_name) == models_dir / config.model_name
+
+    monkeypatch.setattr(config, "model_versions_keep", 2)
+    versions = [_publish(str(i)) for i in range(3)]
+    assert registry.current_version() == versions[-1]
+    assert len(registry.list_versions()) == 2
+    assert registry.artifact_path(config.model_name).read_text() == "2"
+    assert (models_dir / config.model_name).read_text() == "2"
+
+def test_concurrent_publishes(models_dir):
+    with ThreadPoolExecutor(4) as pool:
+        versions = list(pool.map(_publish, map(str, range(8))))
+    assert registry.current_version() in versions
+    assert not list(models_dir.glob("*.tmp"))
+
+def test_publish_requires_all_artifacts(models_dir):
+    staging = registry.create_staging_dir()
+    (staging / config.model_name).write_text("model")
+    with pytest.raises(FileNotFoundError):
+        registry.publish_version(staging)
+    assert registry.current_version() is None
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from monitoring.scheduler import RetrainScheduler, _run_locked
+from src.utils.locks import file_lock
+
+def _succeed():
+    pass
+
+def _fail():
+    raise RuntimeError("training failed")
+
+@pytest.fixture
+def make_scheduler(tmp_path):
+    def make(**kwargs):
+        kwargs = {"target": _succeed, "cooldown": 0.0, "min_new_samples": 0, "debounce": 0.0, **kwargs}
+        return RetrainScheduler(lock_path=tmp_path / "retrain.lock", state_path=tmp_path / "retrain_state.json",
+                                **kwargs)
+    return make
+
+def _wait(scheduler, timeout=60.0):
+    deadline = time.time() + timeout
+    while scheduler.busy:
+        assert time.time() < deadline, "retraining job did not finish"
+        time.sleep(0.05)
+    return scheduler.history[-1]
+
+def test_debounce_coalesces_triggers(make_scheduler):
+    scheduler = make_scheduler(debounce=0.5)
+    assert [scheduler.request() for _ in range(3)] == ["scheduled", "coalesced", "coalesced"]
+    job = _wait(scheduler)
+    assert job["status"] == "succeeded" and job["triggers"] == 3
+    status = scheduler.status()
+    assert (status["started"], status["succeeded"], status["coalesced"]) == (1, 1, 2)
+
+def test_failed_job(make_scheduler):
+    scheduler = make_scheduler(target=_fail)
+    scheduler.request()
+    job = _wait(scheduler)
+    assert job["status"] == "failed" and job["exitcode"] != 0
+
+def test_cooldown(make_scheduler):
+    scheduler = make_scheduler(cooldown=600.0)
+    assert scheduler.request() == "scheduled"
+    _wait(scheduler)
+    assert scheduler.request() == "cooldown"
+    assert scheduler.status()["cooldown_remaining"] > 590
+    # Forcing skips the cooldown; the job is cancelled before it starts
+    scheduler.debounce = 60.0
+    assert scheduler.request(force=True) == "scheduled"
+    scheduler.stop()
+    assert scheduler.history[-1]["status"] == "cancelled"
+
+def test_min_new_samples(make_scheduler):
+    scheduler = make_scheduler(min_new_samples=100, debounce=60.0)
+    assert scheduler.request(n_samples=50) == "insufficient_samples"
+    assert scheduler.request(n_samples=150) == "scheduled"
+    scheduler.stop()
+    assert scheduler.request(n_samples=200) == "insufficient_samples"
+
+def test_state_survives_restart(make_scheduler):
+    scheduler = make_scheduler(min_new_samples=100, cooldown=600.0)
+    assert scheduler.request(n_samples=150) == "scheduled"
+    _wait(scheduler)
+
+    restarted = make_scheduler(min_new_samples=100, cooldown=600.0)
+    assert restarted.request(n_samples=300) == "cooldown"
+    restarted.cooldown = 0.0
+    assert restarted.request(n_samples=200) == "insufficient_samples"
+    restarted.debounce = 60.0
+    assert restarted.request(n_samples=250) == "scheduled"
+    restarted.stop()
+
+def test_job_skipped_while_another_process_retrains(make_scheduler, tmp_path):
+    scheduler = make_scheduler(cooldown=600.0)
+    with file_lock(tmp_path / "retrain.lock"):
+        assert scheduler.request() == "scheduled"
+        job = _wait(scheduler)
+        # A job that lost the race to the lock exits without training
+        with pytest.raises(SystemExit):
+            _run_locked(_succeed, tmp_path / "retrain.lock")
+    assert job["status"] == "locked" and scheduler.status()["locked"] == 1
+    # A skipped job does not start the cooldown
+    assert scheduler.request() == "scheduled"
+    assert _wait(scheduler)["status"] == "succeeded"
@@ -0,0 +1,77 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.scoring import _csv_segments, score_file
+from src.utils.config import config
+
+@pytest.fixture
+def artifacts(tmp_path, monkeypatch, trained):
+    model, preprocessor = trained
+    monkeypatch.setattr(config, "models_dir", tmp_path / "models")
+    monkeypatch.setattr(config, "model_versions_dir", tmp_path / "models" / "versions")
+    config.models_dir.mkdir()
+    joblib.dump(model, config.models_dir / config.model_name)
+    joblib.dump(preprocessor, config.models_dir / config.preprocessor_file)
+    return model, preprocessor
+
+@pytest.fixture
+def input_csv(tmp_path):
+    path = tmp_path / "input.csv"
+    pd.read_csv(config.raw_data_dir / config.test_file).head(300).to_csv(path, index=False)
+    return path
+
+def _expected(artifacts, path):
+    model, preprocessor = artifacts
+    df = pd.read_csv(path)
+    return df["Id"].to_numpy(), model.predict(preprocessor.transform(df.drop(columns=["Id"])))
+
+def test_csv_in_chunks(artifacts, input_csv, tmp_path):
+    assert score_file(input_csv, tmp_path / "out.csv", chunk_size=64) == 300
+    result = pd.read_csv(tmp_path / "out.csv")
+    ids, predictions = _expected(artifacts, input_csv)
+    np.testing.assert_array_equal(result["Id"], ids)
+    np.testing.assert_allclose(result["SalePrice"], predictions, rtol=1e-5)
+
+def test_parallel_matches_sequential(artifacts, input_csv, tmp_path):
+    score_file(input_csv, tmp_path / "sequential.csv", chunk_size=64)
+    assert score_file(input_csv, tmp_path / "parallel.csv", chunk_size=64, workers=3) == 300
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "parallel.csv"), pd.read_csv(tmp_path / "sequential.csv"))
+
+def test_csv_segments_split_on_lines(input_csv):
+    segments = _csv_segments(input_csv, 4)
+    data = input_csv.read_bytes()
+    assert segments[0][0] == data.index(b"\n") + 1 and segments[-1][1] == len(data)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(segments, segments[1:]))
+    assert all(data[end - 1:end] == b"\n" for _, end in segments)
+
+def test_parquet(artifacts, input_csv, tmp_path):
+    pytest.importorskip("pyarrow")
+    parquet_path = tmp_path / "input.parquet"
+    pd.read_csv(input_csv).to_parquet(parquet_path, row_group_size=100)
+    assert score_file(parquet_path, tmp_path / "out.parquet", chunk_size=64, workers=2) == 300
+    result = pd.read_parquet(tmp_path / "out.parquet")
+    ids, predictions = _expected(artifacts, input_csv)
+    np.testing.assert_array_equal(result["Id"], ids)
+    np.testing.assert_allclose(result["SalePrice"], predictions, rtol=1e-5)
+
+def test_parallel_empty_inputs(artifacts, input_csv, tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    parquet_path = tmp_path / "empty.parquet"
+    # A writer closed before any table: a valid file with 0 row groups
+    pq.ParquetWriter(parquet_path, pyarrow.schema([("Id", pyarrow.int64())])).close()
+    assert score_file(parquet_path, tmp_path / "out.parquet", workers=2) == 0
+    assert len(pd.read_parquet(tmp_path / "out.parquet")) == 0
+
+    csv_path = tmp_path / "empty.csv"
+    pd.read_csv(input_csv).head(0).to_csv(csv_path, index=False)
+    assert score_file(csv_path, tmp_path / "out.csv", workers=2) == 0
+    assert len(pd.read_csv(tmp_path / "out.csv")) == 0
+
+def test_missing_model(tmp_path, monkeypatch, input_csv):
+    monkeypatch.setattr(config, "models_dir", tmp_path / "empty")
+    monkeypatch.setattr(config, "model_versions_dir", tmp_path / "empty" / "versions")
+    with pytest.raises(FileNotFoundError):
+        score_file(input_csv, tmp_path / "out.csv")
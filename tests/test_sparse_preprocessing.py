@@ -0,0 +1,26 @@
+import numpy as np
+import scipy.sparse as sp
+import xgboost as xgb
+
+from src.data.preprocessing import preprocess_data
+
+def test_sparse_matches_dense(train_df, test_df):
+    X_dense, y_dense, dense = preprocess_data(train_df, is_train=True, sparse=False)
+    X_sparse, y_sparse, sparse = preprocess_data(train_df, is_train=True, sparse=True)
+    assert sp.isspmatrix_csr(X_sparse)
+    np.testing.assert_allclose(X_sparse.toarray(), X_dense)
+    np.testing.assert_array_equal(y_sparse, y_dense)
+    # Most of the one-hot block is zeros that are no longer stored
+    assert X_sparse.nnz < 0.5 * np.prod(X_sparse.shape)
+
+    transformed = sparse.transform(test_df.head(20))
+    assert sp.isspmatrix_csr(transformed)
+    np.testing.assert_allclose(transformed.toarray(), dense.transform(test_df.head(20)))
+
+def test_train_and_predict_on_csr(train_df, test_df):
+    X, y, preprocessor = preprocess_data(train_df, is_train=True, sparse=True)
+    model = xgb.XGBRegressor(n_estimators=20, max_depth=3, random_state=0).fit(X, y)
+    predictions = model.predict(preprocessor.transform(test_df.head(50)))
+    assert predictions.shape == (50,) and np.all(np.isfinite(predictions))
+    # Within the range of the training target
+    assert y.min() * 0.5 < np.median(predictions) < y.max()
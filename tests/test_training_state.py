@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import pytest
+
+from monitoring.store import MonitoringStore
+from src.models import train_model
+from src.utils.config import config
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, trained, train_df):
+    monkeypatch.setattr(config, "data_dir", tmp_path)
+    columns = {name: list(cols) for name, _, cols in trained[1].transformers_ if name != "remainder"}
+    store = MonitoringStore.open(tmp_path / config.monitoring_store_dir, columns["num"] + ['SalePrice'],
+                                 columns["cat"])
+    records = train_df.head(40).copy()
+    records.loc[records.index[::4], 'SalePrice'] = np.nan  # every fourth record is unlabelled
+    store.append_frame(records)
+    return store
+
+def test_save_training_state(tmp_path):
+    path = tmp_path / config.training_state_file
+    train_model._save_training_state(path, "full", monitoring_records=0)
+    assert json.loads(path.read_text()) == {"mode": "full", "monitoring_records": 0}
+
+def test_new_labelled_records(store, trained):
+    frame, end, reason = train_model._new_labelled_records(trained[1], start=8)
+    assert reason is None and end == 40
+    assert len(frame) == 24 and frame['SalePrice'].notna().all()
+
+def test_training_chunks_stop_at_the_recorded_count(store, trained):
+    preprocessor = trained[1]
+    training_store = train_model._training_store(preprocessor)
+    assert training_store is not None
+    n_train = sum(len(chunk) for chunk in train_model._training_chunks(preprocessor, 10_000, None))
+    # Records appended after the run fixed its count are not trained on
+    store.append_frame(store.read().head(5).assign(SalePrice=1.0))
+    rows = sum(len(chunk) for chunk in train_model._training_chunks(preprocessor, 7, training_store, 40))
+    assert rows == n_train + 30
+
+def test_store_with_another_schema_is_not_used(tmp_path, monkeypatch, trained):
+    monkeypatch.setattr(config, "data_dir", tmp_path)
+    MonitoringStore.open(tmp_path / config.monitoring_store_dir, ["LotArea", "SalePrice"], ["Neighborhood"])
+    assert train_model._training_store(trained[1]) is None
@@ -0,0 +1,116 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.models.tuning import (
+    GreyWolfOptimizer, HyperparameterSearch, RandomSearch, SuccessiveHalving, _MedianPruner, decode, make_strategy
+)
+
+SPACE = {
+    "learning_rate": (0.01, 1.0, "log"),
+    "max_depth": (2, 10, "int"),
+    "subsample": (0.5, 1.0, "float")
+}
+
+class _Recorder:
+    """Stands in for HyperparameterSearch._evaluate: records each batch, scores candidates by learning rate."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, candidates):
+        self.batches.append(candidates)
+        return [{"rmse": params["learning_rate"]} for params in candidates]
+
+def test_decode_bounds():
+    assert decode(SPACE, [0.0, 0.0, 0.0]) == pytest.approx({"learning_rate": 0.01, "max_depth": 2, "subsample": 0.5})
+    assert decode(SPACE, [1.0, 1.0, 1.0]) == pytest.approx({"learning_rate": 1.0, "max_depth": 10, "subsample": 1.0})
+    middle = decode(SPACE, [0.5, 0.5, 0.5])
+    # Log scale: the midpoint is the geometric mean
+    assert middle["learning_rate"] == pytest.approx(0.1)
+    assert middle["max_depth"] == 6 and isinstance(middle["max_depth"], int)
+    assert middle["subsample"] == pytest.approx(0.75)
+
+def test_random_search_samples_within_bounds():
+    evaluate = _Recorder()
+    RandomSearch(SPACE, 20, random_state=0).search(evaluate)
+    (batch,) = evaluate.batches
+    assert len(batch) == 20
+    for params in batch:
+        assert 0.01 <= params["learning_rate"] <= 1.0 and 2 <= params["max_depth"] <= 10
+        assert 0.5 <= params["subsample"] <= 1.0
+
+def test_halving_rungs():
+    evaluate = _Recorder()
+    SuccessiveHalving({**SPACE, "n_estimators": (50, 500, "int")}, 9, random_state=0, factor=3,
+                      min_rounds=10).search(evaluate)
+    assert [len(batch) for batch in evaluate.batches] == [9, 3, 1]
+    assert [{params["n_estimators"] for params in batch} for batch in evaluate.batches] == [{10}, {30}, {90}]
+    # The best 1/factor of each rung is promoted
+    first, second, last = evaluate.batches
+    best = sorted(params["learning_rate"] for params in first)[:3]
+    assert sorted(params["learning_rate"] for params in second) == best
+    assert last[0]["learning_rate"] == best[0]
+
+def test_gwo_leaders_keep_best_positions():
+    wolves = np.array([[0.1], [0.2], [0.3]])
+    leaders, scores = GreyWolfOptimizer.update_leaders([], [], wolves, [3.0, 1.0, 2.0])
+    assert scores == [1.0, 2.0, 3.0] and [leader[0] for leader in leaders] == [0.2, 0.3, 0.1]
+    # A worse iteration does not displace them; a better wolf becomes alpha
+    leaders, scores = GreyWolfOptimizer.update_leaders(leaders, scores, np.array([[0.9], [0.8]]), [0.5, 9.0])
+    assert scores == [0.5, 1.0, 2.0] and [leader[0] for leader in leaders] == [0.9, 0.2, 0.3]
+
+def test_gwo_move():
+    gwo = GreyWolfOptimizer(SPACE, 12, random_state=0, population=4)
+    leaders = [np.array([0.2, 0.4, 0.6]), np.array([0.4, 0.6, 0.8]), np.array([0.6, 0.8, 1.0])]
+    wolves = gwo.rng.random((4, 3))
+    # Without exploration (a=0) every wolf lands on the mean of alpha, beta and delta
+    np.testing.assert_allclose(gwo.move(wolves, leaders, a=0.0), np.tile([0.4, 0.6, 0.8], (4, 1)))
+    # With a lot of it, positions are clipped to the unit cube
+    moved = gwo.move(wolves, [np.ones(3)] * 3, a=50.0)
+    assert moved.min() >= 0.0 and moved.max() <= 1.0
+    assert ((moved == 0.0) | (moved == 1.0)).any()
+
+def test_gwo_iterations():
+    evaluate = _Recorder()
+    GreyWolfOptimizer(SPACE, 12, random_state=0, population=4).search(evaluate)
+    assert [len(batch) for batch in evaluate.batches] == [4, 4, 4]
+    assert evaluate.batches[0] != evaluate.batches[1]
+
+def test_gwo_rejects_a_single_iteration():
+    with pytest.raises(ValueError):
+        GreyWolfOptimizer(SPACE, 4, population=4)
+    with pytest.raises(ValueError):
+        make_strategy("annealing", SPACE, 10)
+
+def test_median_pruner():
+    pruner = _MedianPruner({20: 100.0, 30: 90.0}, interval=10, warmup=20)
+
+    def stop(rmse):
+        return pruner.after_iteration(None, len(rmse) - 1, {"validation_0": {"rmse": rmse}})
+
+    assert not stop([500.0] * 10)  # before the warm-up
+    assert not stop([500.0] * 25)  # not a checkpoint
+    assert not stop([500.0] * 19 + [95.0])  # best so far is under the median
+    assert not pruner.pruned
+    assert stop([500.0] * 30)
+    assert pruner.pruned
+
+def test_search_end_to_end(tmp_path):
+    import mlflow
+    previous_uri = mlflow.get_tracking_uri()
+    mlflow.set_tracking_uri((tmp_path / "mlruns").as_uri())
+    rng = np.random.default_rng(0)
+    X = rng.random((300, 4))
+    y = 3 * X[:, 0] + X[:, 1] + rng.normal(0, 0.05, 300)
+    search = HyperparameterSearch(RandomSearch(SPACE, 3, random_state=0), X[:200], y[:200], X[200:], y[200:],
+                                  base_params={"n_estimators": 20, "random_state": 0}, n_workers=1)
+    try:
+        best = search.run()
+    finally:
+        mlflow.set_tracking_uri(previous_uri)
+    assert len(search.trials) == 3
+    assert best["rmse"] == min(trial["rmse"] for trial in search.trials if not trial["pruned"])
+    assert set(SPACE) <= set(best["params"]) and best["run_id"]
+    assert math.isfinite(best["rmse"])
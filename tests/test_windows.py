@@ -0,0 +1,69 @@
+import pytest
+
+from monitoring.drift_engine import DriftEngine
+from monitoring.windows import RingBuffer, WindowedDriftDetector
+from src.data.reference_profile import ReferenceProfile, build_reference_profile
+
+@pytest.fixture(scope="module")
+def engine(train_df):
+    return DriftEngine(ReferenceProfile(build_reference_profile(train_df)))
+
+@pytest.fixture(scope="module")
+def records(train_df):
+    return train_df.sample(600, random_state=0).to_dict(orient="records")
+
+def test_ring_buffer_overwrites_oldest():
+    buffer = RingBuffer(3, 1, 1)
+    for i in range(5):
+        buffer.append([i], [i], timestamp=float(i))
+    numeric, _ = buffer.select()
+    assert buffer.size == 3 and sorted(numeric[:, 0]) == [2, 3, 4]
+    numeric, _ = buffer.select(since=3.0, until=4.0)
+    assert numeric[:, 0].tolist() == [3]
+
+def test_count_windows(engine, records):
+    detector = WindowedDriftDetector(engine, mode="count", size=200, stride=100)
+    closed = [i for i, record in enumerate(records[:500]) if detector.update(record) is not None]
+    assert closed == [199, 299, 399, 499]
+    assert [window["n"] for window in detector.history] == [200] * 4
+    assert not any(window["drift_detected"] for window in detector.history)
+
+def test_tumbling_window_detects_shift(engine, records):
+    detector = WindowedDriftDetector(engine, mode="count", size=200, stride=200)
+    assert detector.tumbling
+    for record in records[:400]:
+        detector.update(record)
+    for record in records[400:600]:
+        detector.update({**record, "GrLivArea": record["GrLivArea"] * 1.6})
+    assert [window["drift_detected"] for window in detector.history] == [False, False, True]
+    assert "GrLivArea" in detector.last_report.drifted_features
+
+def test_time_windows_skip_idle_periods(engine, records):
+    detector = WindowedDriftDetector(engine, mode="time", size=10.0, stride=10.0, capacity=1000)
+    for i, record in enumerate(records[:100]):
+        detector.update(record, timestamp=i * 0.1)
+    # One record after a long pause closes the expired window, without that record
+    assert detector.update(records[100], timestamp=1000.0) is not None
+    assert len(detector.history) == 1
+    assert detector.history[-1]["n"] == 100 and detector.history[-1]["window_end"] == 10.0
+
+def test_time_windows_close_on_tick(engine, records):
+    detector = WindowedDriftDetector(engine, mode="time", size=10.0, stride=10.0, capacity=1000)
+    for i, record in enumerate(records[:50]):
+        detector.update(record, timestamp=i * 0.1)
+    assert detector.tick(now=9.0) is None and not detector.history
+    # The window [0, 10) closes on the clock, with no record after it
+    assert detector.tick(now=12.0) is not None
+    assert [window["n"] for window in detector.history] == [50]
+    # [10, 20) and [20, 30) stay empty: no window is recorded for them
+    assert detector.tick(now=25.0) is None and detector.tick(now=35.0) is None
+    for i, record in enumerate(records[50:80]):
+        detector.update(record, timestamp=41.0 + i * 0.1)
+    detector.tick(now=50.0)
+    assert [(window["window_end"], window["n"]) for window in detector.history] == [(10.0, 50), (50.0, 30)]
+
+def test_invalid_settings(engine):
+    with pytest.raises(ValueError):
+        WindowedDriftDetector(engine, mode="session")
+    with pytest.raises(ValueError):
+        WindowedDriftDetector(engine, size=100, stride=0)